@@ -0,0 +1,110 @@
+import os
+
+import numpy as np
+
+from pose_landmarks import X, Z, empty_landmarks
+
+# Faza göre değişken çıkarım hızı ADAPTIVE_INFERENCE=0 ile kapatılır (her kare işlenir)
+ADAPTIVE_ENABLED = os.environ.get("ADAPTIVE_INFERENCE", "1") != "0"
+# Sakin fazlarda (IDLE, hareketsiz bekleme, kişi yok) her kaçıncı karede pose.process çalışır
+IDLE_INFERENCE_INTERVAL = int(os.environ.get("ADAPTIVE_IDLE_INTERVAL", "3"))
+# Tahmin edilen karelerde hızın her karede çarpıldığı sönümleme katsayısı
+PREDICTION_DAMPING = 0.8
+
+# Her karede çıkarım gerektiren hareket fazları
+ACTIVE_PHASES = {
+    "squat": frozenset(("DOWNWARD_PHASE", "BOTTOM_POSITION", "UPWARD_PHASE")),
+    "deadlift": frozenset(("LIFTING_PHASE", "LOCKOUT", "DOWNWARD_PHASE")),
+}
+
+
+class AdaptiveInference:
+    """
+    Analizörün fazına göre pose çıkarımının hangi karelerde çalışacağını seçer.
+
+    Hareket fazlarında ya da kalça hareket ederken (movement_direction
+    STATIONARY değilken) her kare işlenir. Sakin fazlarda yalnızca her
+    interval'inci kare işlenir; aradaki karelerin anahtar noktaları son iki
+    anahtar kareden sabit hız varsayımıyla (sönümlenerek) tahmin edilir.
+    Hareket başladığında ilk anahtar kare bunu yakalar ve hız tam hıza döner.
+    """
+
+    __slots__ = ("analyzer", "interval", "enabled", "active_phases", "_last",
+                 "_velocity", "_predicted", "_since_keyframe", "frames", "inferred", "last_inferred")
+
+    def __init__(self, analyzer, interval=IDLE_INFERENCE_INTERVAL, enabled=ADAPTIVE_ENABLED):
+        self.analyzer = analyzer
+        self.interval = max(1, interval)
+        self.enabled = enabled
+        self.active_phases = ACTIVE_PHASES.get(analyzer.exercise, frozenset())
+        self._last = empty_landmarks()
+        self._velocity = np.zeros((self._last.shape[0], Z + 1), dtype=np.float32)
+        self._predicted = empty_landmarks()
+        self._since_keyframe = None  # None: elde anahtar kare yok (ya da kişi yoktu)
+        self.frames = 0
+        self.inferred = 0
+        # Son process() çağrısında çıkarım çalıştı mı (False: tahmin edilen kare)
+        self.last_inferred = False
+
+    def reset(self):
+        self._since_keyframe = None
+
+    def should_infer(self):
+        """Bu kare için pose.process çalıştırılmalı mı?"""
+        if not self.enabled:
+            return True
+        since = self._since_keyframe
+        if since is None:
+            # Kişi yokken de sakin hızda aranır; ilk kare her zaman işlenir
+            return self.frames % self.interval == 0
+        analyzer = self.analyzer
+        if analyzer.phase in self.active_phases or analyzer.movement_direction != "STATIONARY":
+            return True
+        return since + 1 >= self.interval
+
+    def process(self, infer):
+        """
+        infer() -> (33, 4) anahtar noktalar ya da None. Gerekirse çalıştırır,
+        değilse tahmin döndürür. Dönen dizi bir sonraki çağrıya kadar geçerlidir.
+        """
+        run = self.should_infer()
+        self.frames += 1
+        self.last_inferred = run
+        if run:
+            self.inferred += 1
+            return self.keyframe(infer())
+        return self.predict()
+
+    def keyframe(self, landmarks):
+        """Çıkarım sonucunu anahtar kare olarak kaydeder ve aynen döndürür."""
+        if landmarks is None:
+            self._since_keyframe = None
+            return None
+        if self._since_keyframe is None:
+            self._velocity.fill(0.0)
+        else:
+            np.subtract(landmarks[:, X:Z + 1], self._last[:, X:Z + 1], out=self._velocity)
+            self._velocity /= self._since_keyframe + 1
+        self._last[:] = landmarks
+        self._since_keyframe = 0
+        return landmarks
+
+    def predict(self):
+        """Son anahtar kareden sönümlü sabit hızla ileri tahmin; kişi yoksa None."""
+        if self._since_keyframe is None:
+            return None
+        self._since_keyframe += 1
+        steps = self._since_keyframe
+        # 1 + d + d^2 + ... (steps terim): sönümlenen hızın toplam yer değiştirmesi
+        gain = (1 - PREDICTION_DAMPING ** steps) / (1 - PREDICTION_DAMPING)
+        predicted = self._predicted
+        predicted[:] = self._last
+        predicted[:, X:Z + 1] += self._velocity * gain
+        return predicted
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "inferredFrames": self.inferred,
+            "skippedFrames": self.frames - self.inferred,
+        }
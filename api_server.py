@@ -1,290 +1,565 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import numpy as np
-import cv2
 import base64
-import mediapipe as mp
+import json
+import os
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from image_decode import decode_image, fit_image
+from exercise_rules import ExerciseScorers, rule_book
+from pose_landmarks import LANDMARK_COUNT, landmarks_from_bytes, landmarks_from_values
+from pose_pool import PosePool
+from pose_profiles import DEFAULT_PROFILE, PROFILES, get_profile
+from result_cache import ResultCache
+from stream_sessions import SessionManager
+
+try:
+    from flask_sock import Sock
+except ImportError:  # flask-sock kurulu değilse yalnızca HTTP oturumları kullanılabilir
+    Sock = None
 
 app = Flask(__name__)
 
-mp_pose = mp.solutions.pose
-def calculate_angle(a, b, c):
-    a = np.array(a)
-    b = np.array(b)
-    c = np.array(c)
-
-    radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
-    angle = np.abs(np.degrees(radians))
-
-    if angle > 180.0:
-        angle = 360 - angle
-    return angle
-
-def calculate_distance(p1, p2):
-    return np.linalg.norm(np.array(p1) - np.array(p2))
-
-def analyze_deadlift_posture(image_np):
-    score = 0.0
-    feedback = "Deadlift analizi bekleniyor..."
-    
-    
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose_instance:
-        
-        image_rgb = cv2.cvtColor(image_np, cv2.COLOR_BGR2RGB)
-        image_rgb.flags.writeable = False 
-        
-        results = pose_instance.process(image_rgb)
-        
-        image_rgb.flags.writeable = True
-        
-        if results.pose_landmarks:
-            try:
-                landmarks = results.pose_landmarks.landmark
-
-                def get_landmark_coords(landmark_idx, min_visibility=0.4):
-                    lm = landmarks[landmark_idx]
-                   
-                    if lm.visibility > min_visibility:
-                        return [lm.x, lm.y, lm.z] 
-                    return None
-
-                left_shoulder_temp = get_landmark_coords(mp_pose.PoseLandmark.LEFT_SHOULDER.value)
-                right_shoulder_temp = get_landmark_coords(mp_pose.PoseLandmark.RIGHT_SHOULDER.value)
-                left_hip_temp = get_landmark_coords(mp_pose.PoseLandmark.LEFT_HIP.value)
-                right_hip_temp = get_landmark_coords(mp_pose.PoseLandmark.RIGHT_HIP.value)
-                left_knee_temp = get_landmark_coords(mp_pose.PoseLandmark.LEFT_KNEE.value)
-                right_knee_temp = get_landmark_coords(mp_pose.PoseLandmark.RIGHT_KNEE.value)
-                left_ankle_temp = get_landmark_coords(mp_pose.PoseLandmark.LEFT_ANKLE.value)
-                right_ankle_temp = get_landmark_coords(mp_pose.PoseLandmark.RIGHT_ANKLE.value)
-
-                left_visible_count = sum(1 for p in [left_shoulder_temp, left_hip_temp, left_knee_temp, left_ankle_temp] if p is not None)
-                right_visible_count = sum(1 for p in [right_shoulder_temp, right_hip_temp, right_knee_temp, right_ankle_temp] if p is not None)
-
-                shoulder, hip, knee, ankle = None, None, None, None
-
-                if left_visible_count >= right_visible_count and left_visible_count >= 3:
-                    shoulder, hip, knee, ankle = left_shoulder_temp, left_hip_temp, left_knee_temp, left_ankle_temp
-                elif right_visible_count > left_visible_count and right_visible_count >= 3:
-                    shoulder, hip, knee, ankle = right_shoulder_temp, right_hip_temp, right_knee_temp, right_ankle_temp
-                
-                if all([shoulder, hip, knee, ankle]):
-                    knee_angle = calculate_angle(hip, knee, ankle)
-                    hip_angle = calculate_angle(shoulder, hip, knee)
-
-         
-                    shoulder_point_2d_norm = np.array([shoulder[0], shoulder[1]])
-                    hip_point_2d_norm = np.array([hip[0], hip[1]])
-
-                    trunk_vector_norm = hip_point_2d_norm - shoulder_point_2d_norm 
-                    vertical_vector_norm = np.array([0, 1]) 
-
-                    if np.linalg.norm(trunk_vector_norm) == 0 or np.linalg.norm(vertical_vector_norm) == 0:
-                        trunk_angle = 0
-                    else:
-                        dot_product = np.dot(trunk_vector_norm, vertical_vector_norm)
-                        magnitude_product = np.linalg.norm(trunk_vector_norm) * np.linalg.norm(vertical_vector_norm)
-                        trunk_angle = np.degrees(np.arccos(np.clip(dot_product / magnitude_product, -1.0, 1.0)))
-
-                  
-                    score_components = []
-                    current_feedback = []
-
-                    
-                    if 20 <= knee_angle <= 125: 
-                        score_components.append(1)
-                    else:
-                        current_feedback.append("Diz acinizi kontrol edin. ({} derece)".format(int(knee_angle)))
-                        score_components.append(0)
-
-                    
-                    if 20 <= hip_angle <= 150: 
-                        score_components.append(1)
-                    else:
-                        current_feedback.append("Kalca acinizi kontrol edin. ({} derece)".format(int(hip_angle)))
-                        score_components.append(0)
-
-                 
-                    if (50 <= trunk_angle <= 70) or (0 <= trunk_angle <= 20): 
-                        score_components.append(1)
-                    else:
-                        current_feedback.append("Govde acinizi kontrol edin. ({} derece)".format(int(trunk_angle)))
-                        score_components.append(0)
-
-                   
-                    if not current_feedback: 
-                        score = 100.0
-                        feedback = "Mükemmel deadlift formu!"
-                    else:
-                        score = (sum(score_components) / len(score_components)) * 100
-                        feedback = "Formda iyilestirme gerek: " + " ".join(current_feedback)
-                        if "Diz acinizi" in feedback and "Kalca acinizi" in feedback and "Govde acinizi" in feedback:
-                             feedback = "Genel deadlift formunuzu gozden gecirin."
-
-
-                else:
-                    feedback = "Deadlift için yeterli anahtar nokta algilanamadi. Lütfen kadraja tam girin."
-                    score = 0.0
-            except Exception as e:
-                feedback = f"Deadlift analizi sirasinda hata olustu: {e}"
-                score = 0.0
-        else:
-            feedback = "Deadlift için kişi algilanamadi."
-            score = 0.0
-    
-  
-    score = max(0.0, min(100.0, score))
-    return round(score, 1), feedback
-
-
-def analyze_squat_posture(image_np):
-    score = 0.0
-    feedback = "Squat analizi bekleniyor..."
-    
-   
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose_instance:
-        image_rgb = cv2.cvtColor(image_np, cv2.COLOR_BGR2RGB)
-        image_rgb.flags.writeable = False
-        results = pose_instance.process(image_rgb)
-        image_rgb.flags.writeable = True
-
-        if results.pose_landmarks:
-            try:
-                landmarks = results.pose_landmarks.landmark
-
-                def get_landmark_coords(landmark_idx, min_visibility=0.7):
-                    lm = landmarks[landmark_idx]
-                    
-                    if lm.visibility > min_visibility:
-                        return [lm.x, lm.y, lm.z]
-                    return None
-                
-                left_hip = get_landmark_coords(mp_pose.PoseLandmark.LEFT_HIP.value)
-                left_knee = get_landmark_coords(mp_pose.PoseLandmark.LEFT_KNEE.value)
-                left_ankle = get_landmark_coords(mp_pose.PoseLandmark.LEFT_ANKLE.value)
-                left_shoulder = get_landmark_coords(mp_pose.PoseLandmark.LEFT_SHOULDER.value)
-                
-                right_hip = get_landmark_coords(mp_pose.PoseLandmark.RIGHT_HIP.value)
-                right_knee = get_landmark_coords(mp_pose.PoseLandmark.RIGHT_KNEE.value)
-                right_ankle = get_landmark_coords(mp_pose.PoseLandmark.RIGHT_ANKLE.value)
-                right_shoulder = get_landmark_coords(mp_pose.PoseLandmark.RIGHT_SHOULDER.value)
-
-                points_left = [left_hip, left_knee, left_ankle, left_shoulder]
-                points_right = [right_hip, right_knee, right_ankle, right_shoulder]
-
-                visible_left = [p for p in points_left if p is not None]
-                visible_right = [p for p in points_right if p is not None]
-
-                hip, knee, ankle, shoulder = None, None, None, None
-                
-                if len(visible_left) >= len(visible_right) and len(visible_left) >= 3:
-                    hip, knee, ankle, shoulder = left_hip, left_knee, left_ankle, left_shoulder
-                elif len(visible_right) > len(visible_left) and len(visible_right) >= 3:
-                    hip, knee, ankle, shoulder = right_hip, right_knee, right_ankle, right_shoulder
-
-                if all([hip, knee, ankle, shoulder]):
-                    knee_angle = calculate_angle(hip, knee, ankle)
-                    hip_angle = calculate_angle(shoulder, hip, knee)
-
-                  
-                    shoulder_point_2d = np.array([shoulder[0], shoulder[1]])
-                    hip_point_2d = np.array([hip[0], hip[1]])
-                    
-                    trunk_vector = shoulder_point_2d - hip_point_2d 
-                    vertical_vector = np.array([0, 1])
-                    
-                    if np.linalg.norm(trunk_vector) == 0 or np.linalg.norm(vertical_vector) == 0:
-                        trunk_angle_vertical = 0
-                    else:
-                        dot_product = np.dot(trunk_vector, vertical_vector)
-                        magnitude_product = np.linalg.norm(trunk_vector) * np.linalg.norm(vertical_vector)
-                        trunk_angle_vertical = np.degrees(np.arccos(np.clip(dot_product / magnitude_product, -1.0, 1.0)))
-
-                    
-                    score_components = [] 
-                    current_feedback = []
-
-                    if knee_angle <= 90: 
-                        score_components.append(1)
-                        current_feedback.append("Derinliginiz iyi.")
-                    elif knee_angle > 90 and knee_angle <= 120: 
-                        score_components.append(0.5) 
-                        current_feedback.append("Daha derine inin.")
-                    else: 
-                        score_components.append(0)
-                        current_feedback.append("Cok sig squat. Daha derine inmelisiniz.")
-                    
-                    if 60 <= hip_angle <= 110: 
-                        score_components.append(1)
-                    else:
-                        current_feedback.append("Kalca acinizi kontrol edin. ({} derece)".format(int(hip_angle)))
-                        score_components.append(0)
-
-                    if trunk_angle_vertical >= 30 and trunk_angle_vertical <= 60: # Gövde açısı için makul aralık (dikeyden sapma)
-                        score_components.append(1)
-                    else:
-                        current_feedback.append("Govde egimini kontrol edin. Sirtinizi duz tutun. ({} derece)".format(int(trunk_angle_vertical)))
-                        score_components.append(0)
-                    
-                    if left_knee and right_knee:
-                        knee_distance = calculate_distance([left_knee[0], left_knee[1]], [right_knee[0], right_knee[1]])
-                        if knee_distance < (hip[0] - shoulder[0]) * 0.5: 
-                             current_feedback.append("Dizleriniz iceri cokuyor. Dizlerinizi disari itin.")
-                             score_components.append(0) 
-                        else:
-                            score_components.append(1)
-                    else:
-                         score_components.append(1)
-                   
-                    if not current_feedback or all(c == "Derinliginiz iyi." for c in current_feedback): 
-                        score = 100.0
-                        feedback = "Mükemmel squat formu!"
-                    else:
-                        score = (sum(score_components) / len(score_components)) * 100
-                        feedback = "Formda iyilestirme gerek: " + " ".join(list(set(current_feedback))) 
-                        if "Cok sig squat." in feedback:
-                            score = max(score, 20) 
-                        elif "Daha derine inin." in feedback:
-                            score = max(score, 50) 
-                        
-                        score = max(score, 1.0) 
-                else:
-                    feedback = "Squat için yeterli anahtar nokta algilanamadi. Lütfen kadraja tam girin."
-                    score = 0.0
-            except Exception as e:
-                feedback = f"Squat analizi sirasinda hata olustu: {e}"
-                score = 0.0
+# --- Pose Çıkarım Arka Ucu ---
+# "thread": süreç içi Pose havuzu (POSE_POOL_SIZE)
+# "process": her çekirdekte ayrı Pose modeli tutan süreç havuzu (POSE_WORKERS)
+POSE_BACKEND = os.environ.get("POSE_BACKEND", "thread")
+
+# Toplu isteklerde tek istekte gönderilebilecek en fazla kare sayısı
+MAX_BATCH_FRAMES = int(os.environ.get("MAX_BATCH_FRAMES", "32"))
+# /score-landmarks isteğinde gönderilebilecek en fazla kare (30 FPS'te 30 saniye)
+MAX_LANDMARK_FRAMES = int(os.environ.get("MAX_LANDMARK_FRAMES", "900"))
+
+pose_backend = None  # varsayılan profilin arka ucu
+profile_backends = {}  # profil adı -> arka uç; varsayılan dışındakiler ilk istekte oluşturulur
+batch_executor = None
+_backend_config = {"backend": POSE_BACKEND, "workers": None, "warmup": True}
+_pose_backend_lock = threading.Lock()
+
+def _create_backend(profile):
+    config = _backend_config
+    backend, workers = config["backend"], config["workers"]
+    pose_kwargs = profile.pose_kwargs(static_image_mode=True)
+    if backend == "process":
+        from pose_workers import ProcessPoseBackend, DEFAULT_WORKERS
+        created = ProcessPoseBackend(workers=workers or DEFAULT_WORKERS, **pose_kwargs)
+    elif backend == "thread":
+        if workers:
+            created = PosePool(size=workers, **pose_kwargs)
         else:
-            feedback = "Squat için kişi algilanamadi."
-            score = 0.0
-
-    score = max(0.0, min(100.0, score))
-    return round(score, 1), feedback
+            created = PosePool(**pose_kwargs)
+    else:
+        raise ValueError("Gecersiz Pose arka ucu: {}".format(backend))
+
+    if config["warmup"] and os.environ.get("POSE_POOL_WARMUP", "1") != "0":
+        created.warmup()
+    return created
+
+def close_pose_backends():
+    global pose_backend
+    for backend in profile_backends.values():
+        backend.close()
+    profile_backends.clear()
+    pose_backend = None
+
+def init_pose_backend(backend=POSE_BACKEND, workers=None, warmup=True, profile=None):
+    """Varsayılan profilin Pose arka ucunu bir kez oluşturur; sunucu açılışında çağrılır."""
+    global pose_backend, batch_executor
+    profile = get_profile(profile)
+    with _pose_backend_lock:
+        if pose_backend is not None:
+            close_pose_backends()
+            batch_executor.shutdown(wait=False)
+
+        _backend_config.update(backend=backend, workers=workers, warmup=warmup)
+        pose_backend = _create_backend(profile)
+        profile_backends[profile.name] = pose_backend
+
+        # Toplu isteklerdeki kareler arka uçtaki tüm örneklere aynı anda dağıtılır
+        batch_executor = ThreadPoolExecutor(max_workers=pose_backend.size, thread_name_prefix="pose-batch")
+    return pose_backend
+
+def get_pose_backend(profile=None):
+    """Profilin arka ucu (None: varsayılan); farklı model ayarlı profiller ayrı havuz kullanır."""
+    if pose_backend is None:
+        init_pose_backend()
+    if profile is None:
+        return pose_backend
+    backend = profile_backends.get(profile.name)
+    if backend is None:
+        with _pose_backend_lock:
+            backend = profile_backends.get(profile.name)
+            if backend is None:
+                backend = profile_backends[profile.name] = _create_backend(profile)
+    return backend
+
+# Skorlama kuralları exercise_rules.json'dan derlenir; dosya değişince yeniden yüklenir
+EXERCISE_SCORERS = ExerciseScorers(rule_book)
+
+def analyze_deadlift_posture(image_np, profile=None):
+    return score_exercise("deadlift", get_pose_backend(profile).detect(image_np), profile)
+
+def analyze_squat_posture(image_np, profile=None):
+    return score_exercise("squat", get_pose_backend(profile).detect(image_np), profile)
+
+INVALID_EXERCISE_FEEDBACK = "Gecersiz egzersiz tipi belirtildi. Lutfen 'squat' veya 'deadlift' gonderin."
+
+# --- Analiz Sonuç Sınıfları (metrikler için) ---
+OUTCOME_SUCCESS = "success"
+OUTCOME_NO_PERSON = "no_person"
+OUTCOME_INSUFFICIENT_LANDMARKS = "insufficient_landmarks"
+OUTCOME_ERROR = "error"
+OUTCOME_INVALID_EXERCISE = "invalid_exercise"
+OUTCOME_INVALID_IMAGE = "invalid_image"
+
+# Skorlayıcıların analiz hatası geri bildirimlerinde geçen ifade
+ERROR_FEEDBACK_MARKER = "sirasinda hata olustu"
+
+def classify_outcome(landmarks, feedback):
+    """Skorlayıcının geri bildiriminden analiz sonucunun sınıfını çıkarır."""
+    if landmarks is None:
+        return OUTCOME_NO_PERSON
+    if "yeterli anahtar nokta algilanamadi" in feedback:
+        return OUTCOME_INSUFFICIENT_LANDMARKS
+    if ERROR_FEEDBACK_MARKER in feedback:
+        return OUTCOME_ERROR
+    return OUTCOME_SUCCESS
+
+def score_exercise(exercise_type, landmarks, profile=None):
+    """Anahtar noktaları egzersizin skorlayıcısıyla (profilin görünürlük eşiğiyle) puanlar ve sonucu metriklere işler."""
+    min_visibility = get_profile(profile).visibility(exercise_type)
+    with metrics.stage("score"):
+        score, feedback = EXERCISE_SCORERS[exercise_type](landmarks, min_visibility)
+    if metrics.registry.enabled:
+        metrics.registry.inc("posture_analyses_total", exercise_type, classify_outcome(landmarks, feedback))
+    return score, feedback
+
+def score_exercise_frames(exercise_type, frames, profile=None):
+    """(n, 33, 4) kareleri tek seferde dizi işlemleriyle puanlar; tamamı NaN kare "kişi yok" sayılır."""
+    exercise_rules = rule_book.get(exercise_type)
+    with metrics.stage("score"):
+        results = exercise_rules.score_frames(frames, get_profile(profile).visibility(exercise_type))
+    if metrics.registry.enabled:
+        present = (~np.isnan(frames).all(axis=(1, 2))).tolist()
+        for frame, found, (_, feedback) in zip(frames, present, results):
+            outcome = classify_outcome(frame if found else None, feedback)
+            metrics.registry.inc("posture_analyses_total", exercise_type, outcome)
+    return results
+
+def count_rejected(exercise_type, outcome):
+    """Analize hiç girmeyen istekleri sayar; bilinmeyen tipler tek etikette toplanır."""
+    if metrics.registry.enabled:
+        label = exercise_type if exercise_type in EXERCISE_SCORERS else "unknown"
+        metrics.registry.inc("posture_analyses_total", label, outcome)
+
+# JSON dışında doğrudan kabul edilen ikili resim gövdeleri
+BINARY_IMAGE_MIMETYPES = ("image/jpeg", "image/png", "application/octet-stream")
+
+def decode_base64_image(image_base64, profile=None):
+    with metrics.stage("base64_decode"):
+        buffer = base64.b64decode(image_base64)
+    return decode_image_buffer(buffer, profile)
+
+def decode_image_buffer(buffer, profile=None):
+    """
+    Ham resim baytlarını (bytes/memoryview) kopyalamadan çözer. Büyük JPEG'ler
+    profilin decode_size değerine göre 1/2, 1/4 veya 1/8 ölçekte çözülür;
+    profil giriş boyutunu sınırlıyorsa resim ayrıca küçültülür.
+    """
+    profile = get_profile(profile)
+    with metrics.stage("imdecode"):
+        image_np, factor = decode_image(buffer, profile.decode_size)
+    if image_np is None:
+        return None
+    if metrics.registry.enabled:
+        metrics.registry.inc("image_decode_reduction_total", str(factor))
+    if profile.max_input_side:
+        with metrics.stage("resize"):
+            image_np = fit_image(image_np, profile.max_input_side)
+    return image_np
+
+def request_profile():
+    """
+    İstekteki "profile" alanını (JSON gövdesi, form alanı, sorgu parametresi ya da
+    X-Pose-Profile başlığı) çözer; yoksa varsayılan profil. Bilinmeyen adda ValueError.
+    """
+    name = None
+    if request.mimetype == "multipart/form-data":
+        name = request.form.get('profile')
+    elif request.mimetype not in BINARY_IMAGE_MIMETYPES:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            name = data.get('profile')
+    return get_profile(name or request.args.get('profile') or request.headers.get('X-Pose-Profile'))
+
+def read_upload_buffer(file_storage):
+    """Multipart dosya akışının baytlarını mümkünse kopyasız (BytesIO.getbuffer) döndürür."""
+    stream = file_storage.stream
+    if hasattr(stream, "getbuffer"):
+        return stream.getbuffer()
+    return stream.read()
+
+def read_image_request():
+    """
+    İstekten resim verisini ve egzersiz tipini okur (henüz çözmeden). Üç biçim desteklenir:
+    - application/json: {"image": <base64>, "exerciseType": ...} (mevcut sözleşme)
+    - multipart/form-data: "image" dosya alanı + "exerciseType" form alanı
+    - image/jpeg, image/png, application/octet-stream: ham gövde,
+      exerciseType sorgu parametresinde veya X-Exercise-Type başlığında
+    (çözücü, veri, exercise_type) döndürür; çözücü decode(veri, profil) ile çağrılır,
+    resim yoksa veri None olur.
+    """
+    mimetype = request.mimetype
+
+    if mimetype == "multipart/form-data":
+        upload = request.files.get('image')
+        exercise_type = request.form.get('exerciseType') or request.args.get('exerciseType')
+        if upload is None:
+            return decode_image_buffer, None, exercise_type
+        return decode_image_buffer, read_upload_buffer(upload), exercise_type
+
+    if mimetype in BINARY_IMAGE_MIMETYPES:
+        exercise_type = request.args.get('exerciseType') or request.headers.get('X-Exercise-Type')
+        return decode_image_buffer, request.get_data(cache=False), exercise_type
 
-@app.route('/analyze-posture', methods=['POST'])
-def analyze_posture():
     data = request.json
     image_base64 = data['image']
     exercise_type = data['exerciseType']
 
-    nparr = np.frombuffer(base64.b64decode(image_base64), np.uint8)
-  
-    image_np = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    return decode_base64_image, image_base64, exercise_type
 
+# --- Sonuç Önbelleği (aynı resmin tekrar gönderimi) ---
+result_cache = ResultCache()
+
+def cached_result_key(payload, exercise_type, profile):
+    """Önbellek açıksa ve istek analiz edilebilirse anahtar, değilse None."""
+    if not payload or exercise_type not in EXERCISE_SCORERS or not result_cache.enabled:
+        return None
+    # Kural sürümü anahtarda: kurallar yeniden yüklenince eski sonuçlar kullanılmaz
+    return result_cache.key(payload, exercise_type, profile.name, rule_book.version)
+
+def cache_result(key, score, feedback):
+    """Analiz hatası içermeyen sonuçları önbelleğe yazar."""
+    if key is not None and ERROR_FEEDBACK_MARKER not in feedback:
+        result_cache.put(key, (score, feedback))
+
+@app.route('/analyze-posture', methods=['POST'])
+def analyze_posture():
+    try:
+        profile = request_profile()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    decode, payload, exercise_type = read_image_request()
+
+    # Aynı resim daha önce analiz edildiyse çözme ve çıkarım yapılmaz
+    cache_key = cached_result_key(payload, exercise_type, profile)
+    if cache_key is not None:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return jsonify({"score": cached[0], "feedback": cached[1], "profile": profile.name})
+
+    image_np = decode(payload, profile) if payload is not None else None
     if image_np is None:
+        count_rejected(exercise_type, OUTCOME_INVALID_IMAGE)
         return jsonify({"error": "Resim cozumlenemedi."}), 400
 
-    score = 0.0
-    feedback = "Belirsiz egzersiz tipi."
-
-    if exercise_type == "squat":
-        score, feedback = analyze_squat_posture(image_np)
-    elif exercise_type == "deadlift":
-        score, feedback = analyze_deadlift_posture(image_np)
+    if exercise_type in EXERCISE_SCORERS:
+        score, feedback = score_exercise(exercise_type, get_pose_backend(profile).detect(image_np), profile)
     else:
-        feedback = "Gecersiz egzersiz tipi belirtildi. Lutfen 'squat' veya 'deadlift' gonderin."
+        count_rejected(exercise_type, OUTCOME_INVALID_EXERCISE)
+        feedback = INVALID_EXERCISE_FEEDBACK
         score = 0.0
 
-    return jsonify({"score": score, "feedback": feedback})
+    cache_result(cache_key, score, feedback)
+    return jsonify({"score": score, "feedback": feedback, "profile": profile.name})
+
+def summarize_batch(results):
+    """Toplu analiz sonuçlarından egzersiz bazında özet istatistik üretir."""
+    scores = [r["score"] for r in results if "score" in r]
+    summary = {
+        "count": len(results),
+        "analyzed": len(scores),
+        "failed": len(results) - len(scores),
+        "mean_score": round(sum(scores) / len(scores), 1) if scores else 0.0,
+        "min_score": min(scores) if scores else 0.0,
+        "max_score": max(scores) if scores else 0.0,
+        "by_exercise": {},
+    }
+    for r in results:
+        if "score" not in r:
+            continue
+        stats = summary["by_exercise"].setdefault(r["exerciseType"], {"count": 0, "mean_score": 0.0})
+        stats["count"] += 1
+        stats["mean_score"] += r["score"]
+    for stats in summary["by_exercise"].values():
+        stats["mean_score"] = round(stats["mean_score"] / stats["count"], 1)
+    return summary
+
+@app.route('/analyze-posture/batch', methods=['POST'])
+def analyze_posture_batch():
+    """
+    Birden fazla kareyi tek HTTP isteğinde analiz eder.
+
+    Gövde: {"frames": [{"image": <base64>, "exerciseType": "squat"}, ...], "profile": "fast"}
+    Karelerde exerciseType yoksa üst düzeydeki "exerciseType" kullanılır;
+    profil tüm kareler için geçerlidir.
+    """
+    try:
+        profile = request_profile()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    data = request.get_json(silent=True) or {}
+    frames = data.get('frames')
+    if not isinstance(frames, list) or not frames:
+        return jsonify({"error": "'frames' listesi bos veya eksik."}), 400
+    if len(frames) > MAX_BATCH_FRAMES:
+        return jsonify({"error": "En fazla {} kare gonderilebilir.".format(MAX_BATCH_FRAMES)}), 413
+
+    default_exercise = data.get('exerciseType')
+    results = [None] * len(frames)
+    pending = []
+
+    for i, frame in enumerate(frames):
+        exercise_type = frame.get('exerciseType', default_exercise) if isinstance(frame, dict) else None
+        if exercise_type not in EXERCISE_SCORERS:
+            count_rejected(exercise_type, OUTCOME_INVALID_EXERCISE)
+            results[i] = {"exerciseType": exercise_type, "error": INVALID_EXERCISE_FEEDBACK}
+            continue
+        try:
+            image_np = decode_base64_image(frame['image'], profile)
+        except (KeyError, TypeError, ValueError):
+            image_np = None
+        if image_np is None:
+            count_rejected(exercise_type, OUTCOME_INVALID_IMAGE)
+            results[i] = {"exerciseType": exercise_type, "error": "Resim cozumlenemedi."}
+            continue
+        pending.append((i, exercise_type, image_np))
+
+    # Tüm geçerli kareler arka uca tek seferde dağıtılır
+    backend = get_pose_backend(profile)
+    detections = batch_executor.map(backend.detect, [image_np for _, _, image_np in pending])
+
+    for (i, exercise_type, _), landmarks in zip(pending, detections):
+        score, feedback = score_exercise(exercise_type, landmarks, profile)
+        results[i] = {"exerciseType": exercise_type, "score": score, "feedback": feedback}
+
+    return jsonify({"results": results, "summary": summarize_batch(results), "profile": profile.name})
+
+# --- Görüntüsüz Puanlama (cihazda çıkarılmış anahtar noktalar) ---
+LANDMARK_BINARY_MIMETYPE = "application/octet-stream"
+
+def parse_landmark_body(mimetype, body, exercise_type=None, points=None):
+    """
+    /score-landmarks gövdesini çözer; (kareler (n, 33, 4), tek_kare, exercise_type) döndürür.
+    - application/json: {"exerciseType": ..., "landmarks": tek kare ya da kare listesi}
+    - application/octet-stream: paketlenmiş float32 kareler; exerciseType sorgu
+      parametresinde veya X-Exercise-Type başlığında, nokta sayısı "points" sorgu
+      parametresinde (33 ya da 8). Tek karelik gövde tek kare sayılır.
+    Hatalı gövdede ValueError.
+    """
+    if mimetype == LANDMARK_BINARY_MIMETYPE:
+        try:
+            points = int(points or LANDMARK_COUNT)
+        except ValueError:
+            raise ValueError("'points' 33 ya da 8 olmalidir.")
+        frames = landmarks_from_bytes(body, points)
+        return frames, len(frames) == 1, exercise_type
+    if not isinstance(body, dict):
+        raise ValueError("Govde JSON nesnesi olmalidir.")
+    frames, single = landmarks_from_values(body.get('landmarks'))
+    return frames, single, body.get('exerciseType') or exercise_type
+
+def score_landmark_frames(frames, single, exercise_type, profile):
+    """Kareleri görüntü analiziyle aynı kurallarla puanlar; (yanıt, durum kodu) döndürür."""
+    if exercise_type not in EXERCISE_SCORERS:
+        count_rejected(exercise_type, OUTCOME_INVALID_EXERCISE)
+        return {"error": INVALID_EXERCISE_FEEDBACK}, 400
+    if len(frames) > MAX_LANDMARK_FRAMES:
+        return {"error": "En fazla {} kare gonderilebilir.".format(MAX_LANDMARK_FRAMES)}, 413
+
+    results = [{"exerciseType": exercise_type, "score": score, "feedback": feedback}
+               for score, feedback in score_exercise_frames(exercise_type, frames, profile)]
+    if single:
+        return {"score": results[0]["score"], "feedback": results[0]["feedback"], "profile": profile.name}, 200
+    return {"results": results, "summary": summarize_batch(results), "profile": profile.name}, 200
+
+@app.route('/score-landmarks', methods=['POST'])
+def score_landmarks():
+    """
+    İstemcide (ör. cihazda MediaPipe ile) çıkarılmış anahtar noktaları resim
+    göndermeden /analyze-posture ile aynı kurallarla puanlar.
+    """
+    try:
+        profile = request_profile()
+        if request.mimetype == LANDMARK_BINARY_MIMETYPE:
+            body = request.get_data(cache=False)
+        else:
+            body = request.get_json(silent=True)
+        frames, single, exercise_type = parse_landmark_body(
+            request.mimetype, body,
+            request.args.get('exerciseType') or request.headers.get('X-Exercise-Type'),
+            request.args.get('points'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response, status = score_landmark_frames(frames, single, exercise_type, profile)
+    return jsonify(response), status
+
+# --- Akış Oturumları (tekrar sayımı) ---
+session_manager = SessionManager()
+
+def read_session_frame(profile=None):
+    """Oturum karesini JSON (base64), multipart veya ham resim gövdesinden çözer."""
+    mimetype = request.mimetype
+    if mimetype == "multipart/form-data":
+        upload = request.files.get('image')
+        return decode_image_buffer(read_upload_buffer(upload), profile) if upload is not None else None
+    if mimetype in BINARY_IMAGE_MIMETYPES:
+        return decode_image_buffer(request.get_data(cache=False), profile)
+    data = request.get_json(silent=True) or {}
+    if 'image' not in data:
+        return None
+    return decode_base64_image(data['image'], profile)
+
+def open_session(exercise_type, profile=None):
+    """Yeni oturum açar; (oturum, None) ya da (None, (hata, durum kodu)) döndürür."""
+    try:
+        profile = get_profile(profile)
+    except ValueError as e:
+        return None, ({"error": str(e)}, 400)
+    try:
+        return session_manager.create(exercise_type, profile), None
+    except ValueError:
+        return None, ({"error": INVALID_EXERCISE_FEEDBACK}, 400)
+    except RuntimeError as e:
+        return None, ({"error": str(e)}, 503)
+
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    data = request.get_json(silent=True) or {}
+    session, error = open_session(data.get('exerciseType'), data.get('profile'))
+    if error:
+        return jsonify(error[0]), error[1]
+    return jsonify(session.state()), 201
+
+@app.route('/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    session = session_manager.get(session_id)
+    if session is None:
+        return jsonify({"error": "Oturum bulunamadi."}), 404
+    return jsonify(session.state())
+
+@app.route('/sessions/<session_id>/frames', methods=['POST'])
+def session_frame(session_id):
+    session = session_manager.get(session_id)
+    if session is None:
+        return jsonify({"error": "Oturum bulunamadi."}), 404
+    image_np = read_session_frame(session.profile)
+    if image_np is None:
+        return jsonify({"error": "Resim cozumlenemedi."}), 400
+    return jsonify(session.process_frame(image_np))
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def close_session(session_id):
+    session = session_manager.close(session_id)
+    if session is None:
+        return jsonify({"error": "Oturum bulunamadi."}), 404
+    return jsonify(session.state())
+
+def parse_socket_text(message):
+    """
+    WebSocket metin mesajını (kapatma_isteği, base64 resim) olarak okur. Bozuk
+    JSON ya da nesne olmayan mesaj bağlantıyı düşürmez; boş resim sayılır.
+    """
+    try:
+        payload = json.loads(message or "{}")
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        return False, ""
+    return payload.get("type") == "close", payload.get("image", "")
+
+def decode_socket_frame(decode, payload, profile):
+    """Akış karesini çözer; çözülemeyen ya da hatalı biçimli veride None."""
+    try:
+        return decode(payload, profile)
+    except (TypeError, ValueError):
+        return None
+
+if Sock is not None:
+    sock = Sock(app)
+
+    @sock.route('/sessions/ws')
+    def session_socket(ws):
+        """
+        WebSocket akış oturumu: /sessions/ws?exerciseType=squat&profile=fast
+        İkili mesajlar ham JPEG/PNG kare, metin mesajları {"image": <base64>} olarak
+        işlenir; her kare için güncel faz/tekrar durumu JSON olarak geri gönderilir.
+        """
+        session, error = open_session(request.args.get('exerciseType'), request.args.get('profile'))
+        if error:
+            ws.send(json.dumps(error[0]))
+            return
+        ws.send(json.dumps(session.state()))
+        try:
+            while True:
+                message = ws.receive()
+                if message is None:
+                    break
+                if isinstance(message, str):
+                    close, image = parse_socket_text(message)
+                    if close:
+                        break
+                    image_np = decode_socket_frame(decode_base64_image, image, session.profile)
+                else:
+                    image_np = decode_socket_frame(decode_image_buffer, message, session.profile)
+                if image_np is None:
+                    ws.send(json.dumps({"error": "Resim cozumlenemedi."}))
+                    continue
+                ws.send(json.dumps(session.process_frame(image_np)))
+        finally:
+            session_manager.close(session.session_id)
+
+@app.route('/health', methods=['GET'])
+def health():
+    status = get_pose_backend().health()
+    status["profiles"] = sorted(profile_backends)
+    status["result_cache"] = result_cache.stats()
+    status["rules"] = rule_book.stats()
+    # Ön-çatallamalı modda yanıtı veren çalışan
+    status["pid"] = os.getpid()
+    return jsonify(status), (200 if status["ok"] else 503)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metin biçiminde aşama gecikmeleri ve sayaçlar (METRICS_ENABLED=0 ise kapalı)."""
+    if not metrics.registry.enabled:
+        return jsonify({"error": "Metrikler kapali."}), 404
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.after_request
+def count_request(response):
+    if metrics.registry.enabled:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.registry.inc("http_requests_total", endpoint, request.method, str(response.status_code))
+    return response
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TherapAI postur analiz API sunucusu")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--backend", choices=["thread", "process"], default=POSE_BACKEND,
+                        help="Pose cikarim arka ucu (varsayilan: POSE_BACKEND ya da 'thread')")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Pose ornegi/calisan surec sayisi (varsayilan: POSE_POOL_SIZE / POSE_WORKERS)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="Varsayilan performans profili (varsayilan: POSE_PROFILE ya da 'balanced')")
+    return parser.parse_args(argv)
 
 if __name__ == '__main__':
+    args = parse_args()
+    init_pose_backend(args.backend, args.workers, profile=args.profile)
 
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(host=args.host, port=args.port)
\ No newline at end of file
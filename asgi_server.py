@@ -0,0 +1,399 @@
+import argparse
+import asyncio
+import contextlib
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+import api_server
+import metrics
+from api_server import (BINARY_IMAGE_MIMETYPES, EXERCISE_SCORERS, INVALID_EXERCISE_FEEDBACK,
+                        MAX_BATCH_FRAMES, OUTCOME_INVALID_EXERCISE, OUTCOME_INVALID_IMAGE,
+                        cache_result, cached_result_key, count_rejected, decode_base64_image,
+                        decode_image_buffer, decode_socket_frame, LANDMARK_BINARY_MIMETYPE,
+                        parse_landmark_body, parse_socket_text, result_cache, score_exercise,
+                        score_landmark_frames, session_manager, summarize_batch)
+from exercise_rules import rule_book
+from pose_profiles import DEFAULT_PROFILE, PROFILES, get_profile
+from inference_gate import MAX_INFERENCE_QUEUE, MAX_QUEUE_WAIT, InferenceGate, Overloaded, QueueTimeout
+
+# Asenkron (ASGI) sunum modu: istek G/Ç'si olay döngüsünde, çözme + çıkarım
+# sınırlı InferenceGate havuzunda çalışır. Çalıştırma:
+#   python asgi_server.py --port 5000          (uvicorn ile)
+#   uvicorn asgi_server:app --port 5000
+
+OVERLOADED_RESPONSE = {"error": "Sunucu yogun, daha sonra tekrar deneyin."}
+QUEUE_TIMEOUT_RESPONSE = {"error": "Istek kuyrukta zaman asimina ugradi."}
+INVALID_IMAGE_RESPONSE = {"error": "Resim cozumlenemedi."}
+
+
+def overloaded(exc):
+    """Kuyruk doluysa 429 (Retry-After ile), kuyrukta bayatladıysa 503."""
+    if isinstance(exc, Overloaded):
+        return JSONResponse(OVERLOADED_RESPONSE, status_code=429, headers={"Retry-After": "1"})
+    return JSONResponse(QUEUE_TIMEOUT_RESPONSE, status_code=503, headers={"Retry-After": "1"})
+
+
+# --- 1. Çıkarım İşleri (havuz iş parçacıklarında) ---
+
+def analyze_job(decode, payload, exercise_type, profile):
+    """Resmi çözüp puanlar; resim çözülemezse None döndürür."""
+    image_np = decode(payload, profile)
+    if image_np is None:
+        count_rejected(exercise_type, OUTCOME_INVALID_IMAGE)
+        return None
+    if exercise_type not in EXERCISE_SCORERS:
+        count_rejected(exercise_type, OUTCOME_INVALID_EXERCISE)
+        return 0.0, INVALID_EXERCISE_FEEDBACK
+    return score_exercise(exercise_type, api_server.get_pose_backend(profile).detect(image_np), profile)
+
+
+def batch_job(pending, results, profile):
+    """
+    Toplu isteğin geçerli karelerini çözüp sırayla puanlar. Toplu istek kapıda tek
+    yer tuttuğundan kareleri de tek çıkarım hattında işler; kapının saymadığı
+    paralel çıkarım, kabul edilmiş tekil istekleri havuz önünde bekletirdi.
+    """
+    decoded = []
+    for i, exercise_type, image in pending:
+        try:
+            image_np = decode_base64_image(image, profile) if isinstance(image, str) else None
+        except ValueError:
+            image_np = None
+        if image_np is None:
+            count_rejected(exercise_type, OUTCOME_INVALID_IMAGE)
+            results[i] = {"exerciseType": exercise_type, "error": INVALID_IMAGE_RESPONSE["error"]}
+            continue
+        decoded.append((i, exercise_type, image_np))
+
+    backend = api_server.get_pose_backend(profile)
+    for i, exercise_type, image_np in decoded:
+        landmarks = backend.detect(image_np)
+        score, feedback = score_exercise(exercise_type, landmarks, profile)
+        results[i] = {"exerciseType": exercise_type, "score": score, "feedback": feedback}
+
+
+def session_frame_job(session, decode, payload):
+    image_np = decode_socket_frame(decode, payload, session.profile)
+    if image_np is None:
+        return None
+    return session.process_frame(image_np)
+
+
+# --- 2. İstek Okuma ---
+
+def request_profile_name(request, fields=None):
+    """Gövde/form alanı, sorgu parametresi ya da X-Pose-Profile başlığındaki profil adı."""
+    name = fields.get("profile") if fields is not None else None
+    return name or request.query_params.get("profile") or request.headers.get("X-Pose-Profile")
+
+
+async def read_analysis_request(request):
+    """
+    Flask sürümüyle aynı üç gövde biçimini okur; (çözücü, veri, egzersiz tipi, profil adı)
+    döndürür. Veri yoksa ya da gövde okunamazsa veri None olur.
+    """
+    mimetype = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if mimetype == "multipart/form-data":
+        form = await request.form()
+        upload = form.get("image")
+        exercise_type = form.get("exerciseType") or request.query_params.get("exerciseType")
+        data = await upload.read() if upload is not None and hasattr(upload, "read") else None
+        return decode_image_buffer, data, exercise_type, request_profile_name(request, form)
+
+    if mimetype in BINARY_IMAGE_MIMETYPES:
+        exercise_type = request.query_params.get("exerciseType") or request.headers.get("X-Exercise-Type")
+        return decode_image_buffer, await request.body(), exercise_type, request_profile_name(request)
+
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return decode_base64_image, None, None, request_profile_name(request)
+    return decode_base64_image, data.get("image"), data.get("exerciseType"), request_profile_name(request, data)
+
+
+# --- 3. Uç Noktalar ---
+
+async def analyze_posture(request):
+    decode, payload, exercise_type, profile_name = await read_analysis_request(request)
+    try:
+        profile = get_profile(profile_name)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if not payload:
+        count_rejected(exercise_type, OUTCOME_INVALID_IMAGE)
+        return JSONResponse(INVALID_IMAGE_RESPONSE, status_code=400)
+
+    # Önbellekteki sonuç kuyruğa girmeden döner
+    cache_key = cached_result_key(payload, exercise_type, profile)
+    if cache_key is not None:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return JSONResponse({"score": cached[0], "feedback": cached[1], "profile": profile.name})
+
+    try:
+        result = await request.app.state.gate.run(analyze_job, decode, payload, exercise_type, profile)
+    except (Overloaded, QueueTimeout) as e:
+        return overloaded(e)
+    if result is None:
+        return JSONResponse(INVALID_IMAGE_RESPONSE, status_code=400)
+    score, feedback = result
+    cache_result(cache_key, score, feedback)
+    return JSONResponse({"score": score, "feedback": feedback, "profile": profile.name})
+
+
+async def analyze_posture_batch(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    data = data if isinstance(data, dict) else {}
+    try:
+        profile = get_profile(request_profile_name(request, data))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    frames = data.get("frames")
+    if not isinstance(frames, list) or not frames:
+        return JSONResponse({"error": "'frames' listesi bos veya eksik."}, status_code=400)
+    if len(frames) > MAX_BATCH_FRAMES:
+        return JSONResponse({"error": "En fazla {} kare gonderilebilir.".format(MAX_BATCH_FRAMES)},
+                            status_code=413)
+
+    default_exercise = data.get("exerciseType")
+    results = [None] * len(frames)
+    pending = []
+    for i, frame in enumerate(frames):
+        exercise_type = frame.get("exerciseType", default_exercise) if isinstance(frame, dict) else None
+        if exercise_type not in EXERCISE_SCORERS:
+            count_rejected(exercise_type, OUTCOME_INVALID_EXERCISE)
+            results[i] = {"exerciseType": exercise_type, "error": INVALID_EXERCISE_FEEDBACK}
+            continue
+        pending.append((i, exercise_type, frame.get("image")))
+
+    # Toplu istek kuyrukta tek iş olarak yer alır; kareleri bu yerde sırayla işlenir
+    try:
+        await request.app.state.gate.run(batch_job, pending, results, profile)
+    except (Overloaded, QueueTimeout) as e:
+        return overloaded(e)
+    return JSONResponse({"results": results, "summary": summarize_batch(results), "profile": profile.name})
+
+
+async def score_landmarks(request):
+    # Pose çıkarımı olmadığından InferenceGate'e girmez; uzun diziler olay döngüsünü
+    # bloklamasın diye puanlama iş parçacığı havuzunda yapılır
+    mimetype = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if mimetype == LANDMARK_BINARY_MIMETYPE:
+            body = await request.body()
+        else:
+            try:
+                body = await request.json()
+            except ValueError:
+                body = None
+        profile = get_profile(request_profile_name(request, body if isinstance(body, dict) else None))
+        frames, single, exercise_type = parse_landmark_body(
+            mimetype, body,
+            request.query_params.get("exerciseType") or request.headers.get("X-Exercise-Type"),
+            request.query_params.get("points"))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if len(frames) == 1:
+        response, status = score_landmark_frames(frames, single, exercise_type, profile)
+    else:
+        response, status = await run_in_threadpool(score_landmark_frames, frames, single, exercise_type, profile)
+    return JSONResponse(response, status_code=status)
+
+
+async def create_session(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    data = data if isinstance(data, dict) else {}
+    session, error = api_server.open_session(data.get("exerciseType"), request_profile_name(request, data))
+    if error:
+        return JSONResponse(error[0], status_code=error[1])
+    return JSONResponse(session.state(), status_code=201)
+
+
+async def session_resource(request):
+    session_id = request.path_params["session_id"]
+    if request.method == "DELETE":
+        session = session_manager.close(session_id)
+    else:
+        session = session_manager.get(session_id)
+    if session is None:
+        return JSONResponse({"error": "Oturum bulunamadi."}, status_code=404)
+    return JSONResponse(session.state())
+
+
+async def session_frame(request):
+    session = session_manager.get(request.path_params["session_id"])
+    if session is None:
+        return JSONResponse({"error": "Oturum bulunamadi."}, status_code=404)
+    if session.lock.locked():
+        # Önceki kare hâlâ işleniyor: bu kare bayatlayacağı için beklenmeden atılır
+        return JSONResponse({"error": "Onceki kare isleniyor, kare atildi.", "dropped": True},
+                            status_code=429, headers={"Retry-After": "0"})
+
+    decode, payload, _, _ = await read_analysis_request(request)
+    if not payload:
+        return JSONResponse(INVALID_IMAGE_RESPONSE, status_code=400)
+    try:
+        state = await request.app.state.gate.run(session_frame_job, session, decode, payload)
+    except (Overloaded, QueueTimeout) as e:
+        return overloaded(e)
+    if state is None:
+        return JSONResponse(INVALID_IMAGE_RESPONSE, status_code=400)
+    return JSONResponse(state)
+
+
+async def session_socket(websocket):
+    """
+    WebSocket akış oturumu: /sessions/ws?exerciseType=squat&profile=fast
+
+    Alıcı görev gelen kareleri okur ve yalnızca en yenisini tutar; işleme
+    sürerken gelen eski kareler atılır (latest-frame-wins). Her yanıtta o ana
+    kadar atılan kare sayısı droppedFrames alanında döner.
+    """
+    await websocket.accept()
+    session, error = api_server.open_session(websocket.query_params.get("exerciseType"),
+                                             websocket.query_params.get("profile"))
+    if error:
+        await websocket.send_json(error[0])
+        await websocket.close()
+        return
+    await websocket.send_json(session.state())
+
+    gate = websocket.app.state.gate
+    latest = []  # en fazla bir bekleyen kare: (çözücü, veri)
+    ready = asyncio.Event()
+    state = {"closed": False, "dropped": 0}
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    frame = (decode_image_buffer, message["bytes"])
+                else:
+                    close, image = parse_socket_text(message.get("text"))
+                    if close:
+                        break
+                    frame = (decode_base64_image, image)
+                if latest:
+                    state["dropped"] += 1
+                    latest[0] = frame
+                else:
+                    latest.append(frame)
+                ready.set()
+        finally:
+            state["closed"] = True
+            ready.set()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            await ready.wait()
+            ready.clear()
+            if not latest:
+                if state["closed"]:
+                    break
+                continue
+            decode, payload = latest.pop()
+            try:
+                result = await gate.run(session_frame_job, session, decode, payload)
+            except (Overloaded, QueueTimeout) as e:
+                result = dict(OVERLOADED_RESPONSE if isinstance(e, Overloaded) else QUEUE_TIMEOUT_RESPONSE,
+                              dropped=True)
+            if result is None:
+                result = dict(INVALID_IMAGE_RESPONSE)
+            result["droppedFrames"] = state["dropped"]
+            await websocket.send_json(result)
+    except (WebSocketDisconnect, RuntimeError):
+        # İstemci yanıtı beklemeden bağlantıyı kapattı
+        pass
+    finally:
+        receiver.cancel()
+        with contextlib.suppress(asyncio.CancelledError, WebSocketDisconnect):
+            await receiver
+        session_manager.close(session.session_id)
+        with contextlib.suppress(RuntimeError):
+            await websocket.close()
+
+
+async def health(request):
+    status = api_server.get_pose_backend().health()
+    status["profiles"] = sorted(api_server.profile_backends)
+    status["result_cache"] = result_cache.stats()
+    status["rules"] = rule_book.stats()
+    status["queue"] = request.app.state.gate.health()
+    return JSONResponse(status, status_code=200 if status["ok"] else 503)
+
+
+async def metrics_endpoint(request):
+    if not metrics.registry.enabled:
+        return JSONResponse({"error": "Metrikler kapali."}, status_code=404)
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+# --- 4. Uygulama ---
+
+def create_app(backend=api_server.POSE_BACKEND, workers=None, max_queue=MAX_INFERENCE_QUEUE,
+               max_wait=MAX_QUEUE_WAIT, profile=DEFAULT_PROFILE):
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        pose_backend = api_server.init_pose_backend(backend, workers, profile=profile)
+        app.state.gate = InferenceGate(pose_backend.size, max_queue=max_queue, max_wait=max_wait)
+        try:
+            yield
+        finally:
+            app.state.gate.shutdown()
+            api_server.close_pose_backends()
+
+    routes = [
+        Route("/analyze-posture", analyze_posture, methods=["POST"]),
+        Route("/analyze-posture/batch", analyze_posture_batch, methods=["POST"]),
+        Route("/score-landmarks", score_landmarks, methods=["POST"]),
+        Route("/sessions", create_session, methods=["POST"]),
+        WebSocketRoute("/sessions/ws", session_socket),
+        Route("/sessions/{session_id}", session_resource, methods=["GET", "DELETE"]),
+        Route("/sessions/{session_id}/frames", session_frame, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+app = create_app()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TherapAI postur analiz API sunucusu (asenkron/ASGI)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--backend", choices=["thread", "process"], default=api_server.POSE_BACKEND)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Pose ornegi/calisan surec sayisi (varsayilan: POSE_POOL_SIZE / POSE_WORKERS)")
+    parser.add_argument("--max-queue", type=int, default=MAX_INFERENCE_QUEUE,
+                        help="Calisanlarin disinda bekleyebilecek en fazla istek (asilinca 429)")
+    parser.add_argument("--max-wait", type=float, default=MAX_QUEUE_WAIT,
+                        help="Kuyrukta en fazla bekleme suresi, saniye (asilinca 503)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="Varsayilan performans profili (varsayilan: POSE_PROFILE ya da 'balanced')")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parse_args()
+    uvicorn.run(create_app(args.backend, args.workers, args.max_queue, args.max_wait, args.profile),
+                host=args.host, port=args.port)
@@ -0,0 +1,670 @@
+import argparse
+import base64
+import glob
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from importlib.util import find_spec
+
+import numpy as np
+import cv2
+
+from pose_landmarks import LANDMARK_COUNT, LANDMARK_FIELDS, LandmarkBuffer
+from pose_geometry import (LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP,
+                           LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE, compute_angles)
+from adaptive_rate import IDLE_INFERENCE_INTERVAL, AdaptiveInference
+from image_decode import decode_image
+from pose_profiles import PROFILES, get_profile
+from pose_roi import PersonRoiTracker
+from exercise_rules import rule_book
+from landmark_filters import FILTERS, create_filter
+from rep_engine import ANALYZERS, create_analyzer
+
+# Kamerasız çalışan performans ölçüm aracı.
+# Kareler: sentetik ya da kayıtlı (.npy) anahtar nokta dizileri ve images/ altındaki JPEG'ler.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_IMAGES = os.path.join(ROOT, "images", "*.jpg")
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+# Sentetik karede bacak ve gövde uzunlukları (normalize)
+SEGMENT_SHIN = 0.2
+SEGMENT_THIGH = 0.2
+SEGMENT_TRUNK = 0.25
+
+
+# --- 1. Anahtar Nokta Fikstürleri ---
+
+def _chain(knee_deg, hip_deg, trunk_deg, knee_spread):
+    """Ayak bileği→diz→kalça→omuz zincirinden (frames, 33, 4) kareler üretir."""
+    a, b, c = np.radians(knee_deg), np.radians(hip_deg), np.radians(trunk_deg)
+    ax, ay = 0.5, 0.9
+    kx, ky = ax + SEGMENT_SHIN * np.sin(a), ay - SEGMENT_SHIN * np.cos(a)
+    hx, hy = kx - SEGMENT_THIGH * np.sin(b), ky - SEGMENT_THIGH * np.cos(b)
+    sx, sy = hx + SEGMENT_TRUNK * np.sin(c), hy - SEGMENT_TRUNK * np.cos(c)
+
+    frames = np.zeros((len(a), LANDMARK_COUNT, LANDMARK_FIELDS), dtype=np.float32)
+    frames[:, :, :2] = 0.5
+    frames[:, :, 3] = 0.1
+    points = {
+        LEFT_SHOULDER: (sx, sy), RIGHT_SHOULDER: (sx, sy),
+        LEFT_HIP: (hx, hy), RIGHT_HIP: (hx, hy),
+        LEFT_KNEE: (kx - knee_spread, ky), RIGHT_KNEE: (kx + knee_spread, ky),
+        LEFT_ANKLE: (ax - knee_spread, ay), RIGHT_ANKLE: (ax + knee_spread, ay),
+    }
+    for idx, (x, y) in points.items():
+        frames[:, idx, 0] = x
+        frames[:, idx, 1] = y
+        frames[:, idx, 3] = 0.99
+    return frames
+
+
+def _rep_profile(reps, frames, hold_start, hold_top):
+    """0 (başlangıç) ile 1 (uç nokta) arasında gidip gelen tekrar eğrisi."""
+    ramp = np.arange(frames) / frames
+    one = np.concatenate([np.zeros(hold_start), ramp, np.ones(hold_top), 1 - ramp])
+    return np.concatenate([np.tile(one, reps), np.zeros(hold_start)])
+
+
+def synthetic_squat(reps=3, frames=40, depth=0.7, noise=0.0, seed=0):
+    t = _rep_profile(reps, frames, 15, 10) * depth
+    seq = _chain(t * 50, t * 100, t * 30, 0.03)
+    return _add_noise(seq, noise, seed)
+
+
+def synthetic_deadlift(reps=3, frames=40, noise=0.0, seed=0):
+    # Deadlift başlangıcı alt pozisyondur: 1 - eğri
+    t = 1 - _rep_profile(reps, frames, 10, 10)
+    seq = _chain(t * 35, t * 100, t * 60, 0.0)
+    return _add_noise(seq, noise, seed)
+
+
+def _add_noise(seq, noise, seed):
+    if noise:
+        rng = np.random.default_rng(seed)
+        seq[..., :2] += rng.normal(0.0, noise, seq[..., :2].shape).astype(np.float32)
+    return seq
+
+
+SYNTHETIC_FIXTURES = {
+    "squat": synthetic_squat,
+    "deadlift": synthetic_deadlift,
+}
+
+
+def load_fixture(path):
+    """Kayıtlı (frames, 33, 4) .npy fikstürü; kişi olmayan kareler NaN ile saklanır (None döner)."""
+    seq = np.load(path).astype(np.float32, copy=False)
+    return [None if np.isnan(frame[0, 0]) else frame for frame in seq]
+
+
+def record_fixture(video_path, output_path, model_complexity=1):
+    """Videodaki anahtar noktaları .npy fikstürü olarak kaydeder; kare sayısını döndürür."""
+    import mediapipe as mp
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError("Video acilamadi: {}".format(video_path))
+    landmark_buffer = LandmarkBuffer()
+    frames = []
+    with mp.solutions.pose.Pose(static_image_mode=False, model_complexity=model_complexity) as pose:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            landmarks = landmark_buffer.fill(results)
+            if landmarks is None:
+                frames.append(np.full((LANDMARK_COUNT, LANDMARK_FIELDS), np.nan, dtype=np.float32))
+            else:
+                frames.append(landmarks.copy())
+    cap.release()
+    np.save(output_path, np.stack(frames) if frames else
+            np.empty((0, LANDMARK_COUNT, LANDMARK_FIELDS), dtype=np.float32))
+    return len(frames)
+
+
+# --- 2. Ölçüm Yardımcıları ---
+
+def summarize(samples):
+    """Saniye cinsinden örneklerden ms yüzdelikleri ve saniyedeki işlem sayısı."""
+    ms = np.asarray(samples) * 1000.0
+    total = float(np.sum(samples))
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p90_ms": round(float(np.percentile(ms, 90)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+        "throughput_per_s": round(len(ms) / total, 1) if total else None,
+    }
+
+
+def measure(fn, items, repeat=1, warmup=1):
+    """fn(item) çağrılarını tek tek ölçer; ilk warmup tur sonuçlara katılmaz."""
+    timer = time.perf_counter
+    for _ in range(warmup):
+        for item in items:
+            fn(item)
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            start = timer()
+            fn(item)
+            samples.append(timer() - start)
+    return summarize(samples)
+
+
+def load_images(pattern):
+    images = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "rb") as f:
+            data = f.read()
+        if cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) is not None:
+            images.append((os.path.basename(path), data))
+    return images
+
+
+# --- 3. Aşamalar ---
+
+def bench_phase_machines(fixtures, repeat):
+    results = {}
+    for exercise, seq in fixtures.items():
+        # Önce tek geçişte sayılan tekrar (fikstürün doğruluğu için)
+        analyzer = create_analyzer(exercise)
+        for frame in seq:
+            analyzer.update(frame, 640, 480)
+        reps = analyzer.reps
+        analyzer.reset()
+
+        stats = measure(lambda frame: analyzer.update(frame, 640, 480), seq, repeat=repeat)
+        stats["reps_per_pass"] = reps
+        results["phase_machine.{}".format(exercise)] = stats
+    return results
+
+
+def bench_filters(fixtures, repeat):
+    """Her zamansal filtrenin kare başına maliyeti ve filtreli analizörün saydığı tekrar."""
+    results = {}
+    for exercise, seq in fixtures.items():
+        frames = [frame for frame in seq if frame is not None]
+        for name in ["none"] + sorted(FILTERS):
+            analyzer = create_analyzer(exercise, landmark_filter=name)
+            for frame in seq:
+                analyzer.update(frame, 640, 480)
+            landmark_filter = create_filter(name)
+            if landmark_filter is None:
+                stats = {"reps_per_pass": analyzer.reps}
+            else:
+                stats = measure(landmark_filter.process, frames, repeat=repeat)
+                stats["reps_per_pass"] = analyzer.reps
+            results["filter.{}.{}".format(name, exercise)] = stats
+    return results
+
+
+def bench_adaptive(fixtures, interval):
+    """Her kare çıkarım ile uyarlamalı çıkarımın tekrar sayılarını ve çıkarım oranını karşılaştırır."""
+    results = {}
+    for exercise, seq in fixtures.items():
+        analyzer = create_analyzer(exercise)
+        for frame in seq:
+            analyzer.update(frame, 640, 480)
+        full_reps = analyzer.reps
+
+        analyzer = create_analyzer(exercise)
+        scheduler = AdaptiveInference(analyzer, interval, enabled=True)
+        for frame in seq:
+            analyzer.update(scheduler.process(lambda: frame), 640, 480)
+        stats = scheduler.stats()
+        results["adaptive.{}".format(exercise)] = {
+            "interval": interval,
+            "reps_full": full_reps,
+            "reps_adaptive": analyzer.reps,
+            "inference_ratio": round(stats["inferredFrames"] / max(1, stats["frames"]), 3),
+        }
+    return results
+
+
+def bench_geometry(fixtures, repeat):
+    import api_server
+
+    results = {}
+    for exercise, seq in fixtures.items():
+        frames = [frame for frame in seq if frame is not None]
+        scorer = api_server.EXERCISE_SCORERS[exercise]
+        results["score_landmarks.{}".format(exercise)] = measure(scorer, frames, repeat=repeat)
+
+        # Tüm dizinin açıları tek çağrıda: kare başına maliyet
+        stack = np.stack(frames)
+        batch = measure(compute_angles, [stack], repeat=max(repeat, 20))
+        batch["per_frame_us"] = round(batch["mean_ms"] * 1000.0 / len(stack), 3)
+        results["compute_angles.{}".format(exercise)] = batch
+
+        # Kural dosyasından derlenen skorlayıcı: tüm dizi tek çağrıda
+        rules = rule_book.get(exercise)
+        batch = measure(rules.score_frames, [stack], repeat=max(repeat, 20))
+        batch["per_frame_us"] = round(batch["mean_ms"] * 1000.0 / len(stack), 3)
+        results["score_frames.{}".format(exercise)] = batch
+    return results
+
+
+def bench_images(images, repeat, backend, workers):
+    import api_server
+    import mediapipe as mp
+
+    results = {}
+    buffers = [np.frombuffer(data, np.uint8) for _, data in images]
+    results["decode"] = measure(lambda buf: cv2.imdecode(buf, cv2.IMREAD_COLOR), buffers, repeat=repeat)
+    # Sunucunun kullandığı başlığa göre küçültülmüş çözme (IMAGE_DECODE_TARGET_SIZE)
+    results["decode_reduced"] = measure(decode_image, buffers, repeat=repeat)
+
+    decoded = [cv2.imdecode(buf, cv2.IMREAD_COLOR) for buf in buffers]
+    results["color_convert"] = measure(lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2RGB), decoded, repeat=repeat)
+
+    rgb = [cv2.cvtColor(img, cv2.COLOR_BGR2RGB) for img in decoded]
+    with mp.solutions.pose.Pose(static_image_mode=True, min_detection_confidence=0.5) as pose:
+        results["pose_process"] = measure(pose.process, rgb, repeat=repeat)
+
+    api_server.init_pose_backend(backend, workers)
+    results["analyze_squat_posture"] = measure(api_server.analyze_squat_posture, decoded, repeat=repeat)
+    results["analyze_deadlift_posture"] = measure(api_server.analyze_deadlift_posture, decoded, repeat=repeat)
+
+    client = api_server.app.test_client()
+    payloads = [{"image": base64.b64encode(data).decode("ascii"), "exerciseType": "squat"}
+                for _, data in images]
+    # Tekrarlanan ölçümler sonuç önbelleğinden dönmesin; önbellek ayrıca ölçülür
+    cache_bytes = api_server.result_cache.max_bytes
+    api_server.result_cache.max_bytes = 0
+    try:
+        results["endpoint.json"] = measure(
+            lambda body: client.post("/analyze-posture", json=body), payloads, repeat=repeat)
+        results["endpoint.raw"] = measure(
+            lambda item: client.post("/analyze-posture?exerciseType=squat", data=item[1],
+                                     content_type="image/jpeg"), images, repeat=repeat)
+    finally:
+        api_server.result_cache.max_bytes = cache_bytes
+    if api_server.result_cache.enabled:
+        api_server.result_cache.clear()
+        results["endpoint.json_cached"] = measure(
+            lambda body: client.post("/analyze-posture", json=body), payloads, repeat=repeat)
+    api_server.pose_backend.close()
+    return results
+
+
+def bench_profiles(images, names, reference, repeat):
+    """
+    Her profil için çözme + çıkarım gecikmesini ve referans profile göre doğruluğu
+    ölçer: kişi tespiti uyumu, iki profilde de görünen noktaların ortalama konum
+    farkı (kare köşegeninin yüzdesi) ve egzersiz skorlarının ortalama mutlak farkı.
+    Modeli yüklenemeyen profil (ör. indirilemeyen lite/heavy model) hata ile raporlanır.
+    """
+    import api_server
+    from pose_pool import PosePool
+
+    sizes = []
+    for _, data in images:
+        height, width = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR).shape[:2]
+        sizes.append((width, height))
+
+    results = {}
+    outputs = {}
+    for name in names:
+        profile = get_profile(name)
+        key = "profile.{}".format(name)
+        try:
+            pool = PosePool(size=1, **profile.pose_kwargs(static_image_mode=True))
+        except Exception as e:
+            results[key] = {"error": "{}: {}".format(type(e).__name__, e)}
+            continue
+
+        def run(item):
+            return pool.detect(api_server.decode_image_buffer(item[1], profile))
+
+        try:
+            stats = measure(run, images, repeat=repeat)
+            landmarks = [run(item) for item in images]
+        finally:
+            pool.close()
+        stats["detected"] = sum(1 for found in landmarks if found is not None)
+        stats["settings"] = {field: value for field, value in profile._asdict().items() if field != "name"}
+        results[key] = stats
+        outputs[name] = landmarks
+
+    if reference not in outputs:
+        reference = "balanced" if "balanced" in outputs else next(iter(outputs), None)
+    if reference is None:
+        return results
+    reference_profile = get_profile(reference)
+    for name, landmarks in outputs.items():
+        if name == reference:
+            continue
+        profile = get_profile(name)
+        agree = 0
+        errors = []
+        score_diffs = {exercise: [] for exercise in api_server.EXERCISE_SCORERS}
+        for found, expected, (width, height) in zip(landmarks, outputs[reference], sizes):
+            agree += (found is None) == (expected is None)
+            if found is not None and expected is not None:
+                visible = (found[:, 3] > 0.5) & (expected[:, 3] > 0.5)
+                if visible.any():
+                    offset = np.hypot((found[visible, 0] - expected[visible, 0]) * width,
+                                      (found[visible, 1] - expected[visible, 1]) * height)
+                    errors.append(float(offset.mean()) / np.hypot(width, height) * 100.0)
+            for exercise, scorer in api_server.EXERCISE_SCORERS.items():
+                score = scorer(found, profile.visibility(exercise))[0]
+                expected_score = scorer(expected, reference_profile.visibility(exercise))[0]
+                score_diffs[exercise].append(abs(score - expected_score))
+        results["profile.{}".format(name)]["vs_reference"] = {
+            "reference": reference,
+            "detection_agreement": round(agree / len(landmarks), 3),
+            "landmark_error_pct_of_diagonal": round(float(np.mean(errors)), 3) if errors else None,
+            "score_mean_abs_diff": {exercise: round(float(np.mean(diffs)), 2)
+                                    for exercise, diffs in score_diffs.items()},
+        }
+    return results
+
+
+ANGLE_NAMES = ("knee_angle", "hip_angle", "trunk_lean", "trunk_horizontal", "knee_distance")
+
+
+def read_video(path, max_frames):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def bench_roi(video_path, max_frames):
+    """
+    Aynı video karelerini tam kare ve kişi kırpmasıyla (PersonRoiTracker) işler;
+    kare başına gecikmeyi ve iki yolun açıları arasındaki farkı raporlar.
+    """
+    import mediapipe as mp
+
+    frames = read_video(video_path, max_frames)
+    if not frames:
+        raise IOError("Video okunamadi: {}".format(video_path))
+    height, width = frames[0].shape[:2]
+
+    results = {}
+    outputs = {}
+    for name, enabled in (("full_frame", False), ("tracked", True)):
+        tracker = PersonRoiTracker(enabled=enabled)
+        landmark_buffer = LandmarkBuffer()
+        landmarks = []
+        with mp.solutions.pose.Pose(static_image_mode=False, model_complexity=1) as pose:
+            def run(frame):
+                found = tracker.process(pose, frame, landmark_buffer)
+                landmarks.append(None if found is None else found.copy())
+
+            stats = measure(run, frames, warmup=0)
+        stats["tracker"] = tracker.stats()
+        results["roi.{}".format(name)] = stats
+        outputs[name] = landmarks
+
+    both = [i for i, (a, b) in enumerate(zip(outputs["full_frame"], outputs["tracked"]))
+            if a is not None and b is not None]
+    comparison = {"frames": len(frames), "compared": len(both)}
+    if both:
+        full = np.stack([outputs["full_frame"][i] for i in both])
+        tracked = np.stack([outputs["tracked"][i] for i in both])
+        diff = np.abs(compute_angles(full, width=width, height=height) -
+                      compute_angles(tracked, width=width, height=height))
+        comparison["mean_abs_diff"] = dict(zip(ANGLE_NAMES, np.round(diff.mean(axis=0), 3).tolist()))
+        comparison["max_abs_diff"] = dict(zip(ANGLE_NAMES, np.round(diff.max(axis=0), 3).tolist()))
+        visible = (full[..., 3] > 0.5) & (tracked[..., 3] > 0.5)
+        offset = np.hypot((full[..., 0] - tracked[..., 0]) * width, (full[..., 1] - tracked[..., 1]) * height)
+        comparison["visible_point_mean_px_diff"] = round(float(offset[visible].mean()), 2) if visible.any() else None
+    results["roi.comparison"] = comparison
+    return results
+
+
+# Açılış ölçümünde başlatılan sunucular (betik ve argümanlar; --host/--port eklenir)
+STARTUP_SERVERS = {
+    "api_server": ["api_server.py", "--workers", "1"],
+    "asgi_server": ["asgi_server.py", "--workers", "1"],
+    "prefork_server": ["prefork_server.py", "--workers", "2"],
+}
+# Ayrı süreçte içe aktarma süresi ölçülen modüller
+STARTUP_IMPORTS = ("api_server", "asgi_server", "video_batch", "mediapipe")
+# Sunucunun ilk yanıtı için en uzun bekleme (saniye)
+STARTUP_TIMEOUT = 120.0
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(url, body=None):
+    """JSON isteği; bağlantı kurulamazsa None, aksi halde (durum, gövde)."""
+    data = None if body is None else json.dumps(body).encode("utf-8")
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+
+def _wait_health(base, proc, deadline, accept=lambda status: True):
+    """/health 200 dönene (ve accept kabul edene) kadar 10 ms aralıkla yoklar."""
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("Sunucu acilista sonlandi (cikis {})".format(proc.returncode))
+        reply = _request(base + "/health")
+        if reply is not None and reply[0] == 200 and accept(reply[1]):
+            return reply[1]
+        time.sleep(0.01)
+    raise TimeoutError("Sunucu {} sn icinde yanit vermedi".format(STARTUP_TIMEOUT))
+
+
+def measure_import(module):
+    """Modülü temiz bir Python sürecinde içe aktarır; (süre, mediapipe yüklendi mi)."""
+    code = ("import sys, time; start = time.perf_counter(); import {}; "
+            "print(time.perf_counter() - start, 'mediapipe' in sys.modules)").format(module)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                         check=True).stdout.split()
+    return float(out[-2]), out[-1] == "True"
+
+
+def measure_server_start(command, payload, respawn=False):
+    """
+    Sunucuyu başlatır; sürecin başlangıcından ilk /health 200 ve ilk
+    /analyze-posture yanıtına kadar geçen süreleri (saniye) döndürür. respawn
+    ise (ön-çatallamalı sunucu) bir çalışan öldürülür ve yerine gelenin ilk
+    yanıtına kadar geçen süre de ölçülür.
+    """
+    base = "http://127.0.0.1:{}".format(_free_port())
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable] + command + ["--host", "127.0.0.1", "--port", base.rsplit(":", 1)[1]],
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + STARTUP_TIMEOUT
+        _wait_health(base, proc, deadline)
+        result = {"health": time.perf_counter() - start}
+        status, _ = _request(base + "/analyze-posture", payload)
+        if status != 200:
+            raise RuntimeError("/analyze-posture {} dondu".format(status))
+        result["first_response"] = time.perf_counter() - start
+
+        children_path = "/proc/{0}/task/{0}/children".format(proc.pid)
+        if respawn and os.path.exists(children_path):
+            with open(children_path) as f:
+                before = set(f.read().split())
+            victim = int(min(before))
+            killed = time.perf_counter()
+            os.kill(victim, signal.SIGKILL)
+            _wait_health(base, proc, killed + STARTUP_TIMEOUT,
+                         accept=lambda status: str(status.get("pid")) not in before)
+            result["respawn"] = time.perf_counter() - killed
+        return result
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def bench_startup(images, runs):
+    """
+    Açılış süresi: modüllerin temiz süreçte içe aktarılması ve her sunucunun
+    süreç başlangıcından ilk yanıta (time-to-first-response) kadar geçen süresi.
+    """
+    results = {}
+    for module in STARTUP_IMPORTS:
+        samples, loaded = [], False
+        for _ in range(runs):
+            seconds, loaded = measure_import(module)
+            samples.append(seconds)
+        stats = summarize(samples)
+        stats["imports_mediapipe"] = loaded
+        results["startup.import.{}".format(module)] = stats
+
+    if images:
+        data = images[0][1]
+    else:
+        data = cv2.imencode(".jpg", np.zeros((480, 640, 3), dtype=np.uint8))[1].tobytes()
+    payload = {"image": base64.b64encode(data).decode("ascii"), "exerciseType": "squat"}
+
+    for name, command in STARTUP_SERVERS.items():
+        if name == "asgi_server" and find_spec("uvicorn") is None:
+            continue
+        prefork = name == "prefork_server"
+        samples = {}
+        for _ in range(runs):
+            for key, seconds in measure_server_start(command, payload, respawn=prefork).items():
+                samples.setdefault(key, []).append(seconds)
+        for key, values in samples.items():
+            results["startup.{}.{}".format(name, key)] = summarize(values)
+    return results
+
+
+# --- 4. Komut Satırı ---
+
+def environment():
+    import mediapipe as mp
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "mediapipe": mp.__version__,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Postur analiz hattinin asama bazli performans olcumu.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON sonuc dosyasi")
+    parser.add_argument("--images", default=DEFAULT_IMAGES, help="Ornek resimler icin glob deseni")
+    parser.add_argument("--repeat", type=int, default=5, help="Her olcumun tekrar sayisi")
+    parser.add_argument("--fixture", action="append", default=[], metavar="EGZERSIZ=DOSYA.npy",
+                        help="Kayitli anahtar nokta fiksturu (sentetik fiksturun yerine gecer)")
+    parser.add_argument("--noise", type=float, default=0.001, help="Sentetik karelere eklenen gurultu")
+    parser.add_argument("--skip-images", action="store_true",
+                        help="Resim/Pose asamalarini atla (yalnizca geometri ve faz makineleri)")
+    parser.add_argument("--backend", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--adaptive-interval", type=int, default=IDLE_INFERENCE_INTERVAL,
+                        help="Uyarlamali cikarimda sakin fazlarda her kacinci karenin islenecegi")
+    parser.add_argument("--profiles", default="", metavar="fast,balanced,accurate",
+                        help="Hiz/dogruluk degerlendirmesi yapilacak profiller (virgulle ayrilmis)")
+    parser.add_argument("--profile-reference", default="accurate", choices=sorted(PROFILES),
+                        help="Dogruluk karsilastirmasinda referans alinan profil")
+    parser.add_argument("--video", help="Kisi kirpmasi (ROI) karsilastirmasi icin video")
+    parser.add_argument("--video-frames", type=int, default=300, help="Videodan okunacak en fazla kare")
+    parser.add_argument("--record", nargs=2, metavar=("VIDEO", "DOSYA.npy"),
+                        help="Videodan fikstur kaydet ve cik")
+    parser.add_argument("--startup", action="store_true",
+                        help="Acilis suresi: ice aktarma ve sunuculardan ilk yanita kadar gecen sure")
+    parser.add_argument("--startup-runs", type=int, default=3, help="Acilis olcumunun tekrar sayisi")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.record:
+        count = record_fixture(*args.record)
+        print("{} kare kaydedildi: {}".format(count, args.record[1]))
+        return 0
+
+    fixtures = {name: list(make(noise=args.noise)) for name, make in SYNTHETIC_FIXTURES.items()}
+    sources = {name: "synthetic" for name in fixtures}
+    for item in args.fixture:
+        exercise, _, path = item.partition("=")
+        if exercise not in ANALYZERS or not path:
+            print("Gecersiz fikstur: {}".format(item), file=sys.stderr)
+            return 2
+        fixtures[exercise] = load_fixture(path)
+        sources[exercise] = path
+
+    profiles = [name for name in args.profiles.split(",") if name]
+    for name in profiles:
+        if name not in PROFILES:
+            print("Gecersiz profil: {}".format(name), file=sys.stderr)
+            return 2
+
+    stages = {}
+    stages.update(bench_phase_machines(fixtures, args.repeat))
+    stages.update(bench_filters(fixtures, args.repeat))
+    stages.update(bench_geometry(fixtures, args.repeat))
+    stages.update(bench_adaptive(fixtures, args.adaptive_interval))
+
+    images = [] if args.skip_images else load_images(args.images)
+    if images:
+        stages.update(bench_images(images, args.repeat, args.backend, args.workers))
+    if images and profiles:
+        stages.update(bench_profiles(images, profiles, args.profile_reference, args.repeat))
+    if args.video:
+        stages.update(bench_roi(args.video, args.video_frames))
+    if args.startup:
+        stages.update(bench_startup(images, args.startup_runs))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "config": {
+            "repeat": args.repeat,
+            "backend": args.backend,
+            "workers": args.workers,
+            "images": [name for name, _ in images],
+            "fixtures": {name: {"source": sources[name], "frames": len(seq)} for name, seq in fixtures.items()},
+        },
+        "stages": stages,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    width = max(len(name) for name in stages)
+    for name, stats in stages.items():
+        if "p50_ms" not in stats:
+            print("{:<{w}}  {}".format(name, json.dumps(stats, ensure_ascii=False), w=width))
+            continue
+        print("{:<{w}}  p50 {:>9.3f} ms  p99 {:>9.3f} ms  {:>10} /s".format(
+            name, stats["p50_ms"], stats["p99_ms"], stats["throughput_per_s"], w=width))
+    print("Sonuclar yazildi: {}".format(args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
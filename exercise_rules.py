@@ -0,0 +1,407 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Mapping
+from types import SimpleNamespace
+
+import numpy as np
+
+import pose_geometry
+from pose_geometry import (LEFT_KNEE, RIGHT_KNEE, angle_2d, angle_between, calculate_distance,
+                           trunk_angle_horizontal, trunk_angle_vertical, vector_angles)
+from pose_landmarks import NO_SIDE, SIDE_INDICES, VISIBILITY, X, Y, select_side, select_sides
+
+try:
+    import yaml
+except ImportError:  # PyYAML kurulu değilse yalnızca JSON kural dosyaları okunur
+    yaml = None
+
+# Egzersiz kuralları (skorlama aralıkları ve tekrar sayıcı eşikleri) bu dosyadan okunur
+EXERCISE_RULES_PATH = os.environ.get(
+    "EXERCISE_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "exercise_rules.json"))
+# Dosya değişikliğinin en fazla kaç saniyede bir kontrol edileceği (0: yeniden yükleme kapalı)
+RULES_RELOAD_INTERVAL = float(os.environ.get("EXERCISE_RULES_RELOAD", "2"))
+
+NO_PERSON_FEEDBACK = "{label} için kişi algilanamadi."
+MISSING_LANDMARKS_FEEDBACK = "{label} için yeterli anahtar nokta algilanamadi. Lütfen kadraja tam girin."
+ERROR_FEEDBACK = "{label} analizi sirasinda hata olustu: {error}"
+IMPROVE_PREFIX = "Formda iyilestirme gerek: "
+
+
+# --- 1. Metrikler ---
+# Her metriğin iki biçimi vardır: tek kare için math ile skaler hızlı yol ve çok
+# kare için (m, 4, 2) taraf noktaları + (m, 33, 2) tüm noktalardan (m,) dizi.
+# Taraf noktaları sırası: omuz, kalça, diz, ayak bileği.
+
+def _knee_distance(points, xy):
+    delta = xy[:, LEFT_KNEE] - xy[:, RIGHT_KNEE]
+    return np.hypot(delta[:, 0], delta[:, 1])
+
+
+METRICS = {
+    "knee_angle": (
+        lambda p, lm: angle_2d(p[1][0], p[1][1], p[2][0], p[2][1], p[3][0], p[3][1]),
+        lambda points, xy: angle_between(points[:, 1], points[:, 2], points[:, 3])),
+    "hip_angle": (
+        lambda p, lm: angle_2d(p[0][0], p[0][1], p[1][0], p[1][1], p[2][0], p[2][1]),
+        lambda points, xy: angle_between(points[:, 0], points[:, 1], points[:, 2])),
+    # Omuzdan kalçaya vektörün aşağı dikeyle açısı (dik duruşta 0)
+    "trunk_angle": (
+        lambda p, lm: trunk_angle_vertical(p[1][0] - p[0][0], p[1][1] - p[0][1]),
+        lambda points, xy: vector_angles(points[:, 1] - points[:, 0], 0.0, 1.0)),
+    # Kalçadan omuza vektörün aşağı dikeyle açısı (dik duruşta 180)
+    "trunk_angle_vertical": (
+        lambda p, lm: trunk_angle_vertical(p[0][0] - p[1][0], p[0][1] - p[1][1]),
+        lambda points, xy: vector_angles(points[:, 0] - points[:, 1], 0.0, 1.0)),
+    "trunk_horizontal": (
+        lambda p, lm: trunk_angle_horizontal(p[0][0] - p[1][0], p[0][1] - p[1][1]),
+        lambda points, xy: vector_angles(points[:, 0] - points[:, 1], 1.0, 0.0)),
+    "knee_distance": (
+        lambda p, lm: calculate_distance(lm[LEFT_KNEE, :2].tolist(), lm[RIGHT_KNEE, :2].tolist()),
+        _knee_distance),
+    "hip_shoulder_dx": (
+        lambda p, lm: p[1][0] - p[0][0],
+        lambda points, xy: points[:, 1, 0] - points[:, 0, 0]),
+}
+
+
+# --- 2. Kural Derleme ---
+
+def _invalid(exercise, message):
+    return ValueError("Gecersiz kural tanimi ({}): {}".format(exercise, message))
+
+
+class CompiledCheck:
+    """
+    Bir metriğin sıralı aralıkları (bands). Değeri kapsayan ilk aralık seçilir;
+    min/max verilmeyen aralık "diğer her durum" anlamına gelir. Sınırlar sayı,
+    eşik adı ya da {"metric": ad, "scale": k} (kare başına başka bir metrik) olabilir.
+    """
+
+    __slots__ = ("metric", "bounds", "requires", "scores", "issues", "floors", "messages",
+                 "score_list", "issue_list", "floor_list")
+
+    def __init__(self, exercise, spec, thresholds):
+        self.metric = spec.get("metric")
+        if self.metric not in METRICS:
+            raise _invalid(exercise, "bilinmeyen metrik {!r}".format(self.metric))
+        bands = spec.get("bands")
+        if not isinstance(bands, list) or not bands:
+            raise _invalid(exercise, "{} icin 'bands' listesi bos".format(self.metric))
+        if not all(isinstance(band, dict) for band in bands):
+            raise _invalid(exercise, "{} icin her aralik nesne olmalidir".format(self.metric))
+        try:
+            self.requires = [getattr(pose_geometry, name) for name in spec.get("requires_visible", ())]
+        except AttributeError as e:
+            raise _invalid(exercise, "bilinmeyen anahtar nokta: {}".format(e))
+
+        self.bounds = [(self._bound(exercise, band.get("min"), thresholds),
+                        self._bound(exercise, band.get("max"), thresholds)) for band in bands]
+        if self.bounds[-1] != (None, None):
+            # Hiçbir aralığa girmeyen değer sıfır puan alır
+            bands = bands + [{"score": 0}]
+            self.bounds.append((None, None))
+        # Son sütun: requires_visible sağlanmadığında kontrol atlanır (tam puan, mesaj yok)
+        self.scores = np.array([float(band.get("score", 0)) for band in bands] + [1.0])
+        self.floors = np.array([float(band.get("floor", 0)) for band in bands] + [0.0])
+        self.issues = np.array([bool(band.get("feedback")) and not band.get("positive", False)
+                                for band in bands] + [False])
+        self.messages = [band.get("feedback") for band in bands] + [None]
+        self.score_list = self.scores.tolist()
+        self.issue_list = self.issues.tolist()
+        self.floor_list = self.floors.tolist()
+
+    @staticmethod
+    def _bound(exercise, value, thresholds):
+        if value is None or isinstance(value, (int, float)):
+            return value
+        if isinstance(value, str):
+            if value not in thresholds:
+                raise _invalid(exercise, "bilinmeyen esik {!r}".format(value))
+            return thresholds[value]
+        if isinstance(value, dict) and value.get("metric") in METRICS:
+            return value["metric"], float(value.get("scale", 1.0))
+        raise _invalid(exercise, "gecersiz sinir {!r}".format(value))
+
+    def metrics(self):
+        names = {self.metric}
+        for bound in self.bounds:
+            names.update(item[0] for item in bound if isinstance(item, tuple))
+        return names
+
+    def select(self, values, landmarks, min_visibility):
+        """Tek kare için seçilen aralığın indeksi."""
+        if self.requires and not all(landmarks[i, VISIBILITY] > min_visibility for i in self.requires):
+            return len(self.bounds)
+        value = values[self.metric]
+        for i, (lower, upper) in enumerate(self.bounds):
+            if lower is not None and not value >= (values[lower[0]] * lower[1] if isinstance(lower, tuple) else lower):
+                continue
+            if upper is not None and not value <= (values[upper[0]] * upper[1] if isinstance(upper, tuple) else upper):
+                continue
+            return i
+
+    def evaluate(self, values, visible):
+        """(m,) seçilen aralık indeksleri."""
+        value = values[self.metric]
+        skipped = len(self.bounds)
+        selected = np.full(len(value), skipped - 1, dtype=np.intp)
+        # Sondan başa işlenir; böylece değeri kapsayan ilk aralık kazanır
+        for i in range(skipped - 2, -1, -1):
+            lower, upper = self.bounds[i]
+            inside = np.ones(len(value), dtype=bool)
+            if lower is not None:
+                inside &= value >= (values[lower[0]] * lower[1] if isinstance(lower, tuple) else lower)
+            if upper is not None:
+                inside &= value <= (values[upper[0]] * upper[1] if isinstance(upper, tuple) else upper)
+            selected[inside] = i
+        if self.requires:
+            selected[~visible[:, self.requires].all(axis=1)] = skipped
+        return selected
+
+
+class ExerciseRules:
+    """
+    Bir egzersizin derlenmiş skorlama kuralları. score() tek kareyi skaler
+    hızlı yolla, score_frames() (n, 33, 4) karelerin tamamını dizi işlemleriyle
+    aynı sonuçla puanlar; skor, kontrol puanlarının ortalamasıdır (tüm
+    kontroller sorunsuzsa 100).
+    """
+
+    def __init__(self, name, spec):
+        if not isinstance(spec, dict):
+            raise _invalid(name, "egzersiz tanimi nesne olmalidir")
+        self.name = name
+        self.label = spec.get("label", name.capitalize())
+        self.min_visibility = float(spec.get("min_visibility", 0.5))
+        self.perfect_feedback = spec.get("perfect_feedback", "Mükemmel {} formu!".format(name))
+        self.all_failed_feedback = spec.get("all_failed_feedback")
+        self.min_score = float(spec.get("min_score", 0.0))
+        thresholds = spec.get("thresholds", {})
+        if not isinstance(thresholds, dict):
+            raise _invalid(name, "'thresholds' nesne olmalidir")
+        self.thresholds = dict(thresholds)
+        checks = spec.get("checks")
+        if not isinstance(checks, list) or not checks:
+            raise _invalid(name, "'checks' listesi bos")
+        if not all(isinstance(check, dict) for check in checks):
+            raise _invalid(name, "her kontrol nesne olmalidir")
+        self.checks = [CompiledCheck(name, check, self.thresholds) for check in checks]
+        self.metric_names = set().union(*(check.metrics() for check in self.checks))
+        self.limits = SimpleNamespace(**self.thresholds)
+
+    def score_frames(self, frames, min_visibility=None):
+        """
+        (n, 33, 4) kareleri puanlar; [(skor, geri bildirim), ...] döndürür.
+        Tamamı NaN olan kare "kişi yok" sayılır.
+        """
+        min_visibility = self.min_visibility if min_visibility is None else min_visibility
+        try:
+            return self._score_frames(frames, min_visibility)
+        except Exception as e:
+            return [(0.0, ERROR_FEEDBACK.format(label=self.label, error=e))] * len(frames)
+
+    def score(self, landmarks, min_visibility=None):
+        """Tek kare (33, 4) ya da None için (skor, geri bildirim)."""
+        if landmarks is None:
+            return 0.0, NO_PERSON_FEEDBACK.format(label=self.label)
+        min_visibility = self.min_visibility if min_visibility is None else min_visibility
+        try:
+            side = select_side(landmarks, min_visibility)
+            if side is None:
+                return 0.0, MISSING_LANDMARKS_FEEDBACK.format(label=self.label)
+            points = landmarks[side, :2].tolist()
+            values = {name: METRICS[name][0](points, landmarks) for name in self.metric_names}
+            selected = [check.select(values, landmarks, min_visibility) for check in self.checks]
+            issues = [check.issue_list[i] for check, i in zip(self.checks, selected)]
+            if not any(issues):
+                return 100.0, self.perfect_feedback
+            score = sum(check.score_list[i] for check, i in zip(self.checks, selected)) / len(self.checks) * 100
+            score = max(score, max(check.floor_list[i] for check, i in zip(self.checks, selected)), self.min_score)
+            score = max(0.0, min(100.0, score))
+            return round(score, 1), self._improve_feedback(all(issues), selected, lambda name: values[name])
+        except Exception as e:
+            return 0.0, ERROR_FEEDBACK.format(label=self.label, error=e)
+
+    def _improve_feedback(self, all_failed, selected, value_of):
+        if all_failed and self.all_failed_feedback:
+            return self.all_failed_feedback
+        messages = []
+        for check, i in zip(self.checks, selected):
+            message = check.messages[i]
+            if message is not None:
+                messages.append(message.format(value=int(value_of(check.metric))))
+        return IMPROVE_PREFIX + " ".join(dict.fromkeys(messages))
+
+    def _score_frames(self, frames, min_visibility):
+        results = [None] * len(frames)
+        present = ~np.isnan(frames).all(axis=(1, 2))
+        sides = select_sides(frames, min_visibility)
+        for i in np.flatnonzero(~present).tolist():
+            results[i] = (0.0, NO_PERSON_FEEDBACK.format(label=self.label))
+        for i in np.flatnonzero(present & (sides == NO_SIDE)).tolist():
+            results[i] = (0.0, MISSING_LANDMARKS_FEEDBACK.format(label=self.label))
+        rows = np.flatnonzero(present & (sides != NO_SIDE))
+        if not len(rows):
+            return results
+
+        subset = frames[rows]
+        xy = subset[..., X:Y + 1].astype(np.float64)
+        points = xy[np.arange(len(rows))[:, None], SIDE_INDICES[sides[rows]]]
+        values = {name: METRICS[name][1](points, xy) for name in self.metric_names}
+        visible = subset[..., 3] > min_visibility
+
+        selected = [check.evaluate(values, visible) for check in self.checks]
+        components = np.stack([check.scores[sel] for check, sel in zip(self.checks, selected)], axis=1)
+        issues = np.stack([check.issues[sel] for check, sel in zip(self.checks, selected)], axis=1)
+        floors = np.stack([check.floors[sel] for check, sel in zip(self.checks, selected)], axis=1)
+
+        perfect = ~issues.any(axis=1)
+        all_failed = issues.all(axis=1)
+        scores = np.maximum(components.mean(axis=1) * 100, floors.max(axis=1))
+        scores = np.maximum(scores, self.min_score)
+        scores = np.clip(scores, 0.0, 100.0)
+
+        for j, i in enumerate(rows.tolist()):
+            if perfect[j]:
+                results[i] = (100.0, self.perfect_feedback)
+            else:
+                feedback = self._improve_feedback(all_failed[j], [sel[j] for sel in selected],
+                                                  lambda name: values[name][j])
+                results[i] = (round(float(scores[j]), 1), feedback)
+        return results
+
+
+def compile_rules(spec):
+    """Ayrıştırılmış kural belgesini {egzersiz: ExerciseRules} sözlüğüne derler; hatada ValueError."""
+    if not isinstance(spec, dict) or not spec:
+        raise ValueError("Gecersiz kural tanimi: egzersiz sozlugu bekleniyor")
+    rules = {}
+    for name, exercise in spec.items():
+        try:
+            rules[name] = ExerciseRules(name, exercise)
+        except (TypeError, AttributeError, KeyError) as e:
+            # Yukarıdaki kontrollerin yakalamadığı yapı hataları (ör. sayı yerine liste)
+            raise _invalid(name, "yapi hatasi: {}".format(e))
+    return rules
+
+
+def read_rules_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ValueError("YAML kural dosyasi icin PyYAML kurulu olmalidir.")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+# --- 3. Sıcak Yeniden Yükleme ---
+
+class RuleBook:
+    """
+    Kural dosyasını ilk kullanımda derler; dosyanın değiştirilme zamanını en
+    fazla reload_interval saniyede bir kontrol edip değişmişse yeniden derler.
+    Hatalı düzenlemede önceki kurallar kullanılmaya devam eder (hata stats()'ta).
+    """
+
+    def __init__(self, path=EXERCISE_RULES_PATH, reload_interval=RULES_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._rules = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.version = 0
+        self.error = None
+
+    def current(self):
+        """Güncel {egzersiz: ExerciseRules} sözlüğü."""
+        rules = self._rules
+        if rules is None or (self.reload_interval and
+                             time.monotonic() - self._checked_at >= self.reload_interval):
+            rules = self._refresh()
+        return rules
+
+    def _refresh(self):
+        with self._lock:
+            if self._rules is not None and time.monotonic() - self._checked_at < self.reload_interval:
+                return self._rules
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime != self._mtime:
+                    self._rules = compile_rules(read_rules_file(self.path))
+                    self._mtime = mtime
+                    self.version += 1
+                    self.error = None
+            except Exception as e:
+                # Açılışta hata yükseltilir; sonraki bozuk düzenlemelerde (ör. YAML
+                # sözdizimi) son geçerli kurallar kullanılmaya devam eder
+                if self._rules is None:
+                    raise
+                self.error = str(e)
+            return self._rules
+
+    def reload(self):
+        """Dosyayı değişiklik beklemeden yeniden derler; hatada ValueError/OSError."""
+        with self._lock:
+            rules = compile_rules(read_rules_file(self.path))
+            self._rules, self._mtime = rules, os.stat(self.path).st_mtime_ns
+            self._checked_at = time.monotonic()
+            self.version += 1
+            self.error = None
+        return rules
+
+    def get(self, exercise_type):
+        """Egzersizin kuralları; bilinmeyen tipte KeyError."""
+        return self.current()[exercise_type]
+
+    def stats(self):
+        rules = self.current()
+        return {"path": self.path, "version": self.version, "exercises": sorted(rules), "error": self.error}
+
+
+rule_book = RuleBook()
+
+
+class ExerciseScorers(Mapping):
+    """
+    Egzersiz tipi -> skorlayıcı (landmarks, min_visibility) eşlemesi. Kural
+    dosyasına eklenen egzersizler yeniden başlatmadan geçerli tip olur.
+    """
+
+    def __init__(self, book):
+        self.book = book
+
+    def __getitem__(self, exercise_type):
+        return self.book.current()[exercise_type].score
+
+    def __contains__(self, exercise_type):
+        return isinstance(exercise_type, str) and exercise_type in self.book.current()
+
+    def __iter__(self):
+        return iter(self.book.current())
+
+    def __len__(self):
+        return len(self.book.current())
+
+
+def rule_thresholds(exercise_type):
+    """Tekrar sayıcı eşikleri (öznitelik erişimli); analizör oluşturulurken bir kez alınır."""
+    return rule_book.get(exercise_type).limits
+
+
+if __name__ == "__main__":
+    # Düzenlenen kural dosyasını canlıya almadan önce doğrular:
+    # python exercise_rules.py [DOSYA]; hatada çıkış kodu 1
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else EXERCISE_RULES_PATH
+    try:
+        rules = compile_rules(read_rules_file(path))
+    except Exception as e:
+        print("{}: {}".format(path, e), file=sys.stderr)
+        sys.exit(1)
+    for name, exercise in rules.items():
+        print("{}: {} kontrol, metrikler: {}".format(name, len(exercise.checks), ", ".join(sorted(exercise.metric_names))))
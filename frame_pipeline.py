@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+
+import cv2
+
+# Masaüstü analizörlerinde üç iş parçacıklı hat (DESKTOP_PIPELINE=0 ile sıralı döngü)
+PIPELINE_ENABLED = os.environ.get("DESKTOP_PIPELINE", "1") != "0"
+# Ekran bilgisi alınamazsa (screeninfo yok, ekransız oturum) kullanılan çözünürlük
+DEFAULT_SCREEN_SIZE = (1280, 720)
+
+_screen_size = None
+
+
+def screen_size():
+    """
+    Birincil ekranın (genişlik, yükseklik) değeri. screeninfo yalnızca bir pencere
+    gerçekten çizileceği zaman, ilk çağrıda yüklenip sorgulanır; sonuç saklanır.
+    """
+    global _screen_size
+    if _screen_size is None:
+        _screen_size = DEFAULT_SCREEN_SIZE
+        try:
+            from screeninfo import get_monitors
+            monitors = get_monitors()
+        except Exception:  # screeninfo kurulu değil ya da ekran bulunamadı
+            monitors = []
+        for m in monitors:
+            if m.is_primary:
+                _screen_size = (m.width, m.height)
+                break
+    return _screen_size
+
+
+class CameraOpener(threading.Thread):
+    """
+    cv2.VideoCapture(source) çağrısını arka planda yapar. Kamera sürücüsünün
+    açılışı (web kameralarında 0.5-2 sn) böylece mediapipe yüklemesi ve model
+    ısınmasıyla aynı anda yürür; result() açılan yakalayıcıyı bekleyip döndürür.
+    """
+
+    def __init__(self, source=0):
+        threading.Thread.__init__(self, name="camera-open", daemon=True)
+        self.source = source
+        self.capture = None
+        self.start()
+
+    def run(self):
+        self.capture = cv2.VideoCapture(self.source)
+
+    def result(self):
+        self.join()
+        return self.capture
+
+
+class LatestSlot:
+    """
+    Tek elemanlı "en yeni kazanır" kutusu. put() önceki okunmamış değerin
+    üzerine yazar (atılan sayısı dropped'da tutulur); bekleyen okuyucu
+    yalnızca en yeni değeri alır, böylece hiçbir aşamada kuyruk birikmez.
+    """
+
+    __slots__ = ("_cond", "_value", "_seq", "_closed", "dropped")
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._value = None
+        self._seq = 0
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, value):
+        with self._cond:
+            if self._value is not None:
+                self.dropped += 1
+            self._value = value
+            self._seq += 1
+            self._cond.notify_all()
+
+    def take(self, timeout=None):
+        """En yeni değeri alıp kutuyu boşaltır; süre dolarsa ya da kutu kapanırsa None."""
+        with self._cond:
+            if self._value is None and not self._closed:
+                self._cond.wait(timeout)
+            value, self._value = self._value, None
+            return value
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class FramePipeline:
+    """
+    Yakalama, çıkarım ve çizim aşamalarını ayrı iş parçacıklarında çalıştırır.
+
+    - Yakalama iş parçacığı kameradan okur ve yalnızca en yeni kareyi tutar.
+    - Çıkarım iş parçacığı boşaldığında en yeni kareyi alır: analyze(frame) -> sonuç.
+    - Çizim run()'ı çağıran (ana) iş parçacığında yapılır: render(sonuç);
+      cv2.imshow/waitKey çoğu platformda ana iş parçacığında çalışmalıdır.
+
+    Çıkarım kameradan yavaş olsa bile ekrandaki sonuç en fazla bir çıkarım
+    süresi kadar eskidir; aradaki kareler atılır.
+    """
+
+    def __init__(self, cap, analyze, render, quit_key="q"):
+        self.cap = cap
+        self.analyze = analyze
+        self.render = render
+        self.quit_key = ord(quit_key)
+        self.frames = LatestSlot()
+        self.results = LatestSlot()
+        self.stop_event = threading.Event()
+        self.capture_ended = False
+        self.error = None
+        self.captured = 0
+        self.analyzed = 0
+        self.rendered = 0
+        self.latency_ms = 0.0  # son çizilen karenin yakalamadan çizime gecikmesi
+
+    def _capture_loop(self):
+        try:
+            while not self.stop_event.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    self.capture_ended = True
+                    break
+                self.captured += 1
+                self.frames.put((time.perf_counter(), frame))
+        finally:
+            self.frames.close()
+
+    def _inference_loop(self):
+        try:
+            while not self.stop_event.is_set():
+                item = self.frames.take(timeout=0.1)
+                if item is None:
+                    if self.frames.closed:
+                        break
+                    continue
+                captured_at, frame = item
+                self.results.put((captured_at, self.analyze(frame)))
+                self.analyzed += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self.results.close()
+
+    def run(self):
+        """Hattı çalıştırır; 'q' tuşu, video sonu ya da hata ile döner."""
+        try:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # sürücü tamponunda kare birikmesin
+        except cv2.error:
+            pass
+
+        threads = [threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+                   threading.Thread(target=self._inference_loop, name="inference", daemon=True)]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = self.results.take(timeout=0.005)
+                if item is not None:
+                    captured_at, result = item
+                    self.render(result)
+                    self.rendered += 1
+                    self.latency_ms = (time.perf_counter() - captured_at) * 1000
+                elif self.results.closed:
+                    break
+                if cv2.waitKey(1) & 0xFF == self.quit_key:
+                    break
+        finally:
+            self.stop_event.set()
+            for thread in threads:
+                thread.join(timeout=2)
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def stats(self):
+        return {
+            "captured": self.captured,
+            "analyzed": self.analyzed,
+            "rendered": self.rendered,
+            "dropped_frames": self.frames.dropped,
+            "last_latency_ms": round(self.latency_ms, 1),
+        }
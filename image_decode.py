@@ -0,0 +1,96 @@
+import os
+import struct
+
+import numpy as np
+import cv2
+
+# JPEG'ler uzun kenarı bu değerin altına düşmeyecek en büyük oranda (1/2, 1/4, 1/8)
+# doğrudan küçültülerek çözülür; 0 her zaman tam çözünürlük demektir.
+DECODE_TARGET_SIZE = int(os.environ.get("IMAGE_DECODE_TARGET_SIZE", "640"))
+
+REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+_REDUCED_FLAG = dict(REDUCED_FLAGS)
+
+# Boyut bilgisi taşıyan SOF işaretleri (DHT/JPG/DAC hariç)
+_SOF_MARKERS = frozenset((0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                          0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF))
+# Uzunluk alanı olmayan tek başına işaretler
+_STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | {0x01}
+
+
+def jpeg_dimensions(buffer):
+    """
+    JPEG başlığındaki SOF segmentinden (genişlik, yükseklik) okur; resmi çözmez.
+    JPEG değilse ya da başlık bozuksa None döndürür.
+    """
+    size = len(buffer)
+    if size < 4 or buffer[0] != 0xFF or buffer[1] != 0xD8:
+        return None
+    offset = 2
+    while offset + 4 <= size:
+        if buffer[offset] != 0xFF:
+            return None
+        marker = buffer[offset + 1]
+        if marker == 0xFF:  # dolgu baytı
+            offset += 1
+            continue
+        if marker in _STANDALONE_MARKERS:
+            offset += 2
+            continue
+        if marker == 0xDA:  # SOS: görüntü verisi başladı, SOF bulunamadı
+            return None
+        length = struct.unpack_from(">H", buffer, offset + 2)[0]
+        if marker in _SOF_MARKERS:
+            if offset + 9 > size:
+                return None
+            height, width = struct.unpack_from(">HH", buffer, offset + 5)
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def choose_reduction(width, height, target_size=DECODE_TARGET_SIZE):
+    """Uzun kenarı target_size'ın altına indirmeyen en büyük küçültme oranı (1, 2, 4, 8)."""
+    if not target_size:
+        return 1
+    long_side = max(width, height)
+    for factor, _ in REDUCED_FLAGS:
+        if long_side // factor >= target_size:
+            return factor
+    return 1
+
+
+def decode_image(buffer, target_size=DECODE_TARGET_SIZE):
+    """
+    Resim baytlarını BGR diziye çözer; (resim, küçültme oranı) döndürür.
+    JPEG'lerde oran başlıktaki boyutlardan seçilir ve libjpeg doğrudan
+    küçük ölçekte çözer. Diğer biçimler tam çözünürlükte çözülür.
+    """
+    nparr = np.frombuffer(buffer, np.uint8)
+    if nparr.size == 0:
+        return None, 1
+    factor = 1
+    if target_size:
+        dimensions = jpeg_dimensions(memoryview(nparr))
+        if dimensions is not None:
+            factor = choose_reduction(dimensions[0], dimensions[1], target_size)
+    if factor == 1:
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR), 1
+    return cv2.imdecode(nparr, _REDUCED_FLAG[factor]), factor
+
+
+def fit_image(image, max_side):
+    """Uzun kenarı max_side'dan büyükse resmi orantılı küçültür (0/None: olduğu gibi)."""
+    if not max_side or image is None:
+        return image
+    height, width = image.shape[:2]
+    long_side = max(width, height)
+    if long_side <= max_side:
+        return image
+    scale = max_side / float(long_side)
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
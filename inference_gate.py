@@ -0,0 +1,88 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# Çalışan iş parçacıklarının dışında bekleyebilecek en fazla istek
+MAX_INFERENCE_QUEUE = int(os.environ.get("MAX_INFERENCE_QUEUE", "8"))
+# Kuyrukta bundan uzun bekleyen istek işlenmeden düşürülür (saniye, 0: sınırsız)
+MAX_QUEUE_WAIT = float(os.environ.get("MAX_QUEUE_WAIT", "2.0"))
+
+
+class Overloaded(Exception):
+    """Kuyruk dolu: istek kabul edilmedi (429)."""
+
+
+class QueueTimeout(Exception):
+    """İstek kuyrukta çok bekledi, sonucu artık geçersiz (503)."""
+
+
+class InferenceGate:
+    """
+    Çıkarım işlerini sınırlı bir iş parçacığı havuzunda çalıştıran kabul kontrolü.
+
+    Aynı anda en fazla workers + max_queue iş kabul edilir; fazlası hemen
+    Overloaded ile reddedilir. Kuyrukta max_wait'ten uzun bekleyen iş
+    çalıştırılmadan QueueTimeout ile düşürülür, böylece yük altında kuyruk
+    ve kuyruk gecikmesi sınırsız büyümez.
+    """
+
+    def __init__(self, workers, max_queue=MAX_INFERENCE_QUEUE, max_wait=MAX_QUEUE_WAIT):
+        if workers < 1:
+            raise ValueError("Calisan sayisi en az 1 olmalidir.")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._accepted = 0
+        self._rejected = 0
+        self._expired = 0
+
+    def submit(self, fn, *args):
+        """fn(*args) işini kuyruğa koyar; concurrent.futures.Future döndürür."""
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                metrics.registry.inc("inference_admission_total", "rejected")
+                raise Overloaded("Sunucu yogun, daha sonra tekrar deneyin.")
+            self._pending += 1
+            self._accepted += 1
+        metrics.registry.inc("inference_admission_total", "accepted")
+        return self._executor.submit(self._run, time.monotonic(), fn, args)
+
+    def _run(self, enqueued_at, fn, args):
+        try:
+            waited = time.monotonic() - enqueued_at
+            metrics.registry.observe("queue_wait", waited)
+            if self.max_wait and waited > self.max_wait:
+                with self._lock:
+                    self._expired += 1
+                metrics.registry.inc("inference_admission_total", "expired")
+                raise QueueTimeout("Istek kuyrukta zaman asimina ugradi.")
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def run(self, fn, *args):
+        """submit() için asyncio karşılığı; olay döngüsü bloklanmaz."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def health(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "expired": self._expired,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,513 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+import cv2
+
+from frame_pipeline import LatestSlot
+from pose_landmarks import LandmarkBuffer
+from pose_pool import PosePool
+from pose_profiles import DEFAULT_PROFILE, PROFILES, get_profile
+from pose_roi import PersonRoiTracker
+from rep_engine import ANALYZERS, create_analyzer
+
+# Çok kameralı ekransız alım servisi: her kaynak (dosya, kamera indeksi, RTSP adresi)
+# kendi iş parçacığında çözülür; kareler tek bir paylaşılan Pose havuzuna sırayla
+# (round-robin, her akışın yalnızca en yeni karesi) verilir. Akış durumları
+# abonelere yayınlanır. Çalıştırma:
+#   python ingest_server.py --stream raf1@squat=rtsp://... --stream deadlift=kayit.mp4 --port 8100
+#   python ingest_server.py --stream squat=a.mp4 --stream squat=b.mp4 --no-http
+
+# Paylaşılan Pose havuzunun boyutu (varsayılan: çekirdek sayısı)
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", str(os.cpu_count() or 1)))
+# Canlı kaynak koptuğunda yeniden bağlanmadan önce beklenen süre (saniye)
+RECONNECT_DELAY = float(os.environ.get("INGEST_RECONNECT_DELAY", "2"))
+# Olay akışında (SSE) bu kadar saniye değişiklik yoksa bağlantıyı canlı tutan yorum satırı gönderilir
+KEEPALIVE_SECONDS = 15.0
+
+
+# --- 1. Kaynaklar ---
+
+def parse_stream_spec(spec, index):
+    """'[ad@]egzersiz=kaynak' -> (ad, egzersiz, kaynak); kamera indeksi int'e çevrilir."""
+    target, _, source = spec.partition("=")
+    name, _, exercise_type = target.rpartition("@")
+    name = name or "cam{}".format(index + 1)
+    if exercise_type not in ANALYZERS or not source:
+        raise ValueError("Gecersiz akis: {} (ornek: raf1@squat=rtsp://...)".format(spec))
+    return name, exercise_type, int(source) if source.isdigit() else source
+
+
+class StreamReader(threading.Thread):
+    """
+    Bir kaynağı arka plan iş parçacığında çözüp akışın LatestSlot'una koyar;
+    işlenmemiş eski kare yenisiyle ezilir (dropped). Dosyalar varsayılan olarak
+    kaynak FPS'inde okunur (canlı kamerayı taklit eder), loop ile başa sarılır;
+    canlı kaynak koparsa RECONNECT_DELAY sonra yeniden açılır.
+    """
+
+    def __init__(self, source, slot, condition, realtime=True, loop=False):
+        super().__init__(daemon=True)
+        self.source = source
+        self.slot = slot
+        self.condition = condition
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.realtime = realtime
+        self.loop = loop
+        self.frames_read = 0
+        self.reconnects = 0
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                cap = cv2.VideoCapture(self.source)
+                try:
+                    if cap.isOpened():
+                        self.error = None
+                        self._read(cap)
+                    else:
+                        self.error = "Kaynak acilamadi: {}".format(self.source)
+                finally:
+                    cap.release()
+                if self.is_file and not self.loop:
+                    break
+                if not self.is_file:
+                    # Canlı kaynak koptu ya da açılamadı: bekleyip yeniden bağlan
+                    self.reconnects += 1
+                    self._stop_event.wait(RECONNECT_DELAY)
+        finally:
+            with self.condition:
+                self.slot.close()
+                self.condition.notify_all()
+
+    def _read(self, cap):
+        if not self.is_file:
+            try:
+                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # sürücü tamponunda kare birikmesin
+            except cv2.error:
+                pass
+        interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0) if self.is_file and self.realtime else 0.0
+        next_time = time.perf_counter()
+        while not self._stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                return
+            self.frames_read += 1
+            with self.condition:
+                self.slot.put((time.perf_counter(), frame))
+                self.condition.notify()
+            if interval:
+                next_time += interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+                else:
+                    next_time = time.perf_counter()
+
+
+# --- 2. Akış Durumu ---
+
+class IngestStream:
+    """Bir kaynağın kişi kırpması, faz makinesi ve yayınlanan son durumu."""
+
+    def __init__(self, name, exercise_type, source, profile, condition, realtime=True, loop=False):
+        self.name = name
+        self.exercise_type = exercise_type
+        self.source = source
+        self.analyzer = create_analyzer(exercise_type, profile.visibility(exercise_type))
+        self.landmark_buffer = LandmarkBuffer()
+        # Havuzdaki Pose örnekleri akışlar arasında paylaşıldığı için MediaPipe'ın kendi
+        # takibi kullanılamaz; önceki karedeki kişi kutusuna kırpma maliyeti düşürür
+        self.roi = PersonRoiTracker(max_side=profile.max_input_side)
+        self.frames = LatestSlot()
+        self.reader = StreamReader(source, self.frames, condition, realtime, loop)
+        self.busy = False
+        self.processed = 0
+        self.errors = 0
+        self.person = False
+        self.latency_ms = 0.0
+        self.started_at = time.monotonic()
+        self._published = None
+
+    def update(self, landmarks, width, height, captured_at):
+        """Kareyi faz makinesine verir; görünür durum değiştiyse yayınlanacak durumu döndürür."""
+        analyzer = self.analyzer
+        previous_phase = analyzer.phase
+        previous_reps = analyzer.reps
+        analyzer.update(landmarks, width, height, captured_at * 1000)
+        self.processed += 1
+        self.person = landmarks is not None
+        self.latency_ms = (time.perf_counter() - captured_at) * 1000
+
+        key = (analyzer.phase, analyzer.reps, analyzer.feedback, self.person)
+        if key == self._published:
+            return None
+        self._published = key
+        state = self.state()
+        state["repCompleted"] = analyzer.reps > previous_reps
+        if analyzer.phase != previous_phase:
+            state["transition"] = {"from": previous_phase, "to": analyzer.phase}
+        return state
+
+    def state(self):
+        analyzer = self.analyzer
+        return {
+            "stream": self.name,
+            "exerciseType": self.exercise_type,
+            "phase": analyzer.phase,
+            "reps": analyzer.reps,
+            "repetitionValid": analyzer.repetition_valid,
+            "feedback": analyzer.feedback,
+            "personDetected": self.person,
+            "frames": self.processed,
+            "latencyMs": round(self.latency_ms, 1),
+        }
+
+    def stats(self):
+        elapsed = max(1e-6, time.monotonic() - self.started_at)
+        reader = self.reader
+        return {
+            "stream": self.name,
+            "source": str(self.source),
+            "captured": reader.frames_read,
+            "processed": self.processed,
+            "dropped": self.frames.dropped,
+            "errors": self.errors,
+            "processedFps": round(self.processed / elapsed, 1),
+            "lastLatencyMs": round(self.latency_ms, 1),
+            "reconnects": reader.reconnects,
+            "ended": self.frames.closed,
+            "error": reader.error,
+        }
+
+
+# --- 3. Yayın (pub/sub) ---
+
+class Subscription:
+    """
+    Bir abonenin bekleyen durumları: akış başına yalnızca en yeni durum tutulur
+    (yavaş abone eski durumları atlar, bellek akış sayısıyla sınırlı kalır).
+    loop verilirse asenkron (await next()), verilmezse iş parçacığı (get()) ile okunur.
+    """
+
+    def __init__(self, streams=None, loop=None):
+        self.streams = set(streams) if streams else None
+        self.dropped = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._loop = loop
+        self._event = asyncio.Event() if loop is not None else threading.Event()
+
+    def push(self, name, state):
+        if self.streams is not None and name not in self.streams:
+            return
+        with self._lock:
+            if name in self._pending:
+                self.dropped += 1
+            self._pending[name] = state
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._event.set)
+        else:
+            self._event.set()
+
+    def _drain(self):
+        with self._lock:
+            self._event.clear()
+            pending, self._pending = self._pending, {}
+        return list(pending.values())
+
+    def get(self, timeout=None):
+        """Bekleyen durumlar (süre dolarsa boş liste)."""
+        self._event.wait(timeout)
+        return self._drain()
+
+    async def next(self):
+        await self._event.wait()
+        return self._drain()
+
+
+class StateBroker:
+    """Akış durumlarını abonelere dağıtır; yayın çağrısı hiçbir zaman aboneyi beklemez."""
+
+    def __init__(self):
+        self._subscriptions = []
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, streams=None, loop=None):
+        subscription = Subscription(streams, loop)
+        with self._lock:
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def publish(self, name, state):
+        self.published += 1
+        for subscription in self._subscriptions:
+            subscription.push(name, state)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+# --- 4. Adil Zamanlayıcı ve Paylaşılan Havuz ---
+
+class IngestServer:
+    """
+    N akışı tek süreçte, boyutu çekirdek sayısı kadar olan tek bir Pose havuzuyla işler.
+
+    Her havuz örneği için bir çalışan iş parçacığı vardır. Boşalan çalışan, sıradaki
+    (round-robin) yeni karesi olan ve o an işlenmeyen akışın en yeni karesini alır;
+    böylece hızlı bir kamera diğerlerini aç bırakmaz, yavaş kalınan akışlarda eski
+    kareler atılır ve bir akışın kareleri hiçbir zaman eşzamanlı işlenmez (faz
+    makinesi sıralı kalır). MediaPipe çıkarımı sırasında GIL bırakıldığından
+    çalışanlar çekirdekleri birlikte doldurur.
+    """
+
+    def __init__(self, specs, workers=INGEST_WORKERS, profile=None, realtime=True, loop=False):
+        self.profile = get_profile(profile)
+        self.condition = threading.Condition()
+        self.streams = []
+        for index, spec in enumerate(specs):
+            name, exercise_type, source = parse_stream_spec(spec, index) if isinstance(spec, str) else spec
+            if any(stream.name == name for stream in self.streams):
+                raise ValueError("Ayni akis adi iki kez kullanildi: {}".format(name))
+            self.streams.append(IngestStream(name, exercise_type, source, self.profile,
+                                             self.condition, realtime, loop))
+        if not self.streams:
+            raise ValueError("En az bir akis gerekli.")
+        self.pool = PosePool(max(1, workers), **self.profile.pose_kwargs(static_image_mode=True))
+        self.broker = StateBroker()
+        self.finished = threading.Event()
+        self._next = 0
+        self._active_workers = 0
+        self._stopping = False
+        self._workers = []
+
+    def get(self, name):
+        for stream in self.streams:
+            if stream.name == name:
+                return stream
+        return None
+
+    def start(self):
+        self.pool.warmup()
+        self._active_workers = self.pool.size
+        self._workers = [threading.Thread(target=self._worker_loop, name="ingest-{}".format(i), daemon=True)
+                         for i in range(self.pool.size)]
+        for thread in self._workers:
+            thread.start()
+        for stream in self.streams:
+            stream.started_at = time.monotonic()
+            stream.reader.start()
+        return self
+
+    def _next_job(self):
+        """Sıradaki akışın en yeni karesi; tüm kaynaklar bitince ya da durdurulunca None."""
+        streams = self.streams
+        count = len(streams)
+        with self.condition:
+            while not self._stopping:
+                for offset in range(count):
+                    stream = streams[(self._next + offset) % count]
+                    if stream.busy:
+                        continue
+                    item = stream.frames.take(timeout=0)
+                    if item is None:
+                        continue
+                    stream.busy = True
+                    self._next = (self._next + offset + 1) % count
+                    return stream, item
+                if all(stream.frames.closed for stream in streams):
+                    return None
+                self.condition.wait(0.5)
+            return None
+
+    def _worker_loop(self):
+        try:
+            while True:
+                job = self._next_job()
+                if job is None:
+                    break
+                stream, (captured_at, frame) = job
+                state = None
+                try:
+                    with self.pool.acquire() as pose:
+                        landmarks = stream.roi.process(pose, frame, stream.landmark_buffer)
+                    state = stream.update(landmarks, frame.shape[1], frame.shape[0], captured_at)
+                except Exception as e:
+                    stream.errors += 1
+                    print("Akis {} kare hatasi: {}".format(stream.name, e), file=sys.stderr)
+                finally:
+                    with self.condition:
+                        stream.busy = False
+                        self.condition.notify()
+                if state is not None:
+                    self.broker.publish(stream.name, state)
+        finally:
+            with self.condition:
+                self._active_workers -= 1
+                if not self._active_workers:
+                    self.finished.set()
+
+    def stop(self):
+        with self.condition:
+            self._stopping = True
+            self.condition.notify_all()
+        for stream in self.streams:
+            stream.reader.stop()
+        for thread in self._workers:
+            thread.join(timeout=5)
+        for stream in self.streams:
+            stream.reader.join(timeout=5)
+        self.pool.close()
+        self.finished.set()
+
+    def states(self):
+        return [stream.state() for stream in self.streams]
+
+    def health(self):
+        status = self.pool.health()
+        status["streams"] = [stream.stats() for stream in self.streams]
+        status["subscribers"] = len(self.broker)
+        status["published"] = self.broker.published
+        return status
+
+
+# --- 5. HTTP Arayüzü ---
+
+def create_app(server):
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        await asyncio.get_running_loop().run_in_executor(None, server.start)
+        try:
+            yield
+        finally:
+            server.stop()
+
+    async def list_streams(request):
+        return JSONResponse({"streams": server.states()})
+
+    async def get_stream(request):
+        stream = server.get(request.path_params["name"])
+        if stream is None:
+            return JSONResponse({"error": "Akis bulunamadi."}, status_code=404)
+        state = stream.state()
+        state["stats"] = stream.stats()
+        return JSONResponse(state)
+
+    async def events(request):
+        """Durum değişikliklerini Server-Sent Events olarak yayınlar (?streams=ad1,ad2)."""
+        names = [name for name in request.query_params.get("streams", "").split(",") if name]
+        unknown = [name for name in names if server.get(name) is None]
+        if unknown:
+            return JSONResponse({"error": "Akis bulunamadi: {}".format(", ".join(unknown))}, status_code=404)
+        subscription = server.broker.subscribe(names, loop=asyncio.get_running_loop())
+
+        async def send():
+            try:
+                # Abone önce tüm akışların güncel durumunu alır
+                for state in server.states():
+                    if not names or state["stream"] in names:
+                        yield "event: state\ndata: {}\n\n".format(json.dumps(state, ensure_ascii=False))
+                while True:
+                    try:
+                        states = await asyncio.wait_for(subscription.next(), KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        yield ": keepalive\n\n"
+                        continue
+                    for state in states:
+                        yield "event: state\ndata: {}\n\n".format(json.dumps(state, ensure_ascii=False))
+            finally:
+                server.broker.unsubscribe(subscription)
+
+        return StreamingResponse(send(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    async def health(request):
+        status = server.health()
+        return JSONResponse(status, status_code=200 if status["ok"] else 503)
+
+    routes = [
+        Route("/streams", list_streams, methods=["GET"]),
+        Route("/streams/{name}", get_stream, methods=["GET"]),
+        Route("/events", events, methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+# --- 6. Komut Satırı ---
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Birden fazla kamera/video akisini tek Pose havuzunda analiz eden ekransiz alim servisi")
+    parser.add_argument("--stream", action="append", required=True, metavar="[AD@]EGZERSIZ=KAYNAK",
+                        help="Akis: egzersiz ({}) ve kaynak (dosya, kamera indeksi ya da RTSP adresi); "
+                             "tekrarlanabilir".format(", ".join(sorted(ANALYZERS))))
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS,
+                        help="Paylasilan Pose havuzu boyutu (varsayilan: INGEST_WORKERS ya da cekirdek sayisi)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="Performans profili (varsayilan: POSE_PROFILE ya da 'balanced')")
+    parser.add_argument("--loop", action="store_true", help="Dosya kaynaklarini bitince basa sar")
+    parser.add_argument("--no-realtime", action="store_true",
+                        help="Dosyalari kaynak FPS'inde degil, cozulebildigi hizda oku")
+    parser.add_argument("--no-http", action="store_true",
+                        help="HTTP sunucusu yerine durum degisikliklerini JSON satirlari olarak yazdir; "
+                             "dosya kaynaklari bitince cikar")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8100)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        server = IngestServer(args.stream, args.workers, args.profile,
+                              realtime=not args.no_realtime, loop=args.loop)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if not args.no_http:
+        import uvicorn
+
+        uvicorn.run(create_app(server), host=args.host, port=args.port)
+        return 0
+
+    subscription = server.broker.subscribe()
+    server.start()
+    try:
+        while not server.finished.is_set():
+            for state in subscription.get(timeout=0.5):
+                print(json.dumps(state, ensure_ascii=False), flush=True)
+        for state in subscription.get(timeout=0):
+            print(json.dumps(state, ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        status = server.health()
+        server.stop()
+    print(json.dumps(status, ensure_ascii=False), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
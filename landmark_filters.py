@@ -0,0 +1,202 @@
+import math
+import os
+
+import numpy as np
+
+from pose_landmarks import LANDMARK_COUNT, LANDMARK_FIELDS, VISIBILITY, X, Z
+
+# Analizörlerin açı hesabından önce anahtar noktalara uyguladığı zamansal filtre:
+# one_euro, ema, kalman ya da none
+LANDMARK_FILTER = os.environ.get("LANDMARK_FILTER", "one_euro")
+# Kare zamanı verilmediğinde filtrelerin varsaydığı kare hızı (Hz)
+FILTER_RATE = float(os.environ.get("LANDMARK_FILTER_RATE", "30"))
+# İki kare arası bundan uzunsa (saniye) filtre eski durumdan devam etmez, yeniden başlar
+MAX_FRAME_GAP = 1.0
+
+
+class LandmarkFilter:
+    """
+    (33, 4) anahtar nokta dizisi için akış filtresi tabanı. Yalnızca x, y, z
+    sütunları filtrelenir; visibility olduğu gibi geçer. process() önceden
+    ayrılmış çıkış tamponunu döndürür (bir sonraki çağrıya kadar geçerli),
+    böylece kare başına yeni dizi oluşturulmaz. reset() kişi kaybında çağrılır.
+    time_ms verilirse adım süresi gerçek kare aralığıdır (düşük/değişken fps'de
+    kesim frekansları korunur); verilmezse 1 / rate kabul edilir.
+    """
+
+    name = None
+
+    def __init__(self, rate=FILTER_RATE):
+        self.rate = rate
+        self.out = np.empty((LANDMARK_COUNT, LANDMARK_FIELDS), dtype=np.float32)
+        self.state = np.zeros((LANDMARK_COUNT, Z + 1), dtype=np.float64)
+        self.initialized = False
+        self.time_ms = None
+
+    def reset(self):
+        self.initialized = False
+        self.time_ms = None
+
+    def frame_interval(self, time_ms):
+        """Önceki kareden bu yana geçen süre (saniye); zaman yoksa ya da geriye gittiyse 1 / rate."""
+        last, self.time_ms = self.time_ms, time_ms
+        if time_ms is None or last is None or time_ms <= last:
+            return 1.0 / self.rate
+        return (time_ms - last) / 1000.0
+
+    def process(self, landmarks, time_ms=None):
+        coords = landmarks[:, X:Z + 1]
+        dt = self.frame_interval(time_ms)
+        if not self.initialized or dt > MAX_FRAME_GAP:
+            self.state[:] = coords
+            self._start(coords)
+            self.initialized = True
+        else:
+            self._step(coords, dt)
+        out = self.out
+        out[:, X:Z + 1] = self.state
+        out[:, VISIBILITY] = landmarks[:, VISIBILITY]
+        return out
+
+    def _start(self, coords):
+        pass
+
+    def _step(self, coords, dt):
+        raise NotImplementedError
+
+
+def smoothing_factor(cutoff, rate):
+    """Kesim frekansı (Hz) ve örnekleme hızı için üstel yumuşatma katsayısı."""
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau * rate)
+
+
+class ExponentialFilter(LandmarkFilter):
+    """
+    Üstel hareketli ortalama; en ucuz, ama harekette sabit gecikme. alpha, rate
+    hızındaki bir kare içindir; farklı aralıkta aynı zaman sabitine çevrilir.
+    """
+
+    name = "ema"
+
+    def __init__(self, alpha=0.5, rate=FILTER_RATE):
+        LandmarkFilter.__init__(self, rate)
+        self.alpha = alpha
+
+    def _step(self, coords, dt):
+        # state += alpha * (coords - state), alpha = 1 - (1 - alpha0)^(dt * rate)
+        alpha = self.alpha
+        if dt * self.rate != 1.0:
+            alpha = 1.0 - (1.0 - alpha) ** (dt * self.rate)
+        state = self.state
+        state += alpha * (coords - state)
+
+
+class OneEuroFilter(LandmarkFilter):
+    """
+    One-Euro filtresi (Casiez vd., 2012): hız düşükken kesim frekansı
+    min_cutoff'a iner (titreşim bastırılır), hızlanınca beta ile yükselir
+    (gecikme azalır). Hız, normalize koordinat/saniye cinsindendir.
+    """
+
+    name = "one_euro"
+
+    def __init__(self, min_cutoff=0.5, beta=0.5, d_cutoff=1.0, rate=FILTER_RATE):
+        LandmarkFilter.__init__(self, rate)
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.velocity = np.zeros_like(self.state)
+        self._work = np.empty_like(self.state)
+        self._alpha = np.empty_like(self.state)
+
+    def _start(self, coords):
+        self.velocity.fill(0.0)
+
+    def _step(self, coords, dt):
+        state, velocity, work, alpha = self.state, self.velocity, self._work, self._alpha
+        rate = 1.0 / dt
+        # Filtrelenmiş hız: velocity += d_alpha * ((coords - state) * rate - velocity)
+        np.subtract(coords, state, out=work)
+        work *= rate
+        work -= velocity
+        work *= smoothing_factor(self.d_cutoff, rate)
+        velocity += work
+        # Uyarlanan kesim frekansı ve katsayı: 1 / (1 + rate / (2π cutoff))
+        np.abs(velocity, out=alpha)
+        alpha *= self.beta
+        alpha += self.min_cutoff
+        alpha *= 2 * math.pi * dt
+        np.reciprocal(alpha, out=alpha)
+        alpha += 1.0
+        np.reciprocal(alpha, out=alpha)
+        # state += alpha * (coords - state)
+        np.subtract(coords, state, out=work)
+        work *= alpha
+        state += work
+
+
+class KalmanFilter(LandmarkFilter):
+    """
+    Her koordinat için bağımsız sabit hızlı Kalman filtresi (konum + hız).
+    process_noise ivme gürültüsü, measurement_noise ölçüm varyansıdır.
+    """
+
+    name = "kalman"
+
+    def __init__(self, process_noise=0.3, measurement_noise=1e-3, rate=FILTER_RATE):
+        LandmarkFilter.__init__(self, rate)
+        self.process_noise = process_noise
+        self.r = measurement_noise
+        self.velocity = np.zeros_like(self.state)
+        self.p00 = np.empty_like(self.state)
+        self.p01 = np.empty_like(self.state)
+        self.p11 = np.empty_like(self.state)
+        self._gain = np.empty_like(self.state)
+        self._innovation = np.empty_like(self.state)
+
+    def _start(self, coords):
+        self.velocity.fill(0.0)
+        self.p00.fill(self.r)
+        self.p01.fill(0.0)
+        self.p11.fill(1.0)
+
+    def _step(self, coords, dt):
+        state, velocity, p00, p01, p11 = self.state, self.velocity, self.p00, self.p01, self.p11
+        gain, innovation = self._gain, self._innovation
+        q = self.process_noise
+        # Tahmin: x += v dt, P = F P F^T + Q
+        state += velocity * dt
+        p00 += dt * (2 * p01 + dt * p11) + q * dt ** 4 / 4
+        p01 += dt * p11 + q * dt ** 3 / 2
+        p11 += q * dt ** 2
+        # Güncelleme: K = P H^T / (P00 + R)
+        np.subtract(coords, state, out=innovation)
+        np.add(p00, self.r, out=gain)
+        np.reciprocal(gain, out=gain)
+        k0 = p00 * gain
+        k1 = p01 * gain
+        state += k0 * innovation
+        velocity += k1 * innovation
+        p11 -= k1 * p01
+        p01 *= 1.0 - k0
+        p00 *= 1.0 - k0
+
+
+FILTERS = {
+    "ema": ExponentialFilter,
+    "one_euro": OneEuroFilter,
+    "kalman": KalmanFilter,
+}
+
+
+def create_filter(spec=LANDMARK_FILTER):
+    """Filtre adından (ya da hazır filtreden) yeni filtre; "none"/boş için None, bilinmeyen adda ValueError."""
+    if spec is None or isinstance(spec, LandmarkFilter):
+        return spec
+    if spec in ("", "none"):
+        return None
+    try:
+        return FILTERS[spec]()
+    except KeyError:
+        raise ValueError("Gecersiz filtre: {} ({})".format(spec, ", ".join(["none"] + sorted(FILTERS))))
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# Ölçümler METRICS_ENABLED=0 ile kapatılır; kapalıyken stage() paylaşılan boş bir
+# bağlam döndürür ve sayaçlar hiç dokunulmadan geçilir.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+# Aşama gecikmeleri için kova üst sınırları (saniye)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """Sabit kovalı gecikme histogramı; gözlem O(log kova) ve tek kilit alımı."""
+
+    __slots__ = ("buckets", "counts", "total", "_lock")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # son eleman +Inf
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.total
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Aşama histogramlarını ve etiketli sayaçları tutar, Prometheus metin
+    biçiminde (/metrics) dışa verir.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._stages = {}
+        self._counters = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, stage):
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(stage, Histogram(self.buckets))
+        return histogram
+
+    def stage(self, name):
+        """with registry.stage("decode"): ... bloğunun süresini ölçer."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._histogram(name))
+
+    def observe(self, name, seconds):
+        if self.enabled:
+            self._histogram(name).observe(seconds)
+
+    def describe(self, name, help_text, label_names):
+        self._help[name] = (help_text, tuple(label_names))
+
+    def inc(self, name, *label_values):
+        """Etiket değerleri describe() ile verilen sırada geçilir."""
+        if not self.enabled:
+            return
+        with self._lock:
+            counter = self._counters.setdefault(name, {})
+            counter[label_values] = counter.get(label_values, 0) + 1
+
+    def render(self):
+        lines = [
+            "# HELP posture_stage_seconds Analiz hattı aşama gecikmeleri (saniye).",
+            "# TYPE posture_stage_seconds histogram",
+        ]
+        bounds = [_format_bound(b) for b in self.buckets] + ["+Inf"]
+        for stage, histogram in sorted(self._stages.items()):
+            counts, total = histogram.snapshot()
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append('posture_stage_seconds_bucket{{stage="{}",le="{}"}} {}'.format(
+                    stage, bound, cumulative))
+            lines.append('posture_stage_seconds_sum{{stage="{}"}} {}'.format(stage, repr(total)))
+            lines.append('posture_stage_seconds_count{{stage="{}"}} {}'.format(stage, cumulative))
+
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+        for name in sorted(set(self._help) | set(counters)):
+            help_text, label_names = self._help.get(name, ("", ()))
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} counter".format(name))
+            for label_values, value in sorted(counters.get(name, {}).items()):
+                labels = ",".join('{}="{}"'.format(k, _escape(v)) for k, v in zip(label_names, label_values))
+                lines.append("{}{{{}}} {}".format(name, labels, value))
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+            self._counters = {}
+
+
+def _format_bound(value):
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Süreç genelinde paylaşılan kayıt
+registry = MetricsRegistry()
+registry.describe("posture_analyses_total", "Egzersiz tipi ve sonuca gore analiz sayisi.",
+                  ("exercise_type", "outcome"))
+registry.describe("image_decode_reduction_total", "Secilen JPEG cozme kucultme oranina gore resim sayisi.",
+                  ("factor",))
+registry.describe("inference_admission_total", "Cikarim kuyrugu kabul kararlari (accepted/rejected/expired).",
+                  ("result",))
+registry.describe("result_cache_total", "Sonuc onbellegi aramalari (hit/miss/expired).",
+                  ("result",))
+registry.describe("http_requests_total", "Uc nokta ve durum koduna gore HTTP istek sayisi.",
+                  ("endpoint", "method", "status"))
+
+
+def stage(name):
+    return registry.stage(name)
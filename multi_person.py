@@ -0,0 +1,410 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import cv2
+
+from image_decode import fit_image
+from pose_landmarks import LandmarkBuffer
+from pose_profiles import get_profile, pose_solution
+from pose_roi import ROI_MARGIN, person_region, to_full_frame
+from rep_engine import create_analyzer
+from session_recording import open_recorder
+
+# Çok kişili mod (MULTI_PERSON=1): kadrajdaki her kişi ayrı kimlik ve analizörle izlenir
+MULTI_PERSON = os.environ.get("MULTI_PERSON", "0") == "1"
+# Aynı anda izlenen en fazla kişi (her biri kendi Pose örneğini tutar)
+MAX_PEOPLE = int(os.environ.get("MULTI_PERSON_MAX", "6"))
+# Yeni kişi araması kaç karede bir yapılır; izlenen kişiler her karede güncellenir
+DETECT_INTERVAL = int(os.environ.get("MULTI_PERSON_DETECT_INTERVAL", "15"))
+# Kişi tespiti: pose (Pose modeli, izlenenler maskelenerek) ya da hog (OpenCV HOG, daha ucuz)
+DETECTOR = os.environ.get("MULTI_PERSON_DETECTOR", "pose")
+# Kişi kırpmalarını aynı anda işleyen iş parçacığı sayısı (1: sıralı)
+WORKERS = int(os.environ.get("MULTI_PERSON_WORKERS", str(min(MAX_PEOPLE, os.cpu_count() or 1))))
+
+# Tespit karesinin uzun kenarı (tam karede arama ucuz kalsın diye küçültülür)
+DETECT_MAX_SIDE = 640
+# Maskelenen kişi kutularının doldurulduğu gri ton
+MASK_VALUE = 128
+# Kırpmasında üst üste bu kadar kare kişi bulunamayan izleme sonlanır (~1 sn)
+MAX_MISSED = 30
+# Yeni izlemede bu kadar karede hiç kişi bulunamazsa tespit yanlış sayılıp bırakılır
+MAX_UNCONFIRMED = 2
+# Yeni tespit, kişiyi kaybetmiş bir izlemeyle bu kadar örtüşüyorsa (IoU) o kişidir
+MATCH_IOU = 0.3
+# İki izlemenin kutusu bu kadar örtüşürse aynı kişiye kaymışlardır; yenisi bırakılır
+DUPLICATE_IOU = 0.6
+
+
+def box_iou(a, b):
+    """İki piksel kutusunun (x0, y0, x1, y1) kesişim / birleşim oranı."""
+    ix = min(a[2], b[2]) - max(a[0], b[0])
+    iy = min(a[3], b[3]) - max(a[1], b[1])
+    if ix <= 0 or iy <= 0:
+        return 0.0
+    inter = ix * iy
+    return inter / float((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+
+def _scaled(box, scale):
+    return tuple(int(round(v * scale)) for v in box)
+
+
+# --- 1. Kişi Tespiti ---
+
+class PoseDetector:
+    """
+    MediaPipe Pose'u (statik mod) karenin üst üste binen kare pencerelerinde
+    çalıştırır: bulunan her kişinin ve zaten izlenen kişilerin kutusu griyle
+    maskelenir, böylece bir sonraki çağrı pencerede başka bir kişiyi bulur.
+    Geniş salon karesinde kişiler tam karede Pose girişi için çok küçük kaldığından
+    her detect() çağrısı sıradaki tek pencereyi tarar (kare başı maliyet sınırlı).
+    Ek model gerektirmez ve çömelmiş/kısmi kişilerde HOG'dan güvenilirdir.
+    """
+
+    name = "pose"
+
+    def __init__(self, pose_kwargs, max_side=DETECT_MAX_SIDE):
+        self.pose = pose_solution().Pose(**dict(pose_kwargs, static_image_mode=True))
+        self.max_side = max_side
+        self.landmark_buffer = LandmarkBuffer()
+        self._next_window = 0
+
+    def sweep_length(self, width, height):
+        """Tüm kareyi taramak için gereken detect() çağrısı sayısı."""
+        return len(detection_windows(width, height))
+
+    def detect(self, image_rgb, known_boxes, limit):
+        height, width = image_rgb.shape[:2]
+        windows = detection_windows(width, height)
+        window = windows[self._next_window % len(windows)]
+        self._next_window += 1
+        wx0, wy0, wx1, wy1 = window
+        image = fit_image(image_rgb[wy0:wy1, wx0:wx1], self.max_side)
+        if image.base is not None or image is image_rgb:
+            image = image.copy()
+        scale = image.shape[1] / float(wx1 - wx0)
+
+        def mask(box):
+            x0, y0, x1, y1 = _scaled((box[0] - wx0, box[1] - wy0, box[2] - wx0, box[3] - wy0), scale)
+            image[max(0, y0):max(0, y1), max(0, x0):max(0, x1)] = MASK_VALUE
+
+        for box in known_boxes:
+            mask(box)
+        found = []
+        while len(found) < limit:
+            # Anahtar noktalar normalize olduğundan küçültme koordinatları değiştirmez
+            landmarks = self.landmark_buffer.fill(self.pose.process(image))
+            if landmarks is not None:
+                to_full_frame(landmarks, window, width, height)
+            box = person_region(landmarks, width, height, ROI_MARGIN)
+            if box is None or any(box_iou(box, other) > MATCH_IOU for other in found + known_boxes):
+                break
+            found.append(box)
+            mask(box)
+        return found
+
+    def close(self):
+        self.pose.close()
+
+
+def detection_windows(width, height):
+    """Karenin uzun kenarı boyunca yarı örtüşen, kısa kenar boyutunda kare pencereler."""
+    side = min(width, height)
+    long_side = max(width, height)
+    starts = list(range(0, long_side - side, side // 2)) + [long_side - side]
+    if width >= height:
+        return [(x, 0, x + side, height) for x in starts]
+    return [(0, y, width, y + side) for y in starts]
+
+
+class HogDetector:
+    """OpenCV HOG yaya dedektörü; model indirmez ve ucuzdur ama çömelmiş/kısmi kişileri kaçırır."""
+
+    name = "hog"
+
+    def __init__(self, pose_kwargs=None, max_side=DETECT_MAX_SIDE):
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        self.max_side = max_side
+
+    def sweep_length(self, width, height):
+        return 1
+
+    def detect(self, image_rgb, known_boxes, limit):
+        height, width = image_rgb.shape[:2]
+        image = fit_image(image_rgb, self.max_side)
+        scale = width / float(image.shape[1])
+        rects, weights = self.hog.detectMultiScale(image, winStride=(8, 8), padding=(8, 8), scale=1.05)
+        if len(rects) == 0:
+            return []
+        keep = cv2.dnn.NMSBoxes(rects.tolist(), np.ravel(weights).tolist(), 0.0, 0.4)
+        found = []
+        for i in sorted(np.ravel(keep).tolist(), key=lambda i: -float(np.ravel(weights)[i])):
+            x, y, w, h = rects[i]
+            pad_x, pad_y = w * ROI_MARGIN * 0.5, h * ROI_MARGIN * 0.5
+            box = (max(0, int((x - pad_x) * scale)), max(0, int((y - pad_y) * scale)),
+                   min(width, int((x + w + pad_x) * scale) + 1), min(height, int((y + h + pad_y) * scale) + 1))
+            if any(box_iou(box, other) > MATCH_IOU for other in known_boxes):
+                continue
+            found.append(box)
+            if len(found) == limit:
+                break
+        return found
+
+    def close(self):
+        pass
+
+
+DETECTORS = {
+    "pose": PoseDetector,
+    "hog": HogDetector,
+}
+
+
+# --- 2. Kişi Başına İzleme ---
+
+class PersonTrack:
+    """
+    İzlenen bir kişi: sabit kimlik, kırpma kutusu, yalnızca bu kişinin kırpmasını
+    işleyen kendi Pose örneği (izleme modu) ve kendi faz makinesi.
+    """
+
+    __slots__ = ("id", "box", "pose", "analyzer", "landmark_buffer", "landmarks", "missed",
+                 "hits", "frames", "recorder")
+
+    def __init__(self, track_id, box, pose, analyzer, recorder=None):
+        self.id = track_id
+        self.box = box
+        self.pose = pose
+        self.analyzer = analyzer
+        self.landmark_buffer = LandmarkBuffer()
+        self.landmarks = None
+        self.missed = 0
+        self.hits = 0
+        self.frames = 0
+        self.recorder = recorder
+
+    def snapshot(self):
+        """Çizim için analizör durumunun kopyası; kimlik ve kutu eklenmiş."""
+        state = self.analyzer.snapshot()
+        state.id = self.id
+        state.box = self.box
+        state.person = self.landmarks is not None
+        return state
+
+
+class MultiPersonAnalyzer:
+    """
+    Kadrajdaki birden fazla kişiyi izler ve her biri için ayrı analizör çalıştırır.
+
+    Her karede renk dönüşümü tam karede bir kez yapılır; izlenen her kişinin
+    kutusu bu kareden kırpılıp kendi Pose örneğine verilir (WORKERS > 1 ise
+    kırpmalar iş parçacığı havuzunda birlikte işlenir; MediaPipe Pose'un toplu
+    işleme arayüzü yoktur). Yeni kişi taraması DETECT_INTERVAL karede bir
+    (izlenen kimse yoksa sürekli) yapılır, kare başına tek tespit penceresi.
+    Kimlikler kutu örtüşmesiyle korunur: kişiyi kaybeden izleme MAX_MISSED
+    kare boyunca yeni tespitlerle eşleşmeyi bekler, sonra kapanır.
+    """
+
+    def __init__(self, exercise_type, profile=None, max_people=MAX_PEOPLE,
+                 detect_interval=DETECT_INTERVAL, detector=DETECTOR, workers=WORKERS,
+                 pose_kwargs=None, record=False, **record_meta):
+        if detector not in DETECTORS:
+            raise ValueError("Gecersiz kisi dedektoru: {} ({})".format(detector, ", ".join(sorted(DETECTORS))))
+        self.exercise_type = exercise_type
+        self.profile = get_profile(profile)
+        self.max_people = max(1, max_people)
+        self.detect_interval = max(1, detect_interval)
+        self.pose_kwargs = pose_kwargs or self.profile.pose_kwargs(static_image_mode=False)
+        self.detector = DETECTORS[detector](self.pose_kwargs)
+        self.record = record
+        self.record_meta = dict(record_meta, profile=self.profile.name)
+        self.tracks = []
+        self.reps = {}  # kimlik -> tekrar (kapanan izlemeler dahil)
+        self._idle_poses = []
+        self._next_id = 1
+        self._since_detect = self.detect_interval
+        self._sweep_left = 0
+        self._started = time.strftime("%Y%m%d-%H%M%S")
+        self._executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        self.frames = 0
+        self.detections = 0
+        self.pose_runs = 0
+        self.detect_seconds = 0.0
+        self.track_seconds = 0.0
+
+    def process(self, image_bgr, time_ms=None):
+        """
+        Kareyi işler; izlenen kişilerin (PersonTrack) listesini döndürür.
+        time_ms karenin zamanıdır (ms); verilmezse işleme anı kullanılır.
+        """
+        if time_ms is None:
+            time_ms = time.perf_counter() * 1000
+        self.frames += 1
+        height, width = image_bgr.shape[:2]
+        image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+
+        # Tarama, dedektörün pencerelerini kare başına birer birer dolaşır; taramalar
+        # arasında DETECT_INTERVAL kare beklenir (izlenen kimse yoksa beklenmez)
+        self._since_detect += 1
+        if not self._sweep_left and len(self.tracks) < self.max_people and (
+                not self.tracks or self._since_detect >= self.detect_interval):
+            self._sweep_left = self.detector.sweep_length(width, height)
+        if self._sweep_left:
+            self._sweep_left -= 1
+            self._detect(image_rgb)
+
+        start = time.perf_counter()
+        tracks = self.tracks
+        if self._executor is not None and len(tracks) > 1:
+            found = list(self._executor.map(lambda track: self._run_pose(track, image_rgb), tracks))
+        else:
+            found = [self._run_pose(track, image_rgb) for track in tracks]
+        self.pose_runs += len(tracks)
+
+        for track, landmarks in zip(tracks, found):
+            track.frames += 1
+            track.landmarks = landmarks
+            if landmarks is None:
+                track.missed += 1
+                track.box = self._search_box(track, width, height)
+            else:
+                track.missed = 0
+                track.hits += 1
+                track.box = person_region(landmarks, width, height, ROI_MARGIN, track.box) or track.box
+            track.analyzer.update(landmarks, width, height, time_ms)
+            if track.recorder is not None:
+                track.recorder.append(landmarks, track.analyzer, width, height, time_ms)
+        self.track_seconds += time.perf_counter() - start
+
+        self._drop_tracks()
+        return self.tracks
+
+    def _run_pose(self, track, image_rgb):
+        height, width = image_rgb.shape[:2]
+        x0, y0, x1, y1 = track.box
+        crop = np.ascontiguousarray(fit_image(image_rgb[y0:y1, x0:x1], self.profile.max_input_side))
+        crop.flags.writeable = False
+        landmarks = track.landmark_buffer.fill(track.pose.process(crop))
+        if landmarks is not None:
+            to_full_frame(landmarks, track.box, width, height)
+        return landmarks
+
+    def _search_box(self, track, width, height):
+        """
+        Kişiyi kaybeden izlemenin kutusunu her yöne büyütür; kutu tespit penceresi
+        boyutunu (karenin kısa kenarı) aşmaz ve komşu kişinin kutusuna taşmaz.
+        """
+        x0, y0, x1, y1 = track.box
+        pad_x = int((x1 - x0) * ROI_MARGIN * 0.5)
+        pad_y = int((y1 - y0) * ROI_MARGIN * 0.5)
+        box = (max(0, x0 - pad_x), max(0, y0 - pad_y), min(width, x1 + pad_x), min(height, y1 + pad_y))
+        side = min(width, height)
+        if box[2] - box[0] > side or box[3] - box[1] > side:
+            return track.box
+        for other in self.tracks:
+            if other is not track and other.missed == 0 and box_iou(box, other.box) > 0:
+                return track.box
+        return box
+
+    def _detect(self, image_rgb):
+        start = time.perf_counter()
+        self._since_detect = 0
+        self.detections += 1
+        # Kişisi görünen izlemeler maskelenir; kaybedenler yeni tespitle eşleşebilir
+        known = [track.box for track in self.tracks if track.missed == 0]
+        lost = [track for track in self.tracks if track.missed > 0]
+        boxes = self.detector.detect(image_rgb, known, self.max_people - len(known))
+        for box in boxes:
+            match = max(lost, key=lambda track: box_iou(box, track.box), default=None)
+            if match is not None and box_iou(box, match.box) > MATCH_IOU:
+                match.box = box
+                lost.remove(match)
+            elif len(self.tracks) < self.max_people:
+                self.tracks.append(self._new_track(box))
+        self.detect_seconds += time.perf_counter() - start
+
+    def _new_track(self, box):
+        track_id = self._next_id
+        self._next_id += 1
+        if self._idle_poses:
+            pose = self._idle_poses.pop()
+            pose.reset()
+        else:
+            pose = pose_solution().Pose(**self.pose_kwargs)
+        analyzer = create_analyzer(self.exercise_type, self.profile.visibility(self.exercise_type))
+        recorder = None
+        if self.record:
+            recorder = open_recorder(self.exercise_type, analyzer.min_visibility, analyzer.landmark_filter,
+                                     name="{}_{}_p{}".format(self.exercise_type, self._started, track_id),
+                                     person=track_id, **self.record_meta)
+        return PersonTrack(track_id, box, pose, analyzer, recorder)
+
+    def _drop_tracks(self):
+        kept = []
+        for track in self.tracks:
+            duplicate = any(box_iou(track.box, other.box) > DUPLICATE_IOU for other in kept)
+            unconfirmed = track.hits == 0 and track.missed >= MAX_UNCONFIRMED
+            if duplicate or unconfirmed or track.missed > MAX_MISSED:
+                self._close_track(track)
+            else:
+                kept.append(track)
+        self.tracks = kept
+
+    def _close_track(self, track):
+        if track.hits:
+            self.reps[track.id] = track.analyzer.reps
+        if track.recorder is not None:
+            track.recorder.close()
+        # Pose örneği sonraki kişi için saklanır (model yeniden yüklenmez)
+        self._idle_poses.append(track.pose)
+
+    def people(self):
+        """Görülen tüm kimlikler için tekrar sayıları (açık izlemeler dahil)."""
+        reps = dict(self.reps)
+        for track in self.tracks:
+            if track.hits:
+                reps[track.id] = track.analyzer.reps
+        return reps
+
+    def stats(self):
+        frames = max(1, self.frames)
+        return {
+            "frames": self.frames,
+            "active": [track.id for track in self.tracks],
+            "peopleSeen": len(self.people()),
+            "detector": self.detector.name,
+            "detections": self.detections,
+            "poseRunsPerFrame": round(self.pose_runs / frames, 2),
+            "detectMsPerFrame": round(self.detect_seconds * 1000.0 / frames, 2),
+            "trackMsPerFrame": round(self.track_seconds * 1000.0 / frames, 2),
+        }
+
+    def close(self):
+        for track in self.tracks:
+            self._close_track(track)
+        self.tracks = []
+        for pose in self._idle_poses:
+            pose.close()
+        self._idle_poses = []
+        self.detector.close()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+
+# --- 3. Çizim ---
+
+def draw_people(image, people):
+    """Her kişinin kutusunu, kimliğini, tekrar sayısını ve geri bildirimini kare üzerine çizer."""
+    for state in people:
+        x0, y0, x1, y1 = state.box
+        color = state.feedback_color if state.person else (128, 128, 128)
+        cv2.rectangle(image, (x0, y0), (x1, y1), color, 2)
+        cv2.putText(image, "#{}  Tekrar: {}".format(state.id, state.reps),
+                    (x0 + 5, max(20, y0 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
+        if state.feedback:
+            cv2.putText(image, state.feedback, (x0 + 5, min(image.shape[0] - 10, y1 - 10)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+    return image
@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+
+# --- MediaPipe Pose Anahtar Nokta İndeksleri ---
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+
+# Taraf sırası: omuz, kalça, diz, ayak bileği
+LEFT_SIDE = (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+RIGHT_SIDE = (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
+
+# compute_angles() çıktısının sütunları
+KNEE_ANGLE = 0
+HIP_ANGLE = 1
+TRUNK_LEAN = 2  # Omuz→kalça vektörünün aşağı dikeyle açısı (dik duruşta 0)
+TRUNK_HORIZONTAL = 3  # Kalça→omuz vektörünün yatayla açısı (dik duruşta 90)
+KNEE_DISTANCE = 4  # Sol-sağ diz arası 2D mesafe
+ANGLE_COLUMNS = 5
+
+
+# --- Tek Kare (Skaler) Hızlı Yol ---
+# Tek kare için ndarray oluşturmadan math ile hesaplanır.
+
+def angle_2d(ax, ay, bx, by, cx, cy):
+    """b noktasındaki a-b-c açısı (derece, 0-180)."""
+    angle = abs(math.degrees(math.atan2(cy - by, cx - bx) - math.atan2(ay - by, ax - bx)))
+    if angle > 180.0:
+        angle = 360 - angle
+    return angle
+
+
+def vector_angle(vx, vy, ref_x, ref_y):
+    """(vx, vy) vektörünün birim referans vektörle yaptığı açı (derece); sıfır vektörde 0."""
+    norm = math.hypot(vx, vy)
+    if norm == 0:
+        return 0
+    return math.degrees(math.acos(max(-1.0, min(1.0, (vx * ref_x + vy * ref_y) / norm))))
+
+
+def trunk_angle_vertical(vx, vy):
+    """Vektörün aşağı dikey (0, 1) ile açısı; sabit birim vektörün normu hesaplanmaz."""
+    norm = math.hypot(vx, vy)
+    if norm == 0:
+        return 0
+    return math.degrees(math.acos(max(-1.0, min(1.0, vy / norm))))
+
+
+def trunk_angle_horizontal(vx, vy):
+    """Vektörün yatay (1, 0) ile açısı."""
+    norm = math.hypot(vx, vy)
+    if norm == 0:
+        return 0
+    return math.degrees(math.acos(max(-1.0, min(1.0, vx / norm))))
+
+
+def calculate_angle(a, b, c):
+    """
+    Verilen (x, y[, z]) noktalarındaki a-b-c açısını derece cinsinden hesaplar.
+    Yalnızca x ve y kullanılır.
+    """
+    return angle_2d(a[0], a[1], b[0], b[1], c[0], c[1])
+
+
+def calculate_distance(p1, p2):
+    """İki 2D nokta arasındaki Öklid mesafesini hesaplar."""
+    return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
+
+
+# --- Vektörel (Çok Kareli) Çekirdek ---
+
+def angle_between(a, b, c):
+    """(..., 2) dizilerindeki a-b-c açıları (derece, 0-180)."""
+    radians = (np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0]) -
+               np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0]))
+    angle = np.abs(np.degrees(radians))
+    return np.where(angle > 180.0, 360.0 - angle, angle)
+
+
+def vector_angles(v, ref_x, ref_y):
+    """(..., 2) vektörlerinin birim referans vektörle açıları; sıfır vektörlerde 0."""
+    norm = np.hypot(v[..., 0], v[..., 1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cos_value = (v[..., 0] * ref_x + v[..., 1] * ref_y) / norm
+    angle = np.degrees(np.arccos(np.clip(cos_value, -1.0, 1.0)))
+    return np.where(norm == 0, 0.0, angle)
+
+
+def compute_angles(landmarks, right_side=False, width=1.0, height=1.0):
+    """
+    (frames, 33, >=2) normalize anahtar nokta dizisi için tek çağrıda
+    (frames, ANGLE_COLUMNS) açı/mesafe tablosu döndürür.
+
+    right_side tek bir bool ya da kare başına (frames,) bool dizisidir;
+    width/height verilirse hesaplar piksel ölçeğinde yapılır.
+    Tek kare ((33, >=2)) verilirse (ANGLE_COLUMNS,) döner.
+    """
+    lm = np.asarray(landmarks)
+    single = lm.ndim == 2
+    if single:
+        lm = lm[None]
+
+    xy = lm[..., :2].astype(np.float64) * np.array([width, height])
+    left = xy[:, LEFT_SIDE, :]
+    right = xy[:, RIGHT_SIDE, :]
+    right_side = np.asarray(right_side, dtype=bool)
+    if right_side.ndim == 0:
+        points = right if right_side else left
+    else:
+        points = np.where(right_side[:, None, None], right, left)
+    shoulder, hip, knee, ankle = points[:, 0], points[:, 1], points[:, 2], points[:, 3]
+
+    out = np.empty((lm.shape[0], ANGLE_COLUMNS), dtype=np.float64)
+    out[:, KNEE_ANGLE] = angle_between(hip, knee, ankle)
+    out[:, HIP_ANGLE] = angle_between(shoulder, hip, knee)
+    out[:, TRUNK_LEAN] = vector_angles(hip - shoulder, 0.0, 1.0)
+    out[:, TRUNK_HORIZONTAL] = vector_angles(shoulder - hip, 1.0, 0.0)
+    knee_delta = xy[:, LEFT_KNEE] - xy[:, RIGHT_KNEE]
+    out[:, KNEE_DISTANCE] = np.hypot(knee_delta[:, 0], knee_delta[:, 1])
+    return out[0] if single else out
@@ -0,0 +1,152 @@
+import numpy as np
+
+from pose_geometry import LEFT_SIDE, RIGHT_SIDE
+
+# --- Kompakt Anahtar Nokta Dizisi ---
+# Bir kare (33, 4) float32 dizidir; sütunlar x, y, z, visibility.
+LANDMARK_COUNT = 33
+LANDMARK_FIELDS = 4
+X, Y, Z, VISIBILITY = 0, 1, 2, 3
+
+# select_sides() çıktısı: 0 sol, 1 sağ, -1 kullanılabilir taraf yok
+SIDE_INDICES = np.array([LEFT_SIDE, RIGHT_SIDE])  # (2, 4)
+SIDES = (LEFT_SIDE, RIGHT_SIDE)
+NO_SIDE = -1
+
+
+# Görüntüsüz puanlamada (/score-landmarks) kabul edilen kompakt biçim: yalnızca
+# skorlamada kullanılan 8 nokta, sırayla sol omuz, kalça, diz, ayak bileği, sonra sağ taraf
+SCORING_INDICES = LEFT_SIDE + RIGHT_SIDE
+SCORING_POINT_COUNT = len(SCORING_INDICES)
+
+
+def empty_landmarks(frames=None):
+    """Tek kare (33, 4) ya da (frames, 33, 4) boş float32 dizi."""
+    shape = (LANDMARK_COUNT, LANDMARK_FIELDS) if frames is None else (frames, LANDMARK_COUNT, LANDMARK_FIELDS)
+    return np.empty(shape, dtype=np.float32)
+
+
+def landmarks_to_array(landmark_list, out=None):
+    """
+    MediaPipe landmark listesini (33, 4) float32 diziye kopyalar.
+
+    out verilirse yeni dizi ayrılmaz; değerler doğrudan tamponun belleğine yazılır.
+    """
+    if out is None:
+        out = empty_landmarks()
+    view = memoryview(out).cast("B").cast("f")
+    j = 0
+    for lm in landmark_list:
+        view[j] = lm.x
+        view[j + 1] = lm.y
+        view[j + 2] = lm.z
+        view[j + 3] = lm.visibility
+        j += 4
+    return out
+
+
+def landmarks_from_results(results, out=None):
+    """MediaPipe sonucunu (33, 4) float32 diziye çevirir; kişi yoksa None."""
+    if not results.pose_landmarks:
+        return None
+    return landmarks_to_array(results.pose_landmarks.landmark, out)
+
+
+class LandmarkBuffer:
+    """
+    Kare başına yeniden kullanılan önceden ayrılmış (33, 4) tampon.
+
+    Tek bir akış (kamera, video, oturum) için kullanılır; her fill() bir önceki
+    karenin değerlerinin üzerine yazar, saklanacak kareler kopyalanmalıdır.
+    """
+
+    __slots__ = ("array",)
+
+    def __init__(self):
+        self.array = empty_landmarks()
+
+    def fill(self, results):
+        """Sonucu tampona yazar ve tamponu döndürür; kişi yoksa None."""
+        return landmarks_from_results(results, self.array)
+
+
+def visible_mask(landmarks, min_visibility):
+    """(..., 33) bool maske: visibility eşiği aşan noktalar."""
+    return landmarks[..., VISIBILITY] > min_visibility
+
+
+def select_sides(landmarks, min_visibility):
+    """
+    (..., 33, 4) diziler için kare başına kullanılacak taraf: 0 sol, 1 sağ, -1 yok.
+
+    Eski kural (görünür noktası >= 3 ve fazla olan taraf seçilir, sonra dört
+    noktanın hepsi görünür olmalı) "dört noktası da görünen ilk taraf" ile eşdeğerdir.
+    """
+    full = (landmarks[..., SIDE_INDICES, VISIBILITY] > min_visibility).all(axis=-1)
+    return np.where(full[..., 0], 0, np.where(full[..., 1], 1, NO_SIDE)).astype(np.int8)
+
+
+def select_side(landmarks, min_visibility):
+    """Tek kare için LEFT_SIDE / RIGHT_SIDE indeksleri ya da None."""
+    full = (landmarks[SIDE_INDICES, VISIBILITY] > min_visibility).all(axis=1)
+    if full[0]:
+        return LEFT_SIDE
+    if full[1]:
+        return RIGHT_SIDE
+    return None
+
+
+def expand_landmarks(frames):
+    """
+    (n, 33, 4) ya da kompakt (n, 8, 4) diziyi (n, 33, 4) float32 diziye çevirir.
+    Kompakt biçimde verilmeyen noktaların görünürlüğü 0 olur. Tamamı NaN olan
+    kare "kişi yok" demektir; kısmen sonlu olmayan kare ValueError verir.
+    """
+    if frames.ndim != 3 or frames.shape[2] != LANDMARK_FIELDS or \
+            frames.shape[1] not in (LANDMARK_COUNT, SCORING_POINT_COUNT):
+        raise ValueError("Anahtar noktalar (33, 4) ya da (8, 4) boyutunda olmalidir.")
+    empty = np.isnan(frames).all(axis=(1, 2))
+    if not (np.isfinite(frames).all(axis=(1, 2)) | empty).all():
+        raise ValueError("Anahtar noktalarda gecersiz (NaN/sonsuz) deger var.")
+    if frames.shape[1] == LANDMARK_COUNT:
+        return frames.astype(np.float32, copy=False)
+    out = np.zeros((len(frames), LANDMARK_COUNT, LANDMARK_FIELDS), dtype=np.float32)
+    out[:, SCORING_INDICES] = frames
+    out[empty] = np.nan
+    return out
+
+
+def landmarks_from_values(values):
+    """
+    JSON'dan gelen anahtar noktaları (n, 33, 4) diziye çevirir. values tek kare
+    ([[x, y, z, visibility], ...], 33 ya da 8 nokta) veya karelerin listesidir;
+    kişi olmayan kareler null olarak gönderilir. (dizi, tek_kare) döndürür.
+    """
+    if not isinstance(values, list) or not values:
+        raise ValueError("'landmarks' bos olmayan bir liste olmalidir.")
+    first = values[0]
+    single = isinstance(first, list) and bool(first) and not isinstance(first[0], list)
+    frames = [values] if single else values
+    if not all(frame is None or isinstance(frame, (list, tuple)) for frame in frames):
+        raise ValueError("Her kare nokta listesi ya da null olmalidir.")
+    points = next((len(frame) for frame in frames if frame is not None), LANDMARK_COUNT)
+    stacked = np.full((len(frames), points, LANDMARK_FIELDS), np.nan, dtype=np.float32)
+    try:
+        for i, frame in enumerate(frames):
+            if frame is not None:
+                stacked[i] = frame
+    except (TypeError, ValueError):
+        raise ValueError("Anahtar noktalar (33, 4) ya da (8, 4) boyutunda olmalidir.")
+    return expand_landmarks(stacked), single
+
+
+def landmarks_from_bytes(buffer, points=LANDMARK_COUNT):
+    """
+    Paketlenmiş little-endian float32 gövdeyi (kare başına points x 4 değer)
+    (n, 33, 4) diziye çevirir; 33 noktalı gövde kopyalanmadan okunur.
+    """
+    frame_bytes = points * LANDMARK_FIELDS * 4
+    if points not in (LANDMARK_COUNT, SCORING_POINT_COUNT) or not len(buffer) or len(buffer) % frame_bytes:
+        raise ValueError("Govde kare basina {} x 4 float32 degerden olusmalidir.".format(points))
+    frames = np.frombuffer(buffer, dtype="<f4").reshape(-1, points, LANDMARK_FIELDS)
+    return expand_landmarks(frames)
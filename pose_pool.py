@@ -0,0 +1,143 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import cv2
+
+from metrics import stage
+from pose_landmarks import landmarks_from_results
+from pose_profiles import pose_solution
+
+# Havuz boyutu ortam değişkeninden okunur (varsayılan: 2 örnek)
+DEFAULT_POOL_SIZE = int(os.environ.get("POSE_POOL_SIZE", "2"))
+
+# Isınma için kullanılan boş kare boyutu (yükseklik, genişlik)
+WARMUP_FRAME_SHAPE = (256, 256, 3)
+
+
+class PosePool:
+    """
+    Önceden başlatılmış MediaPipe Pose örneklerini istekler arasında paylaştıran havuz.
+
+    Her örnek aynı anda yalnızca tek bir iş parçacığına verilir (checkout/checkin),
+    böylece model grafiği her istekte yeniden yüklenmez.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, **pose_kwargs):
+        if size < 1:
+            raise ValueError("Havuz boyutu en az 1 olmalidir.")
+
+        # Havuzdaki örnekler birbirinden bağımsız resimleri işlediği için
+        # önceki isteğin takibi sonraki isteğe taşınmamalı (static_image_mode=True).
+        self.pose_kwargs = {
+            "static_image_mode": True,
+            "min_detection_confidence": 0.5,
+            "min_tracking_confidence": 0.5,
+        }
+        self.pose_kwargs.update(pose_kwargs)
+        self.size = size
+
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._warmed_up = False
+        self._replaced = 0
+        self._served = 0
+
+        for _ in range(size):
+            self._idle.put(self._create())
+
+    def _create(self):
+        return pose_solution().Pose(**self.pose_kwargs)
+
+    def checkout(self, timeout=None):
+        """Havuzdan boşta bir Pose örneği alır; süre dolarsa TimeoutError fırlatır."""
+        if self._closed:
+            raise RuntimeError("Pose havuzu kapatildi.")
+        try:
+            pose = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("Bos Pose ornegi bulunamadi.")
+        with self._lock:
+            self._served += 1
+        return pose
+
+    def checkin(self, pose, broken=False):
+        """Örneği havuza geri verir. Hatalı örnekler kapatılıp yenisiyle değiştirilir."""
+        if self._closed:
+            pose.close()
+            return
+        if broken:
+            pose.close()
+            pose = self._create()
+            with self._lock:
+                self._replaced += 1
+        self._idle.put(pose)
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        pose = self.checkout(timeout)
+        broken = False
+        try:
+            yield pose
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.checkin(pose, broken=broken)
+
+    def detect(self, image_bgr, timeout=None):
+        """BGR kareyi boşta bir örnekle işler; (33, 4) anahtar nokta dizisi veya None döndürür."""
+        with self.acquire(timeout) as pose:
+            with stage("color_convert"):
+                image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+            image_rgb.flags.writeable = False
+            with stage("pose_process"):
+                results = pose.process(image_rgb)
+        # İstekler eşzamanlı olduğundan her sonuç kendi dizisine kopyalanır
+        with stage("landmarks"):
+            return landmarks_from_results(results)
+
+    def warmup(self, frame=None):
+        """
+        Havuzdaki tüm örneklere boş bir kare işletir; ilk gerçek istek
+        soğuk başlangıç gecikmesini ödemez. Geçen süreyi saniye olarak döndürür.
+        """
+        if frame is None:
+            frame = np.zeros(WARMUP_FRAME_SHAPE, dtype=np.uint8)
+        frame.flags.writeable = False
+
+        start = time.perf_counter()
+        poses = [self.checkout() for _ in range(self.size)]
+        try:
+            for pose in poses:
+                pose.process(frame)
+        finally:
+            for pose in poses:
+                self.checkin(pose)
+        self._warmed_up = True
+        return time.perf_counter() - start
+
+    def health(self):
+        idle = self._idle.qsize()
+        return {
+            "ok": not self._closed,
+            "backend": "thread",
+            "size": self.size,
+            "idle": idle,
+            "in_use": self.size - idle,
+            "warmed_up": self._warmed_up,
+            "served": self._served,
+            "replaced": self._replaced,
+        }
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
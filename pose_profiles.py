@@ -0,0 +1,75 @@
+import os
+from collections import namedtuple
+
+from image_decode import DECODE_TARGET_SIZE
+
+# Dağıtım genelindeki varsayılan profil; istek başına "profile" alanıyla değiştirilebilir
+DEFAULT_PROFILE = os.environ.get("POSE_PROFILE", "balanced")
+
+
+class PoseProfile(namedtuple("PoseProfile", (
+        "name",
+        "model_complexity",          # 0 lite, 1 full, 2 heavy (MediaPipe Pose)
+        "decode_size",               # JPEG küçültmeli çözme hedefi (uzun kenar, 0: tam çözünürlük)
+        "max_input_side",            # pose.process'e verilen karenin en uzun kenarı (0: sınırsız)
+        "smooth_landmarks",          # akış modunda MediaPipe'ın kareler arası yumuşatması
+        "min_detection_confidence",
+        "min_tracking_confidence",
+        "min_visibility",            # egzersiz tipi -> taraf seçimindeki görünürlük eşiği
+))):
+    """Hız/doğruluk dengesini belirleyen ayarlar; benchmark.py --profiles ile ölçülür."""
+
+    __slots__ = ()
+
+    def pose_kwargs(self, static_image_mode):
+        """mp.solutions.pose.Pose(**kwargs) için parametreler."""
+        return {
+            "static_image_mode": static_image_mode,
+            "model_complexity": self.model_complexity,
+            "smooth_landmarks": self.smooth_landmarks,
+            "min_detection_confidence": self.min_detection_confidence,
+            "min_tracking_confidence": self.min_tracking_confidence,
+        }
+
+    def visibility(self, exercise_type):
+        """Egzersizin görünürlük eşiği; bilinmeyen tipte None (analizörün varsayılanı)."""
+        return self.min_visibility.get(exercise_type)
+
+
+# Profil değerlendirmesi: python benchmark.py --images "ornekler/*" --profiles fast,balanced,accurate
+# (gecikme yüzdelikleri ve referans profile göre tespit uyumu, nokta ve skor farkları).
+#
+# fast:     lite model, yumuşatma yok; düşük güçlü kiosklar ve yoğun sunucular için.
+#           Hız kazancı modelden gelir: MediaPipe girişi zaten 256x256'ya indirdiği
+#           için full modelde girişi 320 piksele düşürmek gecikmeyi yalnızca ~%4
+#           azalttı ama 13 örnek karenin 3'ünde kişi kaybedildi; 480/640 ile tespit
+#           ve skorlar balanced ile aynı kaldı. Lite modelin görünürlük skorları daha
+#           düşük olduğundan squat eşiği gevşetilmiştir.
+# balanced: mevcut davranış (full model, 640 piksele küçültmeli JPEG çözme).
+# accurate: heavy model, tam çözünürlük. Lite ve heavy modeller ilk kullanımda indirilir.
+PROFILES = {
+    "fast": PoseProfile("fast", 0, 480, 640, False, 0.5, 0.5, {"squat": 0.6, "deadlift": 0.4}),
+    "balanced": PoseProfile("balanced", 1, DECODE_TARGET_SIZE, 0, True, 0.5, 0.5, {"squat": 0.7, "deadlift": 0.4}),
+    "accurate": PoseProfile("accurate", 2, 0, 0, True, 0.5, 0.5, {"squat": 0.7, "deadlift": 0.4}),
+}
+
+
+def get_profile(name=None):
+    """Profil adını çözer (None: POSE_PROFILE); bilinmeyen adda ValueError."""
+    if isinstance(name, PoseProfile):
+        return name
+    if name is not None and not isinstance(name, str):
+        raise ValueError("Gecersiz profil: {!r} (fast, balanced, accurate)".format(name))
+    try:
+        return PROFILES[name or DEFAULT_PROFILE]
+    except KeyError:
+        raise ValueError("Gecersiz profil: {} (fast, balanced, accurate)".format(name or DEFAULT_PROFILE))
+
+
+def pose_solution():
+    """
+    mp.solutions.pose modülü. mediapipe (~1 sn) burada, ilk model kurulurken
+    yüklenir; sunucular ve yardımcı modüller içe aktarılırken yüklenmez.
+    """
+    import mediapipe as mp
+    return mp.solutions.pose
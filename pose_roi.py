@@ -0,0 +1,153 @@
+import os
+
+import cv2
+
+from image_decode import fit_image
+from pose_landmarks import X, Y, Z, VISIBILITY
+
+# ROI takibi POSE_ROI=0 ile kapatılır (her kare tam çözünürlükte işlenir)
+ROI_ENABLED = os.environ.get("POSE_ROI", "1") != "0"
+
+# Kişi kutusunun her yöne genişletildiği pay (kutu boyutunun oranı)
+ROI_MARGIN = 0.25
+# Kutu hesabında kullanılan noktaların en düşük görünürlüğü ve en az nokta sayısı
+ROI_MIN_VISIBILITY = 0.3
+ROI_MIN_POINTS = 8
+# Kırpma karenin bu oranından büyükse tam kare kullanılır (kazanç yok)
+ROI_MAX_AREA_FRACTION = 0.8
+# Kişi kutusu kırpmanın bu oranından küçülürse kırpma yeniden hesaplanır
+ROI_MIN_FILL = 0.25
+
+
+class PersonRoiTracker:
+    """
+    Bir akış için önceki karenin anahtar noktalarından kişi kutusunu tutar;
+    sonraki kare yalnızca kutu + pay kadar kırpılarak renk dönüşümüne ve
+    pose.process'e verilir, anahtar noktalar tam kare koordinatlarına geri çevrilir.
+
+    Kırpma her karede değil, kişi kırpmanın iç kısmından taştığında ya da
+    kırpma kişiye göre çok büyük kaldığında güncellenir; böylece MediaPipe'ın
+    kendi izleme modu (static_image_mode=False) sabit bir koordinat sisteminde
+    çalışmaya devam eder. Kırpmada kişi bulunamazsa aynı kare tam çözünürlükte
+    yeniden işlenir ve takip sıfırlanır.
+    """
+
+    __slots__ = ("enabled", "margin", "max_side", "region", "last_results", "last_region",
+                 "frames", "cropped_frames", "lost")
+
+    def __init__(self, enabled=ROI_ENABLED, margin=ROI_MARGIN, max_side=0):
+        self.enabled = enabled
+        self.margin = margin
+        # Kırpma (ya da tam kare) pose.process'ten önce bu uzun kenara küçültülür; 0: küçültme yok.
+        # Anahtar noktalar normalize olduğundan küçültme koordinatları değiştirmez.
+        self.max_side = max_side
+        self.region = None  # (x0, y0, x1, y1) piksel, None: tam kare
+        self.last_results = None
+        self.last_region = None
+        self.frames = 0
+        self.cropped_frames = 0
+        self.lost = 0
+
+    def reset(self):
+        self.region = None
+
+    def process(self, pose, image_bgr, landmark_buffer):
+        """
+        Kareyi (varsa) kişi kırpmasıyla işler; tam kareye göre normalize (33, 4)
+        anahtar noktaları ya da kişi yoksa None döndürür. MediaPipe sonucu
+        last_results, kullanılan kırpma last_region alanında kalır.
+        """
+        self.frames += 1
+        region = self.region
+        landmarks = self._run(pose, image_bgr, region, landmark_buffer)
+        if landmarks is None and region is not None:
+            # Takip kaybı: kişi kırpmanın dışına çıktı, tam kareye dön
+            self.lost += 1
+            region = None
+            landmarks = self._run(pose, image_bgr, None, landmark_buffer)
+        elif region is not None:
+            self.cropped_frames += 1
+
+        self.last_region = region
+        if landmarks is not None and region is not None:
+            to_full_frame(landmarks, region, image_bgr.shape[1], image_bgr.shape[0])
+        if self.enabled:
+            self._update_region(landmarks, image_bgr.shape[1], image_bgr.shape[0])
+        return landmarks
+
+    def _run(self, pose, image_bgr, region, landmark_buffer):
+        if region is not None:
+            x0, y0, x1, y1 = region
+            image_bgr = image_bgr[y0:y1, x0:x1]
+        image_bgr = fit_image(image_bgr, self.max_side)
+        image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+        image_rgb.flags.writeable = False
+        self.last_results = pose.process(image_rgb)
+        return landmark_buffer.fill(self.last_results)
+
+    def _update_region(self, landmarks, width, height):
+        region = person_region(landmarks, width, height, self.margin, self.region)
+        if region is not None and region is not self.region:
+            x0, y0, x1, y1 = region
+            if (x1 - x0) * (y1 - y0) > ROI_MAX_AREA_FRACTION * width * height:
+                region = None
+        self.region = region
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "croppedFrames": self.cropped_frames,
+            "trackingLost": self.lost,
+            "region": self.region,
+        }
+
+
+def to_full_frame(landmarks, region, width, height):
+    """Kırpmaya göre normalize anahtar noktaları yerinde tam kare koordinatlarına çevirir."""
+    x0, y0, x1, y1 = region
+    crop_width = x1 - x0
+    landmarks[:, X] *= crop_width / width
+    landmarks[:, X] += x0 / width
+    landmarks[:, Y] *= (y1 - y0) / height
+    landmarks[:, Y] += y0 / height
+    # MediaPipe z değeri x ile aynı ölçektedir
+    landmarks[:, Z] *= crop_width / width
+    return landmarks
+
+
+def person_region(landmarks, width, height, margin=ROI_MARGIN, region=None):
+    """
+    Anahtar noktaları kapsayan, her yöne margin kadar genişletilmiş piksel kutusu
+    (x0, y0, x1, y1). Kişi verilen region'ın iç kısmında kalıyor ve onu yeterince
+    dolduruyorsa region aynen döner; yeterli görünür nokta yoksa None.
+    """
+    if landmarks is None:
+        return None
+    if (landmarks[:, VISIBILITY] > ROI_MIN_VISIBILITY).sum() < ROI_MIN_POINTS:
+        return None
+
+    # Görünmeyen noktalar da kutuya dahil edilir: tam karede modelin gördüğü
+    # vücut alanı kırpmada da korunur (kare dışına taşanlar sınırlanır)
+    px0 = max(0.0, float(landmarks[:, X].min())) * width
+    px1 = min(1.0, float(landmarks[:, X].max())) * width
+    py0 = max(0.0, float(landmarks[:, Y].min())) * height
+    py1 = min(1.0, float(landmarks[:, Y].max())) * height
+    if region is not None:
+        x0, y0, x1, y1 = region
+        inner_x = (x1 - x0) * margin * 0.5
+        inner_y = (y1 - y0) * margin * 0.5
+        inside = (px0 >= x0 + inner_x and px1 <= x1 - inner_x and
+                  py0 >= y0 + inner_y and py1 <= y1 - inner_y)
+        filled = (px1 - px0) * (py1 - py0) >= ROI_MIN_FILL * (x1 - x0) * (y1 - y0)
+        if inside and filled:
+            return region
+
+    pad_x = (px1 - px0) * margin
+    pad_y = (py1 - py0) * margin
+    x0 = max(0, int(px0 - pad_x))
+    y0 = max(0, int(py0 - pad_y))
+    x1 = min(width, int(px1 + pad_x) + 1)
+    y1 = min(height, int(py1 + pad_y) + 1)
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return None
+    return (x0, y0, x1, y1)
@@ -0,0 +1,254 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import cv2
+
+from metrics import stage
+from pose_landmarks import LANDMARK_COUNT, LANDMARK_FIELDS, LandmarkBuffer
+from pose_profiles import pose_solution
+
+# Çalışan süreç sayısı ortam değişkeninden okunur (varsayılan: çekirdek sayısı)
+DEFAULT_WORKERS = int(os.environ.get("POSE_WORKERS", str(os.cpu_count() or 1)))
+
+# Her çalışan için başlangıçta ayrılan paylaşımlı bellek (1920x1080 RGB)
+INITIAL_FRAME_BYTES = 1920 * 1080 * 3
+
+# Çalışanın bir kareyi yanıtlaması için en uzun süre (saniye); aşılırsa çalışan
+# takılmış sayılır ve yeniden başlatılır. Yeni çalışanın model yüklemesini de kapsar.
+WORKER_REPLY_TIMEOUT = float(os.environ.get("POSE_WORKER_TIMEOUT", "30"))
+
+
+def _worker_main(conn, pose_kwargs):
+    """
+    Çalışan süreç döngüsü: Pose modelini bir kez yükler, ardından ebeveynin
+    paylaşımlı belleğe yazdığı RGB kareleri işleyip anahtar noktaları döndürür.
+    """
+    pose = pose_solution().Pose(**pose_kwargs)
+    landmark_buffer = LandmarkBuffer()
+    shm = None
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+
+            shm_name, shape = message
+            if shm is None or shm.name != shm_name:
+                if shm is not None:
+                    shm.close()
+                shm = shared_memory.SharedMemory(name=shm_name)
+
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            frame.flags.writeable = False
+            try:
+                results = pose.process(frame)
+                # Anahtar noktalar 528 baytlık tek bir float32 bloğu olarak döner
+                landmarks = landmark_buffer.fill(results)
+                payload = None if landmarks is None else landmarks.tobytes()
+                conn.send((True, payload))
+            except Exception as e:
+                conn.send((False, str(e)))
+            finally:
+                del frame
+    finally:
+        pose.close()
+        if shm is not None:
+            shm.close()
+
+
+class _Worker:
+    __slots__ = ("process", "conn", "shm")
+
+    def __init__(self, process, conn, shm):
+        self.process = process
+        self.conn = conn
+        self.shm = shm
+
+
+class ProcessPoseBackend:
+    """
+    Pose çıkarımını ayrı süreçlerde çalıştıran arka uç.
+
+    Her süreç kendi uzun ömürlü Pose modelini tutar. Kareler pickle edilmez;
+    ebeveyn renk dönüşümünü doğrudan çalışanın paylaşımlı belleğine yazar ve
+    boru üzerinden yalnızca bellek adı ile kare boyutunu gönderir.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, frame_bytes=INITIAL_FRAME_BYTES,
+                 reply_timeout=WORKER_REPLY_TIMEOUT, **pose_kwargs):
+        if workers < 1:
+            raise ValueError("Calisan sayisi en az 1 olmalidir.")
+
+        self.pose_kwargs = {
+            "static_image_mode": True,
+            "min_detection_confidence": 0.5,
+            "min_tracking_confidence": 0.5,
+        }
+        self.pose_kwargs.update(pose_kwargs)
+        self.size = workers
+        self.frame_bytes = frame_bytes
+        self.reply_timeout = reply_timeout
+
+        # spawn: MediaPipe'ın iş parçacıkları fork ile güvenli biçimde kopyalanamaz
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._warmed_up = False
+        self._restarted = 0
+        self._served = 0
+
+        for _ in range(workers):
+            worker = self._start_worker()
+            self._workers.append(worker)
+            self._idle.put(worker)
+
+    def _start_worker(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(child_conn, self.pose_kwargs), daemon=True)
+        process.start()
+        child_conn.close()
+        shm = shared_memory.SharedMemory(create=True, size=self.frame_bytes)
+        return _Worker(process, parent_conn, shm)
+
+    def _stop_worker(self, worker):
+        try:
+            worker.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        worker.process.join(timeout=2)
+        if worker.process.is_alive():
+            # Takılan çalışan kapatma mesajını okumaz
+            worker.process.kill()
+            worker.process.join(timeout=2)
+        worker.conn.close()
+        worker.shm.close()
+        worker.shm.unlink()
+
+    def _restart(self, worker):
+        self._stop_worker(worker)
+        replacement = self._start_worker()
+        with self._lock:
+            self._workers[self._workers.index(worker)] = replacement
+            self._restarted += 1
+        return replacement
+
+    def _drop(self, worker):
+        """Yeniden başlatılamayan çalışanın yuvasını kaldırır (health'te ok: false)."""
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        if worker.process.is_alive():
+            worker.process.kill()
+
+    def _write_frame(self, worker, image_bgr):
+        """Kareyi RGB olarak çalışanın paylaşımlı belleğine yazar; kare boyutunu döndürür."""
+        nbytes = image_bgr.shape[0] * image_bgr.shape[1] * 3
+        if nbytes > worker.shm.size:
+            # Büyük kare: çalışanın belleği yeniden ayrılır, çalışan yeni adı görünce bağlanır
+            worker.shm.close()
+            worker.shm.unlink()
+            worker.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+
+        shape = (image_bgr.shape[0], image_bgr.shape[1], 3)
+        shared_frame = np.ndarray(shape, dtype=np.uint8, buffer=worker.shm.buf)
+        cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB, dst=shared_frame)
+        del shared_frame
+        return shape
+
+    def _exchange(self, worker, shape):
+        """Çalışana işleme emrini gönderip anahtar noktaları bekler."""
+        worker.conn.send((worker.shm.name, shape))
+        if not worker.conn.poll(self.reply_timeout):
+            raise TimeoutError("Pose calisani {} sn icinde yanit vermedi.".format(self.reply_timeout))
+        ok, payload = worker.conn.recv()
+        if not ok:
+            raise RuntimeError(payload)
+        if payload is None:
+            return None
+        return np.frombuffer(payload, dtype=np.float32).reshape(LANDMARK_COUNT, LANDMARK_FIELDS)
+
+    def _run(self, worker, image_bgr):
+        return self._exchange(worker, self._write_frame(worker, image_bgr))
+
+    def detect(self, image_bgr, timeout=None):
+        """BGR kareyi boşta bir çalışana işletir; (33, 4) anahtar nokta dizisi veya None döndürür."""
+        if self._closed:
+            raise RuntimeError("Pose arka ucu kapatildi.")
+        if not self._workers:
+            raise RuntimeError("Calisan Pose sureci kalmadi.")
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("Bos Pose calisani bulunamadi.")
+
+        try:
+            with stage("color_convert"):
+                shape = self._write_frame(worker, image_bgr)
+            # Süreçler arası gidiş-dönüş dahil
+            with stage("pose_process"):
+                landmarks = self._exchange(worker, shape)
+        except (EOFError, BrokenPipeError, OSError) as e:
+            # Çalışan süreç çöktü ya da takıldı (TimeoutError da OSError'dır):
+            # yenisini başlatıp hatayı yukarı ilet
+            try:
+                replacement = self._restart(worker)
+            except Exception:
+                # Yedek başlatılamadı: ölü çalışan kuyruğa geri konmaz, yuvası düşer
+                self._drop(worker)
+                raise e
+            self._idle.put(replacement)
+            raise
+        except BaseException:
+            self._idle.put(worker)
+            raise
+        self._idle.put(worker)
+
+        with self._lock:
+            self._served += 1
+        return landmarks
+
+    def warmup(self, frame=None):
+        """Her çalışana boş bir kare işleterek modelleri ısıtır; geçen süreyi döndürür."""
+        if frame is None:
+            frame = np.zeros((256, 256, 3), dtype=np.uint8)
+
+        start = time.perf_counter()
+        workers = [self._idle.get() for _ in range(len(self._workers))]
+        try:
+            for worker in workers:
+                self._run(worker, frame)
+        finally:
+            for worker in workers:
+                self._idle.put(worker)
+        self._warmed_up = True
+        return time.perf_counter() - start
+
+    def health(self):
+        idle = self._idle.qsize()
+        alive = sum(1 for worker in self._workers if worker.process.is_alive())
+        return {
+            "ok": not self._closed and alive == self.size,
+            "backend": "process",
+            "size": self.size,
+            "alive": alive,
+            "idle": idle,
+            "in_use": len(self._workers) - idle,
+            "warmed_up": self._warmed_up,
+            "served": self._served,
+            "restarted": self._restarted,
+        }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for worker in self._workers:
+            self._stop_worker(worker)
+        self._workers = []
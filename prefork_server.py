@@ -0,0 +1,179 @@
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+from pose_profiles import DEFAULT_PROFILE, PROFILES, get_profile, pose_solution
+
+# Ön-çatallamalı (prefork/zygote) sunum: ana süreç Flask, OpenCV, NumPy, MediaPipe
+# ve api_server'ı bir kez yükler, model dosyalarını sayfa önbelleğine okur ve
+# dinleme soketini açar; çalışanlar bu ısınmış süreçten fork ile kopyalanır.
+# MediaPipe grafiği kendi iş parçacıklarını başlatır ve fork güvenli değildir; bu
+# yüzden Pose örnekleri ana süreçte değil, her çalışanda fork'tan sonra kurulur
+# (kurulum + ısınma ~0.25 sn). Çöken çalışan aynı sıcak süreçten yeniden çatallanır.
+#
+# Not: /sessions oturumları ve sonuç önbelleği süreç içidir; aynı HTTP oturumunun
+# kareleri farklı çalışana düşebileceğinden bu modda /sessions/ws (tek bağlantı)
+# kullanılmalıdır.
+
+# Çalışan süreç sayısı (varsayılan: çekirdek sayısı)
+PREFORK_WORKERS = int(os.environ.get("PREFORK_WORKERS", str(os.cpu_count() or 1)))
+# Çalışan başına Pose örneği; her örnek ~100 MB bellek tutar
+PREFORK_POOL_SIZE = int(os.environ.get("PREFORK_POOL_SIZE", "1"))
+# Açılışta çöken çalışanın yeniden başlatılmadan önce beklediği süre (saniye)
+RESPAWN_DELAY = float(os.environ.get("PREFORK_RESPAWN_DELAY", "1"))
+# Çalışanın ömrü bundan kısaysa (saniye) açılışta çöktüğü kabul edilir
+MIN_WORKER_LIFETIME = 5.0
+
+# MediaPipe paketindeki Pose grafiğinin okuduğu model dosyaları
+POSE_DETECTION_MODEL = "modules/pose_detection/pose_detection.tflite"
+POSE_LANDMARK_MODELS = {
+    0: "modules/pose_landmark/pose_landmark_lite.tflite",
+    1: "modules/pose_landmark/pose_landmark_full.tflite",
+    2: "modules/pose_landmark/pose_landmark_heavy.tflite",
+}
+
+
+def model_files(profile):
+    """Profilin Pose grafiğinin yüklediği .tflite dosyalarının tam yolları."""
+    import mediapipe as mp
+
+    root = os.path.dirname(mp.__file__)
+    return [os.path.join(root, POSE_DETECTION_MODEL),
+            os.path.join(root, POSE_LANDMARK_MODELS[profile.model_complexity])]
+
+
+def preload(profile):
+    """
+    Ana süreçte fork'tan önce yapılan hazırlık: ağır modüller içe aktarılır,
+    lite/heavy model eksikse bir kez indirilir (çalışanlar aynı anda indirmeye
+    çalışmaz) ve model dosyaları okunarak sayfa önbelleğine alınır. İş parçacığı
+    başlatan hiçbir şey (Pose, havuzlar) burada kurulmaz. Geçen süreyi döndürür.
+    """
+    start = time.perf_counter()
+    import api_server  # noqa: F401 (Flask uygulaması ve yolları çalışanlara miras kalır)
+    from mediapipe.python.solutions.pose import _download_oss_pose_landmark_model
+
+    pose_solution()
+    _download_oss_pose_landmark_model(profile.model_complexity)
+    for path in model_files(profile):
+        with open(path, "rb") as f:
+            while f.read(1 << 20):
+                pass
+    return time.perf_counter() - start
+
+
+class PreforkServer:
+    """
+    Dinleme soketini tutan ana süreç ve ondan çatallanan api_server çalışanları.
+    Her çalışan aynı soketten bağlantı kabul eder (çekirdek dağıtır); ölen
+    çalışan aynı yuvada yeniden başlatılır, SIGTERM/SIGINT tümünü durdurur.
+    """
+
+    def __init__(self, host="0.0.0.0", port=5000, workers=PREFORK_WORKERS,
+                 pool_size=PREFORK_POOL_SIZE, profile=None):
+        if workers < 1:
+            raise ValueError("Calisan sayisi en az 1 olmalidir.")
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.pool_size = pool_size
+        self.profile = get_profile(profile)
+        self.listener = None
+        self.children = {}
+        self.spawned_at = {}
+        self.respawned = 0
+        self.stopping = False
+
+    def start(self):
+        preload_seconds = preload(self.profile)
+        self.listener = socket.create_server((self.host, self.port), backlog=128)
+        self.listener.set_inheritable(True)
+        print("Ana surec hazir: {:.2f} sn (pid {}, {} calisan, profil {})".format(
+            preload_seconds, os.getpid(), self.workers, self.profile.name), flush=True)
+        for slot in range(self.workers):
+            self._spawn(slot)
+
+    def _spawn(self, slot):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                self._run_worker(slot)
+                code = 0
+            except BaseException as e:
+                print("Calisan {} hatasi: {!r}".format(slot, e), file=sys.stderr, flush=True)
+            finally:
+                os._exit(code)
+        self.children[pid] = slot
+        self.spawned_at[slot] = time.monotonic()
+
+    def _run_worker(self, slot):
+        # Ctrl-C tüm süreç grubuna gider; çalışanları ana süreç SIGTERM ile durdurur
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        from werkzeug.serving import make_server
+        import api_server
+
+        start = time.perf_counter()
+        api_server.init_pose_backend("thread", self.pool_size, profile=self.profile)
+        server = make_server(self.host, self.port, api_server.app, threaded=True,
+                             fd=self.listener.fileno())
+        print("Calisan {} hazir: {:.2f} sn (pid {})".format(slot, time.perf_counter() - start, os.getpid()),
+              flush=True)
+        server.serve_forever()
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        """Çalışanları başlatır ve hepsi durdurulana kadar izler."""
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        self.start()
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            slot = self.children.pop(pid, None)
+            if slot is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            print("Calisan {} (pid {}) sonlandi (cikis {}), yeniden baslatiliyor".format(slot, pid, code),
+                  file=sys.stderr, flush=True)
+            # Açılışta kendiliğinden çöken çalışan döngüye girmesin; dışarıdan
+            # öldürülen (OOM, yönetici) çalışan beklemeden yeniden başlatılır
+            if (code not in (-signal.SIGKILL, -signal.SIGTERM)
+                    and time.monotonic() - self.spawned_at[slot] < MIN_WORKER_LIFETIME):
+                time.sleep(RESPAWN_DELAY)
+            self.respawned += 1
+            self._spawn(slot)
+        self.listener.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TherapAI postur analiz API sunucusu (on-catallamali calisanlar)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=PREFORK_WORKERS,
+                        help="Calisan surec sayisi (varsayilan: PREFORK_WORKERS ya da cekirdek sayisi)")
+    parser.add_argument("--pool-size", type=int, default=PREFORK_POOL_SIZE,
+                        help="Calisan basina Pose ornegi (varsayilan: PREFORK_POOL_SIZE ya da 1)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="Varsayilan performans profili (varsayilan: POSE_PROFILE ya da 'balanced')")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    PreforkServer(args.host, args.port, args.workers, args.pool_size, args.profile).run()
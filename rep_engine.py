@@ -0,0 +1,500 @@
+import math
+from array import array
+from types import SimpleNamespace
+
+from pose_geometry import (LEFT_SIDE, LEFT_KNEE, RIGHT_KNEE,
+                           angle_2d, trunk_angle_horizontal, trunk_angle_vertical)
+from pose_landmarks import select_side
+from exercise_rules import rule_thresholds
+from landmark_filters import LANDMARK_FILTER, create_filter
+
+# --- Geri Bildirim Renkleri (BGR) ---
+COLOR_WAITING = (0, 255, 255)  # Sarımsı
+COLOR_OK = (0, 255, 0)  # Yeşil
+COLOR_PROGRESS = (0, 200, 200)  # Turkuaz
+COLOR_ERROR = (0, 0, 255)  # Kırmızı
+COLOR_PARTIAL = (255, 165, 0)  # Turuncu
+COLOR_STICKING = (0, 165, 255)
+
+# --- Açı Eşikleri ---
+# Eşikler exercise_rules.json'daki "thresholds" bölümünden okunur (API skorlamasıyla
+# ortak). Analizör oluşturulurken alınır; kural dosyası yeniden yüklenince yeni
+# oturumlar güncel eşikleri kullanır, süren bir set tutarlı kalır.
+SQUAT_HISTORY_SIZE = 10
+DEADLIFT_HISTORY_SIZE = 15
+# Hareket yönü için karşılaştırılan en yeni / en eski kalça yüksekliği penceresi
+MOVEMENT_WINDOW = 5
+# Squat butt wink kontrolünde karşılaştırılan gövde açısı penceresi
+TRUNK_CHANGE_WINDOW = 3
+
+
+class RingBuffer:
+    """
+    Sabit kapasiteli float halka tampon; ekleme O(1), liste büyütme/pop(0) yok.
+
+    window verilirse en yeni ve en eski window değerin toplamları eklemede
+    artımlı güncellenir; mean_newest(window)/mean_oldest(window) dilim
+    taramadan O(1) döner. Kayan nokta birikimini sınırlamak için toplamlar
+    her tam turda yeniden hesaplanır.
+    """
+
+    __slots__ = ("_data", "_capacity", "_head", "_count", "_window", "_newest_sum", "_oldest_sum")
+
+    def __init__(self, capacity, window=0):
+        self._data = array("d", bytes(8 * capacity))
+        self._capacity = capacity
+        self._window = window if 0 < window <= capacity else 0
+        self.clear()
+
+    def append(self, value):
+        data, capacity, head, count, window = self._data, self._capacity, self._head, self._count, self._window
+        if window:
+            if count >= window:
+                self._newest_sum -= data[(head - window) % capacity]
+            self._newest_sum += value
+            if count < window:
+                self._oldest_sum += value
+            elif count == capacity:
+                # En eski değer çıkar, eski pencerenin arkasındaki değer girer
+                self._oldest_sum -= data[head]
+        data[head] = value
+        self._head = head = (head + 1) % capacity
+        if count < capacity:
+            self._count = count + 1
+        elif window:
+            self._oldest_sum += data[(head + window - 1) % capacity]
+            if head == 0:
+                self._newest_sum = self._sum_newest(window)
+                self._oldest_sum = self._sum_oldest(window)
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+        self._newest_sum = 0.0
+        self._oldest_sum = 0.0
+
+    def __len__(self):
+        return self._count
+
+    def _sum_oldest(self, k):
+        data, capacity = self._data, self._capacity
+        start = self._head - self._count
+        total = 0.0
+        for i in range(k):
+            total += data[(start + i) % capacity]
+        return total
+
+    def _sum_newest(self, k):
+        data, capacity = self._data, self._capacity
+        total = 0.0
+        for i in range(1, k + 1):
+            total += data[(self._head - i) % capacity]
+        return total
+
+    def mean_oldest(self, k):
+        """En eski k değerin ortalaması (listede history[:k])."""
+        if k == self._window:
+            return self._oldest_sum / k
+        return self._sum_oldest(k) / k
+
+    def mean_newest(self, k):
+        """En yeni k değerin ortalaması (listede history[-k:])."""
+        if k == self._window:
+            return self._newest_sum / k
+        return self._sum_newest(k) / k
+
+
+class RepAnalyzer:
+    """
+    Tekrar sayan faz makinelerinin ortak tabanı.
+
+    Her kare için update(landmarks, width, height) çağrılır; landmarks (33, 4)
+    (x, y, z, visibility) normalize koordinatlı dizi ya da kişi yoksa None'dır.
+    Anahtar noktalar açı hesabından önce landmark_filter ile (LANDMARK_FILTER,
+    varsayılan One-Euro) yumuşatılır; kişi kaybında filtre sıfırlanır.
+    Sonuç analizörün kendi alanlarında tutulur (phase, reps, feedback,
+    repetition_valid, valid ...) ve her karede yeni nesne oluşturulmaz.
+    """
+
+    __slots__ = ("phase", "reps", "repetition_valid", "feedback", "feedback_color", "error_code",
+                 "valid", "side", "knee_angle", "hip_angle", "trunk_angle", "hip_y_history",
+                 "movement_direction", "min_visibility", "limits", "landmark_filter")
+
+    exercise = None
+    # Taraf seçiminde dört noktanın aşması gereken görünürlük (profil ile değiştirilebilir)
+    default_visibility = 0.5
+    # snapshot() ile kopyalanan alanlar
+    snapshot_fields = ("phase", "reps", "repetition_valid", "feedback", "feedback_color", "error_code",
+                       "valid", "side", "knee_angle", "hip_angle", "trunk_angle", "movement_direction")
+    idle_feedback = ""
+    no_person_feedback = "Kamerada kimse yok! Lutfen kadraja girin."
+    missing_landmarks_feedback = ""
+    detection_error_feedback = ""
+
+    def __init__(self, history_size, min_visibility=None, landmark_filter=LANDMARK_FILTER):
+        self.min_visibility = self.default_visibility if min_visibility is None else min_visibility
+        self.limits = rule_thresholds(self.exercise)
+        self.landmark_filter = create_filter(landmark_filter)
+        self.hip_y_history = RingBuffer(history_size, MOVEMENT_WINDOW)
+        self.reset()
+
+    def reset(self):
+        """Tekrar sayısı dahil tüm durumu sıfırlar."""
+        self.phase = "IDLE"
+        self.reps = 0
+        self.repetition_valid = True
+        self.feedback = self.idle_feedback
+        self.feedback_color = COLOR_WAITING
+        self.error_code = None
+        self.valid = False
+        self.side = None
+        self.knee_angle = 0.0
+        self.hip_angle = 0.0
+        self.trunk_angle = 0.0
+        self.movement_direction = "STATIONARY"
+        self._clear_history()
+
+    def _clear_history(self):
+        self.hip_y_history.clear()
+
+    def snapshot(self):
+        """Başka bir iş parçacığında çizim için anlık durumun kopyası (geçmiş tamponları hariç)."""
+        return SimpleNamespace(**{name: getattr(self, name) for name in self.snapshot_fields})
+
+    def _abort(self, feedback):
+        """Kişi/nokta kaybında tekrarı geçersiz sayıp IDLE'a döner."""
+        self.feedback = feedback
+        self.feedback_color = COLOR_ERROR
+        self.phase = "IDLE"
+        self.repetition_valid = False
+        self.valid = False
+        self._clear_history()
+
+    def _set(self, feedback, color):
+        self.feedback = feedback
+        self.feedback_color = color
+
+    def select_side(self, landmarks):
+        """Dört noktası da görünür olan tarafın indekslerini döndürür (yoksa None)."""
+        return select_side(landmarks, self.min_visibility)
+
+    def update(self, landmarks, width, height, time_ms=None):
+        """time_ms: karenin zamanı (ms, monoton); filtre adımını gerçek kare aralığına göre ayarlar."""
+        self.error_code = None
+        landmark_filter = self.landmark_filter
+        if landmarks is None:
+            if landmark_filter is not None:
+                landmark_filter.reset()
+            self._abort(self.no_person_feedback)
+            return self
+        if landmark_filter is not None:
+            landmarks = landmark_filter.process(landmarks, time_ms)
+        try:
+            side = self.select_side(landmarks)
+            if side is None:
+                self._abort(self.missing_landmarks_feedback)
+                self.side = None
+                return self
+            self.side = "Sol " if side is LEFT_SIDE else "Sag "
+            self.valid = True
+            self._analyze(landmarks, side, width, height)
+        except Exception:
+            self._abort(self.detection_error_feedback)
+        return self
+
+    def _movement(self, threshold, min_frames):
+        history = self.hip_y_history
+        if len(history) < min_frames:
+            return "STATIONARY"
+        avg_hip_y_current = history.mean_newest(MOVEMENT_WINDOW)
+        avg_hip_y_previous = history.mean_oldest(MOVEMENT_WINDOW)
+        if avg_hip_y_current < avg_hip_y_previous - threshold:
+            return "UP"
+        if avg_hip_y_current > avg_hip_y_previous + threshold:
+            return "DOWN"
+        return "STATIONARY"
+
+    def _analyze(self, landmarks, side, width, height):
+        raise NotImplementedError
+
+
+class SquatAnalyzer(RepAnalyzer):
+    """IDLE→READY_TO_SQUAT→DOWNWARD_PHASE→BOTTOM_POSITION→UPWARD_PHASE squat döngüsü."""
+
+    __slots__ = ("trunk_angle_history", "initial_knee_distance", "knee_distance")
+
+    exercise = "squat"
+    default_visibility = 0.7
+    snapshot_fields = RepAnalyzer.snapshot_fields + ("knee_distance",)
+    idle_feedback = "Squat bekleniyor..."
+    missing_landmarks_feedback = "Kamerayi/pozisyonu ayarlayin. Tum vucudunuzun gorunur oldugundan emin olun."
+    detection_error_feedback = "Tespit Hatasi! Pozisyonunuzu ayarlayin."
+
+    def __init__(self, min_visibility=None, landmark_filter=LANDMARK_FILTER):
+        self.trunk_angle_history = RingBuffer(SQUAT_HISTORY_SIZE, TRUNK_CHANGE_WINDOW)
+        RepAnalyzer.__init__(self, SQUAT_HISTORY_SIZE, min_visibility, landmark_filter)
+
+    def _clear_history(self):
+        self.hip_y_history.clear()
+        self.trunk_angle_history.clear()
+        self.initial_knee_distance = None
+        self.knee_distance = None
+
+    def _analyze(self, landmarks, side, width, height):
+        shoulder, hip, knee, ankle = (landmarks[idx] for idx in side)
+        # Squat açıları piksel koordinatlarında hesaplanır
+        sx, sy = shoulder[0] * width, shoulder[1] * height
+        hx, hy = hip[0] * width, hip[1] * height
+        kx, ky = knee[0] * width, knee[1] * height
+        ax, ay = ankle[0] * width, ankle[1] * height
+
+        knee_angle = angle_2d(hx, hy, kx, ky, ax, ay)
+        hip_angle = angle_2d(sx, sy, hx, hy, kx, ky)
+        trunk_horizontal = trunk_angle_horizontal(sx - hx, sy - hy)
+        self.knee_angle = knee_angle
+        self.hip_angle = hip_angle
+        self.trunk_angle = trunk_horizontal
+
+        self.trunk_angle_history.append(trunk_horizontal)
+        self.hip_y_history.append(hy)
+
+        left_knee = landmarks[LEFT_KNEE]
+        right_knee = landmarks[RIGHT_KNEE]
+        if left_knee[3] > self.min_visibility and right_knee[3] > self.min_visibility:
+            self.knee_distance = math.hypot((left_knee[0] - right_knee[0]) * width,
+                                            (left_knee[1] - right_knee[1]) * height)
+        else:
+            self.knee_distance = None
+        limits = self.limits
+        valgus = (self.knee_distance is not None and self.initial_knee_distance is not None and
+                  self.knee_distance < self.initial_knee_distance * (1 - limits.knee_valgus_distance_ratio))
+
+        movement_direction = self._movement(limits.movement_threshold_pixels, SQUAT_HISTORY_SIZE)
+        self.movement_direction = movement_direction
+        standing = (hip_angle > limits.standing_hip_min and knee_angle > limits.standing_knee_min and
+                    trunk_horizontal > limits.standing_trunk_min)
+        phase = self.phase
+
+        if phase == "IDLE":
+            self._set("Squat bekleniyor...", COLOR_WAITING)
+            self.repetition_valid = True
+
+            # Başlangıç pozisyonunu tespit et
+            if standing:
+                self._set("Squat yapmaya hazirsiniz! Alcalmaya baslayin.", COLOR_OK)
+                self.phase = "READY_TO_SQUAT"
+                knee_distance = self.knee_distance
+                self._clear_history()
+                # Diz valgus tespiti için başlangıç mesafesini kaydet
+                self.initial_knee_distance = knee_distance
+                self.knee_distance = knee_distance
+
+        elif phase == "READY_TO_SQUAT":
+            if movement_direction == "DOWN":
+                self._set("Alcalma fazi basladi...", COLOR_PROGRESS)
+                self.phase = "DOWNWARD_PHASE"
+            elif movement_direction == "UP":
+                self._set("Alcalmaya baslamalisiniz. Erken yukselmeyin!", COLOR_ERROR)
+                self.repetition_valid = False
+                self.phase = "IDLE"  # Tekrarı iptal et
+
+        elif phase == "DOWNWARD_PHASE":
+            history = self.trunk_angle_history
+            if trunk_horizontal < limits.over_lean_trunk_max:
+                self._set("Asiri one egilmeyin! Gogsunuzu dik tutun.", COLOR_ERROR)
+                self.error_code = "OVER_LEAN"
+            elif hip_angle < limits.butt_wink_hip_max:
+                self._set("Kalcanizi kontrol edin! Butt wink tespit edildi.", COLOR_ERROR)
+                self.error_code = "BUTT_WINK_HIP"
+            elif (len(history) >= 5 and
+                  history.mean_newest(TRUNK_CHANGE_WINDOW) - history.mean_oldest(TRUNK_CHANGE_WINDOW) >
+                  limits.butt_wink_trunk_change):
+                self._set("Belinizi duz tutun! Butt wink olabilir.", COLOR_ERROR)
+                self.error_code = "BUTT_WINK_TRUNK"
+            elif valgus:
+                self._set("Dizler iceri cokuyor! Dizlerinizi disari itin.", COLOR_ERROR)
+                self.error_code = "KNEE_VALGUS"
+
+            if self.error_code is not None:
+                self.repetition_valid = False
+            elif movement_direction == "DOWN":
+                self._set("Alcaliyor... Derinlesin!", COLOR_PROGRESS)
+                if knee_angle > limits.partial_knee_max:
+                    self._set("Alcalmaya devam edin, daha derin!", COLOR_OK)
+            elif movement_direction == "UP" or (movement_direction == "STATIONARY" and knee_angle < limits.bottom_knee_max):
+                # Erken yükselme veya dip tespiti
+                if knee_angle <= limits.deep_knee_max:
+                    self._set(f"Alt pozisyon! Derin Squat ({int(knee_angle)} derece).", COLOR_OK)
+                    self.phase = "BOTTOM_POSITION"
+                elif limits.parallel_knee_min <= knee_angle <= limits.parallel_knee_max:
+                    self._set(f"Alt pozisyon! Paralel Squat ({int(knee_angle)} derece).", COLOR_OK)
+                    self.phase = "BOTTOM_POSITION"
+                elif limits.partial_knee_min <= knee_angle <= limits.partial_knee_max:
+                    self._set(f"Alt pozisyon! Kismi Squat ({int(knee_angle)} derece).", COLOR_PARTIAL)
+                    self.phase = "BOTTOM_POSITION"
+                else:  # Yeterince derin inilmediyse
+                    self._set("Yeterince derine inmediniz! Daha fazla alcalin.", COLOR_ERROR)
+                    self.repetition_valid = False
+                    self.phase = "UPWARD_PHASE"  # Hatalı yükseliş olarak kabul et
+            else:  # Hala aşağı inmesi beklenirken duraklama
+                self._set("Alcaliyor... Derinlesin!", COLOR_PROGRESS)
+
+        elif phase == "BOTTOM_POSITION":
+            if movement_direction == "UP":
+                self._set("Yukseliyor...", COLOR_PROGRESS)
+                self.phase = "UPWARD_PHASE"
+            elif movement_direction == "DOWN":
+                if self.repetition_valid:
+                    self._set("En alttasiniz. Yukselmeye baslayin!", COLOR_OK)
+                else:
+                    self._set("Form hatasi nedeniyle alttasiniz. Yukselin.", COLOR_ERROR)
+
+        elif phase == "UPWARD_PHASE":
+            # Yükselişte hata kontrolleri
+            if trunk_horizontal < limits.over_lean_trunk_max:
+                self._set("Yukseliste asiri one egilmeyin! Topuklarinizdan guc alin.", COLOR_ERROR)
+                self.repetition_valid = False
+            if valgus:
+                self._set("Yukseliste dizler iceri cokuyor! Disari dogru itin.", COLOR_ERROR)
+                self.repetition_valid = False
+
+            # Tekrarın tamamlandığını kontrol et (dik pozisyona geri dönme)
+            if standing:
+                if self.repetition_valid:
+                    self.reps += 1
+                    self._set("Tekrar tamamlandi! Formunuz iyi. Sonraki tekrara hazir.", COLOR_OK)
+                else:
+                    self._set("Tekrar hatali tamamlandi. Formunuzu kontrol edin!", COLOR_ERROR)
+                self.phase = "IDLE"  # Yeni bir tekrar için başa dön
+                self._clear_history()
+            else:
+                self._set("Yukseliyor... Tamamen dogrulun.", COLOR_PROGRESS)
+
+
+class DeadliftAnalyzer(RepAnalyzer):
+    """IDLE→STARTING_POSE→LIFTING_PHASE→LOCKOUT→DOWNWARD_PHASE deadlift döngüsü."""
+
+    __slots__ = ()
+
+    exercise = "deadlift"
+    default_visibility = 0.4
+    idle_feedback = "Beklemede..."
+    missing_landmarks_feedback = "Vucudunu kadraja al ve pozisyon al. (Yetersiz Nokta Tespit)"
+    detection_error_feedback = "Algilama Hatasi! Konumunu duzelt."
+
+    def __init__(self, min_visibility=None, landmark_filter=LANDMARK_FILTER):
+        RepAnalyzer.__init__(self, DEADLIFT_HISTORY_SIZE, min_visibility, landmark_filter)
+
+    def _analyze(self, landmarks, side, width, height):
+        shoulder, hip, knee, ankle = (landmarks[idx] for idx in side)
+        # Diz/kalça açıları normalize koordinatlarda, gövde açısı piksellerde hesaplanır
+        knee_angle = angle_2d(hip[0], hip[1], knee[0], knee[1], ankle[0], ankle[1])
+        hip_angle = angle_2d(shoulder[0], shoulder[1], hip[0], hip[1], knee[0], knee[1])
+        trunk_angle = trunk_angle_vertical(int(hip[0] * width) - int(shoulder[0] * width),
+                                           int(hip[1] * height) - int(shoulder[1] * height))
+        self.knee_angle = knee_angle
+        self.hip_angle = hip_angle
+        self.trunk_angle = trunk_angle
+
+        limits = self.limits
+        self.hip_y_history.append(hip[1] * height)
+        movement_direction = self._movement(limits.movement_threshold_pixels, 5)
+        self.movement_direction = movement_direction
+
+        in_start_pose = (limits.start_knee_min <= knee_angle <= limits.start_knee_max and
+                         limits.start_hip_min <= hip_angle <= limits.start_hip_max and
+                         limits.start_trunk_min <= trunk_angle <= limits.start_trunk_max)
+        phase = self.phase
+
+        if phase == "IDLE":
+            self._set("Baslangic Pozisyonu icin yere egil.", COLOR_WAITING)
+            self.repetition_valid = True
+
+            if in_start_pose:
+                self._set("Baslangic Pozisyonu alindi. Kaldir!", COLOR_OK)
+                self.phase = "STARTING_POSE"
+                self.hip_y_history.clear()
+
+        elif phase == "STARTING_POSE":
+            if movement_direction == "UP":
+                self._set("Kaldiriliyor...", COLOR_PROGRESS)
+                self.phase = "LIFTING_PHASE"
+            elif movement_direction == "DOWN":
+                self._set("Yanlis yone iniyorsun! Kaldir.", COLOR_ERROR)
+                self.repetition_valid = False
+                self.phase = "IDLE"
+
+        elif phase == "LIFTING_PHASE":
+            if self.repetition_valid:
+                self._set("Kaldiriliyor...", COLOR_PROGRESS)
+
+            if trunk_angle > limits.start_trunk_max + 15:  # Gövde çok dikleşiyor/sadece sırt kalkıyor
+                self._set("Kalcani daha fazla kullan! Sirtin erken kalkiyor.", COLOR_ERROR)
+                self.repetition_valid = False
+            elif hip_angle > (knee_angle + 20) and hip_angle > limits.start_hip_max + 20:
+                self._set("Kalcani cok erken kaldirdin! Dizlerinle eş zamanli kalk.", COLOR_ERROR)
+                self.repetition_valid = False
+            elif knee_angle > limits.start_knee_max + 20 and hip_angle < limits.start_hip_min + 20:
+                self._set("Dizlerin erken acildi! Kalcanla birlikte kalk.", COLOR_ERROR)
+                self.repetition_valid = False
+            elif (limits.sticking_trunk_min <= trunk_angle <= limits.sticking_trunk_max and
+                  limits.sticking_hip_min <= hip_angle <= limits.sticking_hip_max and
+                  limits.sticking_knee_min <= knee_angle <= limits.sticking_knee_max):
+                if self.repetition_valid:  # Sadece geçerliyse zorlanma noktası uyarısı
+                    self._set("Zorlanma Noktasi!", COLOR_STICKING)
+
+            # Kilitleme pozisyonuna yalnızca tekrar hâlâ geçerliyse geçilir
+            if self.repetition_valid and (knee_angle > limits.lockout_knee_min and hip_angle > limits.lockout_hip_min and
+                                          trunk_angle < limits.lockout_trunk_max):
+                self._set("Kilitleme tamamlandi! simdi indir.", COLOR_OK)
+                self.phase = "LOCKOUT"
+                self.hip_y_history.clear()
+
+        elif phase == "LOCKOUT":
+            if trunk_angle > limits.lockout_trunk_max + 10:
+                self._set("Sirtin tam düz degil! Kilitlemede kamburlasma.", COLOR_ERROR)
+                self.repetition_valid = False
+
+            if self.repetition_valid:
+                self._set("Tamamen dik dur! Hazirsan indir.", COLOR_OK)
+
+            # İniş fazına geçiş
+            if movement_direction == "DOWN":
+                self._set("Inis Fazi basladi...", COLOR_PARTIAL)
+                self.phase = "DOWNWARD_PHASE"
+
+        elif phase == "DOWNWARD_PHASE":
+            if self.repetition_valid:
+                self._set("Indiriliyor...", COLOR_PARTIAL)
+
+            if trunk_angle > limits.start_trunk_max + 20:  # Aşırı yuvarlanma/bükülme
+                self._set("Sirtini duz tut! iniste kamburlasma.", COLOR_ERROR)
+                self.repetition_valid = False
+            elif hip_angle > (knee_angle + 20) and movement_direction == "DOWN" and knee_angle > limits.lockout_knee_min - 10:
+                self._set("Dizlerini buk! Kalcani cok erken indirme.", COLOR_ERROR)
+                self.repetition_valid = False
+
+            # Başlangıç pozisyonuna dönüş (tekrar döngüsü sonu)
+            if in_start_pose:
+                if self.repetition_valid:
+                    self.reps += 1  # Tekrarı SADECE geçerli bir tekrar tamamlandığında artır
+                    self._set("Başlangic Pozisyonuna Dönüldü. Yeni Tekrar için hazir.", COLOR_OK)
+                else:
+                    self._set("Tekrar Hatali Tamamlandi! Lütfen formu düzeltin.", COLOR_ERROR)
+                self.phase = "IDLE"
+                self.hip_y_history.clear()
+
+
+ANALYZERS = {
+    "squat": SquatAnalyzer,
+    "deadlift": DeadliftAnalyzer,
+}
+
+
+def create_analyzer(exercise_type, min_visibility=None, landmark_filter=LANDMARK_FILTER):
+    """Egzersiz tipine göre yeni bir analizör döndürür; bilinmeyen tipte ValueError."""
+    try:
+        analyzer_class = ANALYZERS[exercise_type]
+    except KeyError:
+        raise ValueError("Gecersiz egzersiz tipi: {}".format(exercise_type))
+    return analyzer_class(min_visibility, landmark_filter)
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+try:
+    import xxhash
+except ImportError:  # xxhash kurulu değilse hashlib.blake2b kullanılır
+    xxhash = None
+
+# Önbelleğin yaklaşık bellek bütçesi (bayt, 0: kapalı) ve kayıt ömrü (saniye, 0: sınırsız)
+RESULT_CACHE_BYTES = int(os.environ.get("RESULT_CACHE_BYTES", str(4 * 1024 * 1024)))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "300"))
+
+# Anahtar (16 baytlık özet + egzersiz/profil adları), demet ve sözlük girdisi için pay
+ENTRY_OVERHEAD = 256
+
+
+def content_hash(payload):
+    """Ham resim baytlarının (ya da base64 metninin) 16 baytlık özeti."""
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    if xxhash is not None:
+        return xxhash.xxh3_128_digest(payload)
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+class ResultCache:
+    """
+    Aynı resmin tekrar gönderiminde çözme ve çıkarımı atlayan LRU sonuç önbelleği.
+
+    Anahtar: (gövde baytlarının özeti, egzersiz tipi, profil adı, ...). Değerler
+    (score, feedback) demetleridir. Toplam boyut max_bytes'ı aşınca en eski
+    kullanılan kayıtlar atılır; ttl'i dolan kayıt okunurken silinir.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES, ttl=RESULT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # anahtar -> (son geçerlilik, boyut, değer)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def key(self, payload, *labels):
+        """(özet, *labels): etiketler sonucu belirleyen diğer girdilerdir (egzersiz, profil, kural sürümü)."""
+        return (content_hash(payload),) + labels
+
+    def get(self, key):
+        """Geçerli kayıt varsa değerini döndürür, yoksa None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                result = "miss"
+            elif entry[0] <= now:
+                del self._entries[key]
+                self._bytes -= entry[1]
+                self.expired += 1
+                entry = None
+                result = "expired"
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                result = "hit"
+        metrics.registry.inc("result_cache_total", result)
+        return None if entry is None else entry[2]
+
+    def put(self, key, value):
+        size = ENTRY_OVERHEAD + sum(sys.getsizeof(item) for item in value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else float("inf")
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
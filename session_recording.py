@@ -0,0 +1,327 @@
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from pose_landmarks import LANDMARK_COUNT, LANDMARK_FIELDS
+from rep_engine import create_analyzer
+
+# Oturum kayıtlarının yazılacağı klasör (boşsa kayıt kapalı). Kayıtlar kamera
+# görüntüsü ve pose çıkarımı olmadan yeniden oynatılır:
+#   python session_recording.py replay kayitlar/*.tprec --verify
+RECORD_DIR = os.environ.get("SESSION_RECORD_DIR", "")
+# Diske tek seferde yazılan kare sayısı; çökmede en fazla bir parça kaybolur
+CHUNK_FRAMES = int(os.environ.get("SESSION_RECORD_CHUNK", "256"))
+
+# --- 1. Dosya Biçimi ---
+# Başlık: FILE_MAGIC, uint32 meta uzunluğu, JSON meta (16 bayta dolgulu).
+# Ardından parçalar: CHUNK_HEADER (magic, kare sayısı, veri baytı, ayrılmış) ve
+# sütunlar art arda; her sütun 16 bayta hizalı olduğundan mmap üzerinde
+# kopyasız NumPy görünümü olarak okunur.
+FILE_MAGIC = b"TPREC\x00\x01\x00"
+CHUNK_MAGIC = b"TPCH"
+FILE_HEADER = struct.Struct("<8sI")
+CHUNK_HEADER = struct.Struct("<4sIII")
+ALIGNMENT = 16
+
+# (ad, dtype, kare başına şekil)
+COLUMNS = (
+    ("time_ms", np.dtype("<f8"), ()),
+    ("landmarks", np.dtype("<f4"), (LANDMARK_COUNT, LANDMARK_FIELDS)),  # kişi yoksa NaN
+    ("angles", np.dtype("<f4"), (3,)),  # diz, kalça, gövde (analizörün son değerleri)
+    ("size", np.dtype("<u2"), (2,)),  # genişlik, yükseklik (açılar piksellerde hesaplanır)
+    ("reps", np.dtype("<u2"), ()),
+    ("phase", np.dtype("u1"), ()),  # meta["phases"] indeksi
+    ("flags", np.dtype("u1"), ()),
+)
+FLAG_PERSON = 1
+FLAG_VALID = 2
+FLAG_REPETITION_VALID = 4
+
+PHASES = ("IDLE", "READY_TO_SQUAT", "DOWNWARD_PHASE", "BOTTOM_POSITION", "UPWARD_PHASE",
+          "STARTING_POSE", "LIFTING_PHASE", "LOCKOUT")
+UNKNOWN_PHASE = 255
+
+
+def _padded(size):
+    return -size % ALIGNMENT
+
+
+def _column_layout(frames):
+    """Parça içindeki sütunların (ad, dtype, şekil, ofset, bayt) listesi ve toplam bayt."""
+    layout = []
+    offset = 0
+    for name, dtype, shape in COLUMNS:
+        nbytes = frames * dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+        layout.append((name, dtype, shape, offset, nbytes))
+        offset += nbytes + _padded(nbytes)
+    return layout, offset
+
+
+# --- 2. Kayıt ---
+
+class SessionRecorder:
+    """
+    Her karede analizöre verilen anahtar noktaları ve analizörün sonucunu
+    (açılar, faz, tekrar, bayraklar) sütun tamponlarına yazar; CHUNK_FRAMES
+    karede bir parça olarak diske ekler. Tek iş parçacığından kullanılır.
+    """
+
+    def __init__(self, path, exercise_type, min_visibility=None, landmark_filter=None,
+                 chunk_frames=CHUNK_FRAMES, **meta):
+        self.path = path
+        self.chunk_frames = max(1, chunk_frames)
+        # Ham noktalar kaydedilir; yeniden oynatmada aynı filtre kurulur
+        if landmark_filter is not None and not isinstance(landmark_filter, str):
+            landmark_filter = landmark_filter.name
+        self.meta = dict(meta, exercise=exercise_type, min_visibility=min_visibility,
+                         landmark_filter=landmark_filter or "none",
+                         # Filtre adımları time_ms sütunundaki kare aralıklarıyla atılır
+                         filter_timing="time_ms",
+                         phases=list(PHASES), created=time.time())
+        self._phase_codes = {name: code for code, name in enumerate(PHASES)}
+        self._columns = {name: np.zeros((self.chunk_frames,) + shape, dtype=dtype)
+                         for name, dtype, shape in COLUMNS}
+        self._count = 0
+        self.frames = 0
+        self._started = time.perf_counter()
+
+        meta_bytes = json.dumps(self.meta, ensure_ascii=False).encode("utf-8")
+        self._file = open(path, "wb")
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, len(meta_bytes)))
+        self._file.write(meta_bytes + b"\0" * _padded(FILE_HEADER.size + len(meta_bytes)))
+
+    def append(self, landmarks, analyzer, width, height, time_ms=None):
+        """
+        Analizörün update() çağrısından sonra kareyi kaydeder. time_ms analizöre
+        verilen perf_counter tabanlı zamandır (ms); kayda başlangıca göre yazılır.
+        """
+        i = self._count
+        columns = self._columns
+        if time_ms is None:
+            time_ms = time.perf_counter() * 1000
+        columns["time_ms"][i] = time_ms - self._started * 1000
+        if landmarks is None:
+            columns["landmarks"][i] = np.nan
+        else:
+            columns["landmarks"][i] = landmarks
+        columns["angles"][i] = (analyzer.knee_angle, analyzer.hip_angle, analyzer.trunk_angle)
+        columns["size"][i] = (width, height)
+        columns["reps"][i] = analyzer.reps
+        columns["phase"][i] = self._phase_codes.get(analyzer.phase, UNKNOWN_PHASE)
+        columns["flags"][i] = ((FLAG_PERSON if landmarks is not None else 0) |
+                               (FLAG_VALID if analyzer.valid else 0) |
+                               (FLAG_REPETITION_VALID if analyzer.repetition_valid else 0))
+        self._count += 1
+        self.frames += 1
+        if self._count == self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        count = self._count
+        if not count or self._file is None:
+            return
+        layout, payload = _column_layout(count)
+        write = self._file.write
+        write(CHUNK_HEADER.pack(CHUNK_MAGIC, count, payload, 0))
+        for name, _, _, _, nbytes in layout:
+            write(memoryview(self._columns[name][:count]).cast("B"))
+            write(b"\0" * _padded(nbytes))
+        self._file.flush()
+        self._count = 0
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_recorder(exercise_type, min_visibility=None, landmark_filter=None, name=None, **meta):
+    """RECORD_DIR ayarlıysa yeni bir kayıt dosyası açar, değilse None."""
+    if not RECORD_DIR:
+        return None
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    name = name or "{}_{}".format(exercise_type, time.strftime("%Y%m%d-%H%M%S"))
+    return SessionRecorder(os.path.join(RECORD_DIR, name + ".tprec"), exercise_type, min_visibility,
+                            landmark_filter, **meta)
+
+
+# --- 3. Okuma ve Yeniden Oynatma ---
+
+class SessionRecording:
+    """
+    Kayıt dosyasını mmap ile açar. chunks her parça için {sütun: görünüm}
+    sözlükleridir; görünümler dosya belleğini doğrudan gösterir (kopya yok).
+    Yarım yazılmış son parça (ör. çökme) yok sayılır ve truncated True olur.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, meta_size = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != FILE_MAGIC:
+            self.close()
+            raise ValueError("Gecersiz kayit dosyasi: {}".format(path))
+        start = FILE_HEADER.size
+        self.meta = json.loads(bytes(self._map[start:start + meta_size]).decode("utf-8"))
+        self.phases = self.meta.get("phases", list(PHASES))
+        self.chunks = []
+        self.truncated = False
+        self._scan(start + meta_size + _padded(start + meta_size))
+
+    def _scan(self, offset):
+        size = len(self._map)
+        while offset + CHUNK_HEADER.size <= size:
+            magic, count, payload, _ = CHUNK_HEADER.unpack_from(self._map, offset)
+            offset += CHUNK_HEADER.size
+            if magic != CHUNK_MAGIC or offset + payload > size:
+                self.truncated = True
+                return
+            layout, _ = _column_layout(count)
+            self.chunks.append({
+                name: np.frombuffer(self._map, dtype=dtype, count=nbytes // dtype.itemsize,
+                                    offset=offset + column_offset).reshape((count,) + shape)
+                for name, dtype, shape, column_offset, nbytes in layout
+            })
+            offset += payload
+        self.truncated = offset != size
+
+    def __len__(self):
+        return sum(len(chunk["time_ms"]) for chunk in self.chunks)
+
+    def column(self, name):
+        """Sütunun tüm kareleri; tek parçalı kayıtta kopyasız görünüm."""
+        parts = [chunk[name] for chunk in self.chunks]
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            dtype, shape = next((dtype, shape) for column, dtype, shape in COLUMNS if column == name)
+            return np.empty((0,) + shape, dtype=dtype)
+        return np.concatenate(parts)
+
+    def frames(self):
+        """(zaman ms, anahtar noktalar (33, 4) görünümü ya da None, genişlik, yükseklik) üretir."""
+        for chunk in self.chunks:
+            person = (chunk["flags"] & FLAG_PERSON).astype(bool).tolist()
+            times = chunk["time_ms"].tolist()
+            sizes = chunk["size"].tolist()
+            landmarks = chunk["landmarks"]
+            for i, found in enumerate(person):
+                yield times[i], landmarks[i] if found else None, sizes[i][0], sizes[i][1]
+
+    def replay(self, analyzer=None, verify=False):
+        """
+        Kareleri analizörden (verilmezse kayıttaki egzersiz, eşik ve filtreyle
+        yeni analizör) geçirir; analizörü ve (verify ise) kayıtla faz/tekrar
+        uyuşmayan kare sayısını döndürür.
+        """
+        if analyzer is None:
+            analyzer = create_analyzer(self.meta["exercise"], self.meta.get("min_visibility"),
+                                       self.meta.get("landmark_filter", "none"))
+        mismatches = 0
+        # Eski kayıtlar filtreyi sabit kare hızıyla çalıştırmıştı; zaman verilmez
+        timed = self.meta.get("filter_timing") == "time_ms"
+        if not verify:
+            for time_ms, landmarks, width, height in self.frames():
+                analyzer.update(landmarks, width, height, time_ms if timed else None)
+            return analyzer, mismatches
+
+        phases = self.phases
+        recorded = ((phases[code] if code < len(phases) else None, reps)
+                    for chunk in self.chunks
+                    for code, reps in zip(chunk["phase"].tolist(), chunk["reps"].tolist()))
+        for (time_ms, landmarks, width, height), (phase, reps) in zip(self.frames(), recorded):
+            analyzer.update(landmarks, width, height, time_ms if timed else None)
+            if analyzer.phase != phase or analyzer.reps != reps:
+                mismatches += 1
+        return analyzer, mismatches
+
+    def close(self):
+        # Görünümler mmap'i tuttuğundan önce bırakılır; dışarıda görünüm kaldıysa
+        # eşleme son görünüm silinince serbest kalır
+        self.chunks = []
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- 4. Komut Satırı ---
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Oturum kayitlarini inceler ve yeniden oynatir")
+    sub = parser.add_subparsers(dest="command", required=True)
+    replay = sub.add_parser("replay", help="Kayitlari faz makinesinden gecirip tekrar sayisini verir")
+    replay.add_argument("paths", nargs="+", help="Kayit dosyalari ya da glob desenleri")
+    replay.add_argument("--verify", action="store_true",
+                        help="Faz/tekrar sonuclarini kayittakilerle kare kare karsilastir")
+    info = sub.add_parser("info", help="Kayit meta bilgisini ve kare sayisini yazdirir")
+    info.add_argument("paths", nargs="+")
+    return parser.parse_args(argv)
+
+
+def expand_paths(patterns):
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    return paths
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    total_frames = 0
+    total_mismatches = 0
+    start = time.perf_counter()
+    for path in expand_paths(args.paths):
+        with SessionRecording(path) as recording:
+            reps = recording.column("reps")
+            summary = {
+                "path": path,
+                "exercise": recording.meta.get("exercise"),
+                "frames": len(recording),
+                "recorded_reps": int(reps[-1]) if len(reps) else 0,
+                "truncated": recording.truncated,
+            }
+            if args.command == "info":
+                summary["meta"] = recording.meta
+            else:
+                analyzer, mismatches = recording.replay(verify=args.verify)
+                summary["replayed_reps"] = analyzer.reps
+                if args.verify:
+                    summary["mismatched_frames"] = mismatches
+                    total_mismatches += mismatches
+            total_frames += summary["frames"]
+            print(json.dumps(summary, ensure_ascii=False))
+    elapsed = time.perf_counter() - start
+    print("{} kare {:.2f} sn'de islendi ({:.0f} kare/sn)".format(
+        total_frames, elapsed, total_frames / elapsed if elapsed else 0.0))
+    return 1 if total_mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+import uuid
+
+from pose_landmarks import LandmarkBuffer
+from pose_profiles import get_profile, pose_solution
+from pose_roi import PersonRoiTracker
+from rep_engine import create_analyzer
+from session_recording import open_recorder
+
+# Aynı anda açık tutulabilecek en fazla oturum ve boşta kalma süresi (saniye)
+MAX_SESSIONS = int(os.environ.get("MAX_STREAM_SESSIONS", "16"))
+SESSION_IDLE_TIMEOUT = float(os.environ.get("STREAM_SESSION_IDLE_TIMEOUT", "60"))
+
+
+class StreamSession:
+    """
+    Tek bir istemcinin kare akışı için kalıcı Pose izleyicisi ve faz makinesi.
+
+    Pose static_image_mode=False ile çalışır; ardışık karelerde MediaPipe
+    pahalı kişi tespiti yerine ucuz izleme modunu kullanır.
+    """
+
+    def __init__(self, exercise_type, profile=None):
+        self.profile = get_profile(profile)
+        self.analyzer = create_analyzer(exercise_type, self.profile.visibility(exercise_type))
+        self.landmark_buffer = LandmarkBuffer()
+        self.roi = PersonRoiTracker(max_side=self.profile.max_input_side)
+        self.session_id = uuid.uuid4().hex
+        self.exercise_type = exercise_type
+        self.pose = pose_solution().Pose(**self.profile.pose_kwargs(static_image_mode=False))
+        # SESSION_RECORD_DIR ayarlıysa kareler itiraz/yeniden oynatma için kaydedilir
+        self.recorder = open_recorder(exercise_type, self.analyzer.min_visibility,
+                                      self.analyzer.landmark_filter,
+                                      name="{}_{}".format(exercise_type, self.session_id),
+                                      profile=self.profile.name, source="session")
+        self.frames = 0
+        self.created_at = time.monotonic()
+        self.last_seen = self.created_at
+        self.lock = threading.Lock()
+
+    def process_frame(self, image_bgr):
+        """Bir kareyi işler ve güncel tekrar/faz durumunu döndürür."""
+        with self.lock:
+            start = time.perf_counter()
+            # Önceki karedeki kişi kutusuna kırpılarak işlenir
+            landmarks = self.roi.process(self.pose, image_bgr, self.landmark_buffer)
+            analyzer = self.analyzer
+            previous_phase = analyzer.phase
+            previous_reps = analyzer.reps
+            analyzer.update(landmarks, image_bgr.shape[1], image_bgr.shape[0], start * 1000)
+            if self.recorder is not None:
+                self.recorder.append(landmarks, analyzer, image_bgr.shape[1], image_bgr.shape[0], start * 1000)
+
+            self.frames += 1
+            self.last_seen = time.monotonic()
+            state = self.state()
+            state["personDetected"] = landmarks is not None
+            state["repCompleted"] = analyzer.reps > previous_reps
+            if analyzer.phase != previous_phase:
+                state["transition"] = {"from": previous_phase, "to": analyzer.phase}
+            state["latencyMs"] = round((time.perf_counter() - start) * 1000, 1)
+            return state
+
+    def state(self):
+        analyzer = self.analyzer
+        return {
+            "sessionId": self.session_id,
+            "exerciseType": self.exercise_type,
+            "profile": self.profile.name,
+            "phase": analyzer.phase,
+            "reps": analyzer.reps,
+            "repetitionValid": analyzer.repetition_valid,
+            "feedback": analyzer.feedback,
+            "frames": self.frames,
+        }
+
+    def close(self):
+        with self.lock:
+            self.pose.close()
+            if self.recorder is not None:
+                self.recorder.close()
+
+
+class SessionManager:
+    """Açık akış oturumlarını tutar; boşta kalanları kapatır ve üst sınırı uygular."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _expire_idle(self):
+        """Boşta kalan oturumları çıkarır (kilit altında); kapatılacakları döndürür."""
+        now = time.monotonic()
+        expired = [s for s in self._sessions.values() if now - s.last_seen > self.idle_timeout]
+        for session in expired:
+            del self._sessions[session.session_id]
+        return expired
+
+    @staticmethod
+    def _close_all(sessions):
+        # Kapatma oturumun kare kilidini bekleyebilir; yönetici kilidi dışında yapılır
+        for session in sessions:
+            session.close()
+
+    def create(self, exercise_type, profile=None):
+        with self._lock:
+            expired = self._expire_idle()
+            full = len(self._sessions) >= self.max_sessions
+        self._close_all(expired)
+        if full:
+            raise RuntimeError("Acik oturum siniri asildi.")
+        # Pose kurulumu (yüzlerce ms) kilit dışında yapılır; diğer oturumların
+        # get()/close() çağrıları, dolayısıyla canlı akışlar beklemez
+        session = StreamSession(exercise_type, profile)
+        with self._lock:
+            if len(self._sessions) < self.max_sessions:
+                self._sessions[session.session_id] = session
+                return session
+        # Kurulum sürerken sınır başka isteklerle doldu
+        session.close()
+        raise RuntimeError("Acik oturum siniri asildi.")
+
+    def get(self, session_id):
+        with self._lock:
+            expired = self._expire_idle()
+            session = self._sessions.get(session_id)
+        self._close_all(expired)
+        return session
+
+    def close(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+        return session
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,258 @@
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from multi_person import MultiPersonAnalyzer
+from pose_landmarks import LandmarkBuffer
+from pose_profiles import DEFAULT_PROFILE, PROFILES, get_profile, pose_solution
+from pose_roi import ROI_ENABLED, PersonRoiTracker
+from rep_engine import ANALYZERS, create_analyzer
+
+# Her karede yazılan sütunlar (CSV başlığı ve JSONL anahtarları)
+RESULT_FIELDS = ["frame", "time_ms", "person", "valid", "phase", "reps", "repetition_valid",
+                 "feedback", "knee_angle", "hip_angle", "trunk_angle"]
+# Çok kişili modda her satır bir kişinin karesidir
+MULTI_RESULT_FIELDS = ["person_id"] + RESULT_FIELDS
+
+
+class FrameReader(threading.Thread):
+    """
+    Videoyu arka plan iş parçacığında çözüp sınırlı bir kuyruğa koyar.
+
+    target_fps verilirse atlanan kareler yalnızca grab() ile geçilir (çözülmez).
+    Kuyruğa (kare indeksi, zaman damgası ms, BGR kare) konur; akış sonunda None.
+    """
+
+    def __init__(self, path, target_fps=0.0, queue_size=8, width=None):
+        super().__init__(daemon=True)
+        self.path = path
+        self.target_fps = target_fps
+        self.width = width
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.source_fps = 0.0
+        self.frames_read = 0
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _put(self, item):
+        while not self._stop_event.is_set():
+            try:
+                self.frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self):
+        cap = cv2.VideoCapture(self.path)
+        try:
+            if not cap.isOpened():
+                self.error = "Video acilamadi: {}".format(self.path)
+                return
+
+            self.source_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            step = 1.0
+            if self.target_fps and self.target_fps < self.source_fps:
+                step = self.source_fps / self.target_fps
+
+            index = 0
+            next_index = 0.0
+            while not self._stop_event.is_set():
+                if index < int(next_index):
+                    # Analiz edilmeyecek kare: çözmeden atla
+                    if not cap.grab():
+                        break
+                    index += 1
+                    continue
+
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if self.width and frame.shape[1] != self.width:
+                    height = int(frame.shape[0] * self.width / frame.shape[1])
+                    frame = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+
+                self.frames_read += 1
+                if not self._put((index, index * 1000.0 / self.source_fps, frame)):
+                    break
+                index += 1
+                next_index += step
+        finally:
+            cap.release()
+            self._put(None)
+
+
+def open_writer(path, fmt, fields=RESULT_FIELDS):
+    handle = open(path, "w", newline="", encoding="utf-8")
+    if fmt == "csv":
+        writer = csv.DictWriter(handle, fieldnames=fields)
+        writer.writeheader()
+        return handle, writer.writerow
+
+    def write_jsonl(row):
+        handle.write(json.dumps(row, ensure_ascii=False))
+        handle.write("\n")
+    return handle, write_jsonl
+
+
+def analyzer_row(index, time_ms, person, analyzer):
+    return {
+        "frame": index,
+        "time_ms": round(time_ms, 1),
+        "person": person,
+        "valid": analyzer.valid,
+        "phase": analyzer.phase,
+        "reps": analyzer.reps,
+        "repetition_valid": analyzer.repetition_valid,
+        "feedback": analyzer.feedback,
+        "knee_angle": round(analyzer.knee_angle, 2),
+        "hip_angle": round(analyzer.hip_angle, 2),
+        "trunk_angle": round(analyzer.trunk_angle, 2),
+    }
+
+
+def process_video(path, exercise_type, output_dir, fmt="jsonl", target_fps=0.0, queue_size=8,
+                  width=None, model_complexity=None, roi=ROI_ENABLED, profile=None, multi_person=False):
+    """Tek bir videoyu analiz edip kare bazında sonuç dosyası yazar; özet sözlüğü döndürür."""
+    start = time.perf_counter()
+    stem = os.path.splitext(os.path.basename(path))[0]
+    output_path = os.path.join(output_dir, "{}.{}.{}".format(stem, exercise_type, fmt))
+
+    profile = get_profile(profile)
+    analyzed = 0
+    pose_kwargs = profile.pose_kwargs(static_image_mode=False)
+    if model_complexity is not None:
+        pose_kwargs["model_complexity"] = model_complexity
+    reader = FrameReader(path, target_fps, queue_size, width)
+    multi = pose = handle = None
+    try:
+        if multi_person:
+            # Her kişinin kendi Pose örneği ve analizörü var; satırlara person_id eklenir
+            multi = MultiPersonAnalyzer(exercise_type, profile, pose_kwargs=pose_kwargs)
+            handle, write_row = open_writer(output_path, fmt, MULTI_RESULT_FIELDS)
+        else:
+            analyzer = create_analyzer(exercise_type, profile.visibility(exercise_type))
+            landmark_buffer = LandmarkBuffer()
+            tracker = PersonRoiTracker(enabled=roi, max_side=profile.max_input_side)
+            pose = pose_solution().Pose(**pose_kwargs)
+            handle, write_row = open_writer(output_path, fmt)
+        # Okuyucu kurulumdan sonra başlar: kurulum hatasında dolu kuyrukta bekleyen
+        # çözme iş parçacığı kalmaz
+        reader.start()
+        while True:
+            item = reader.frames.get()
+            if item is None:
+                break
+            index, time_ms, frame = item
+            analyzed += 1
+
+            if multi_person:
+                for track in multi.process(frame, time_ms):
+                    row = analyzer_row(index, time_ms, track.landmarks is not None, track.analyzer)
+                    row["person_id"] = track.id
+                    write_row(row)
+                continue
+
+            landmarks = tracker.process(pose, frame, landmark_buffer)
+            analyzer.update(landmarks, frame.shape[1], frame.shape[0], time_ms)
+            write_row(analyzer_row(index, time_ms, landmarks is not None, analyzer))
+    finally:
+        reader.stop()
+        if handle is not None:
+            handle.close()
+        if multi is not None:
+            multi.close()
+        if pose is not None:
+            pose.close()
+    reader.join()
+    if reader.error:
+        os.remove(output_path)
+        output_path = None
+
+    summary = {
+        "video": path,
+        "output": output_path,
+        "error": reader.error,
+        "source_fps": reader.source_fps,
+        "frames_analyzed": analyzed,
+        "reps": multi.people() if multi_person else analyzer.reps,
+        "profile": profile.name,
+    }
+    if multi_person:
+        summary["multi_person"] = multi.stats()
+    else:
+        summary["roi"] = tracker.stats()
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Kayitli videolari ekransiz (headless) analiz eder.")
+    parser.add_argument("videos", nargs="+", help="Analiz edilecek video dosyalari")
+    parser.add_argument("--exercise", required=True, choices=sorted(ANALYZERS))
+    parser.add_argument("--output-dir", default=".", help="Sonuc dosyalarinin yazilacagi klasor")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--fps", type=float, default=0.0,
+                        help="Hedef analiz FPS'i; kaynaktan dusukse aradaki kareler atlanir (0: tum kareler)")
+    parser.add_argument("--jobs", type=int, default=1, help="Ayni anda islenecek dosya sayisi")
+    parser.add_argument("--queue-size", type=int, default=8, help="Cozulmus kare kuyrugu boyutu")
+    parser.add_argument("--width", type=int, default=None, help="Kareleri bu genislige olcekle")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="Performans profili (varsayilan: POSE_PROFILE ya da 'balanced')")
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=None,
+                        help="Profilin model karmasikligini gecersiz kilar")
+    parser.add_argument("--no-roi", action="store_true",
+                        help="Kisi kirpmasini kapat, her kareyi tam cozunurlukte isle")
+    parser.add_argument("--multi-person", action="store_true",
+                        help="Kadrajdaki her kisiyi ayri kimlik ve analizorle izle (person_id sutunu)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = dict(exercise_type=args.exercise, output_dir=args.output_dir, fmt=args.format,
+                   target_fps=args.fps, queue_size=args.queue_size, width=args.width,
+                   model_complexity=args.model_complexity, roi=ROI_ENABLED and not args.no_roi,
+                   profile=args.profile, multi_person=args.multi_person)
+
+    failed = 0
+
+    def report(summary):
+        print(json.dumps(summary, ensure_ascii=False), flush=True)
+        return 1 if summary["error"] else 0
+
+    # Bir dosyadaki hata (model yükleme, yazıcı, bozuk kare) toplu işi durdurmaz;
+    # o dosya için hata özeti yazılır ve sıradakine geçilir
+    if args.jobs <= 1:
+        for path in args.videos:
+            try:
+                summary = process_video(path, **options)
+            except Exception as e:
+                summary = {"video": path, "output": None, "error": repr(e)}
+            failed += report(summary)
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = {executor.submit(process_video, path, **options): path for path in args.videos}
+            for future in as_completed(futures):
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    summary = {"video": futures[future], "output": None, "error": repr(e)}
+                failed += report(summary)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())